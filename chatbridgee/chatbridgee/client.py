@@ -17,13 +17,14 @@ from socketio import exceptions
 
 from .config import ChatBridgeEConfig
 from .file_sync import FileSyncPlugin
-from .plugin import META, tr
+from .plugin import META, BasePlugin, tr
 from .read import ReadClient
 
 sio = socketio.Client()
 cb_lock = Lock()
 
 config: ChatBridgeEConfig = None
+plugins: list[BasePlugin] = []
 
 
 @new_thread("chatbridge-send-data")
@@ -36,6 +37,8 @@ def send_event(event: str, data: Union[str, dict, list] = None):
 @sio.event
 def connect():
     print("connection established")
+    for plugin in plugins:
+        plugin.on_connect()
 
 
 @sio.event
@@ -77,8 +80,10 @@ def on_load(server: PluginServerInterface, old_module):
         target_class=ChatBridgeEConfig,
     )
 
-    ReadClient(server, sio, config)
-    FileSyncPlugin(server, sio, config)
+    plugins[:] = [
+        ReadClient(server, sio, config),
+        FileSyncPlugin(server, sio, config),
+    ]
 
     auth_else = {}
     directory = server.get_mcdr_config().get("working_directory", "server")
@@ -121,6 +126,9 @@ def on_unload(server: PluginServerInterface):
     with cb_lock:
         sio.disconnect()
 
+    for plugin in plugins:
+        plugin.on_unload()
+
 
 def on_server_start(server: PluginServerInterface):
     send_event("server_start")
@@ -40,6 +40,16 @@ class ChatBridgeEConfig(Serializable):
     file_sync_extension: str = ".schem"
     # 檔案同步指令前綴
     file_sync_command_prefix: str = "!!sch"
+    # 等待寫入的檔案或傳輸區塊數上限
+    file_sync_max_pending_writes: int = 8
+    # 等待寫入的資料大小上限 (MiB)
+    file_sync_max_pending_size: int = 256
+    # 目錄同步的目錄 (相對於檔案同步路徑)
+    file_sync_dirs: list[str] = []
+    # 目錄同步間隔 (分鐘, 0 為僅手動同步)
+    file_sync_dir_interval: int = 0
+    # 目錄同步同時傳輸的檔案數
+    file_sync_dir_concurrency: int = 4
 
     @property
     def client_info(self) -> ClientInfo:
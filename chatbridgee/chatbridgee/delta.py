@@ -0,0 +1,285 @@
+"""
+Delta encoding
+==============
+rsync style delta of a file against an older version held by the receiver. The
+receiver sends the signature of its version (`make_signature`), a weak rolling
+checksum and a strong hash per block, the sender finds those blocks in the new
+version and sends only the rest (`make_delta`), the receiver rebuilds the file
+with `apply_delta`.
+
+Gzip files, e.g. `.schem`, change entirely after the first edit once compressed,
+so they are compared decompressed. The sender only does so when recompressing
+reproduces the file byte for byte, the receiver compresses the rebuilt content
+the same way. The operations of a delta are deflated, literal blocks of a
+schematic compress as well as the file does. Files are held in memory, callers
+check `MIN_FILE_SIZE` and `MAX_FILE_SIZE`.
+
+```
+signature  "CBS1" mode:u8 block_size:u32 count:u32 (weak:u32 strong:8s)*
+delta      "CBD2" mode:u8 level:i8 block_size:u32 header_size:u16 header
+           deflate(("C" index:u32 count:u32 | "L" size:u32 data)*)
+```
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import struct
+import zlib
+from typing import NamedTuple, Optional
+
+__all__ = (
+    "MIN_FILE_SIZE",
+    "MAX_FILE_SIZE",
+    "DeltaError",
+    "make_signature",
+    "make_delta",
+    "apply_delta",
+)
+
+# smaller files are sent whole
+MIN_FILE_SIZE = 64 * 1024
+MAX_FILE_SIZE = 64 * 1024 * 1024
+MIN_BLOCK_SIZE = 2048
+MAX_BLOCK_SIZE = 64 * 1024
+# a delta with more literal data than this ratio of the content, or larger than
+# this ratio of the file, is not used
+MAX_LITERAL_RATIO = 0.8
+OPS_LEVEL = 6
+
+MODE_RAW, MODE_GZIP = 0, 1
+STRONG_SIZE = 8
+ADLER_MOD = 65521
+
+SIGNATURE_HEADER = struct.Struct(">4sBII")
+SIGNATURE_BLOCK = struct.Struct(f">I{STRONG_SIZE}s")
+DELTA_HEADER = struct.Struct(">4sBbIH")
+COPY = struct.Struct(">cII")
+LITERAL = struct.Struct(">cI")
+
+
+class DeltaError(Exception):
+    pass
+
+
+class Content(NamedTuple):
+    mode: int
+    data: bytes
+    # gzip only
+    header: bytes = b""
+    level: int = -1
+
+
+def _strong(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=STRONG_SIZE).digest()
+
+
+def _block_size(size: int) -> int:
+    return min(MAX_BLOCK_SIZE, max(MIN_BLOCK_SIZE, math.isqrt(size) & ~7))
+
+
+def _gzip_header_size(raw: bytes) -> Optional[int]:
+    if len(raw) < 18 or raw[:3] != b"\x1f\x8b\x08":
+        return None
+
+    flags, pos = raw[3], 10
+    try:
+        if flags & 4:  # FEXTRA
+            pos += 2 + int.from_bytes(raw[pos : pos + 2], "little")
+        for flag in (8, 16):  # FNAME, FCOMMENT
+            if flags & flag:
+                pos = raw.index(b"\0", pos) + 1
+    except ValueError:
+        return None
+    if flags & 2:  # FHCRC
+        pos += 2
+    return pos if pos < len(raw) else None
+
+
+def _deflate(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _gzip(content: Content) -> bytes:
+    data = content.data
+    trailer = struct.pack("<II", zlib.crc32(data), len(data) & 0xFFFFFFFF)
+    return content.header + _deflate(data, content.level) + trailer
+
+
+def _load(raw: bytes, reproducible: bool) -> Content:
+    """decompress a single member gzip file, with `reproducible` only when
+    compressing it again gives the same bytes
+    """
+    if (header_size := _gzip_header_size(raw)) is None:
+        return Content(MODE_RAW, raw)
+
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(raw[header_size:])
+    except zlib.error:
+        return Content(MODE_RAW, raw)
+    if not decompressor.eof or len(decompressor.unused_data) != 8:
+        return Content(MODE_RAW, raw)
+
+    header = raw[:header_size]
+    if not reproducible:
+        return Content(MODE_GZIP, data, header)
+
+    deflated = raw[header_size:-8]
+    # the extra flags hint the level, 2 for the best and 4 for the fastest
+    for level in {2: (9,), 4: (1,)}.get(raw[8], ()) + (6, 9, 1, 5, 7, 8, 4, 3, 2):
+        if _deflate(data, level) == deflated:
+            return Content(MODE_GZIP, data, header, level)
+    return Content(MODE_RAW, raw)
+
+
+def make_signature(raw: bytes) -> bytes:
+    """signature of the receiver's version"""
+    content = _load(raw, reproducible=False)
+    data, block_size = content.data, _block_size(len(content.data))
+
+    blocks = [
+        SIGNATURE_BLOCK.pack(zlib.adler32(block), _strong(block))
+        for i in range(0, len(data), block_size)
+        if (block := data[i : i + block_size])
+    ]
+    header = SIGNATURE_HEADER.pack(b"CBS1", content.mode, block_size, len(blocks))
+    return header + b"".join(blocks)
+
+
+def make_delta(raw: bytes, signature: bytes) -> Optional[bytes]:
+    """delta of `raw` against the version `signature` was made from, None when
+    sending the whole file is as good
+    """
+    try:
+        magic, mode, block_size, count = SIGNATURE_HEADER.unpack_from(signature)
+    except struct.error:
+        raise DeltaError("invalid signature") from None
+    if magic != b"CBS1" or not block_size:
+        raise DeltaError("invalid signature")
+    if len(signature) < SIGNATURE_HEADER.size + count * SIGNATURE_BLOCK.size:
+        raise DeltaError("truncated signature")
+
+    content = _load(raw, reproducible=True)
+    if content.mode != mode:
+        return None
+
+    # the last block may be short, only full blocks are matched
+    table: dict[int, dict[bytes, int]] = {}
+    offset = SIGNATURE_HEADER.size
+    for index in range(count - 1 if count else 0):
+        weak, strong = SIGNATURE_BLOCK.unpack_from(
+            signature, offset + index * SIGNATURE_BLOCK.size
+        )
+        table.setdefault(weak, {}).setdefault(strong, index)
+
+    data = content.data
+    size, max_literal = len(data), len(data) * MAX_LITERAL_RATIO
+    header = DELTA_HEADER.pack(
+        b"CBD2",
+        mode,
+        content.level,
+        block_size,
+        len(content.header),
+    )
+    ops: list[bytes] = []
+    literal = 0
+    copy_start = copy_count = 0
+    start = pos = 0
+
+    def flush_literal(end: int) -> None:
+        nonlocal copy_count
+        if end > start:
+            if copy_count:
+                ops.append(COPY.pack(b"C", copy_start, copy_count))
+                copy_count = 0
+            ops.append(LITERAL.pack(b"L", end - start))
+            ops.append(data[start:end])
+
+    weak = zlib.adler32(data[:block_size]) if size >= block_size else 0
+    a, b = weak & 0xFFFF, weak >> 16
+    while pos + block_size <= size:
+        if (candidates := table.get(weak)) is not None and (
+            index := candidates.get(_strong(data[pos : pos + block_size]))
+        ) is not None:
+            flush_literal(pos)
+            if copy_count and copy_start + copy_count == index:
+                copy_count += 1
+            else:
+                if copy_count:
+                    ops.append(COPY.pack(b"C", copy_start, copy_count))
+                copy_start, copy_count = index, 1
+
+            pos += block_size
+            start = pos
+            weak = zlib.adler32(data[pos : pos + block_size])
+            a, b = weak & 0xFFFF, weak >> 16
+            continue
+
+        if (literal := literal + 1) > max_literal:
+            return None
+        if pos + block_size >= size:
+            break
+        # roll the window one byte
+        out, new = data[pos], data[pos + block_size]
+        a = (a - out + new) % ADLER_MOD
+        b = (b - block_size * out + a - 1) % ADLER_MOD
+        weak = a | b << 16
+        pos += 1
+
+    flush_literal(size)
+    if copy_count:
+        ops.append(COPY.pack(b"C", copy_start, copy_count))
+
+    result = header + content.header + _deflate(b"".join(ops), OPS_LEVEL)
+    if len(result) > len(raw) * MAX_LITERAL_RATIO:
+        return None
+    return result
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """rebuild the file from the receiver's version and a delta"""
+    try:
+        magic, mode, level, block_size, header_size = DELTA_HEADER.unpack_from(delta)
+    except struct.error:
+        raise DeltaError("invalid delta") from None
+    if magic != b"CBD2" or not block_size:
+        raise DeltaError("invalid delta")
+
+    base_content = _load(base, reproducible=False)
+    if base_content.mode != mode:
+        raise DeltaError("base changed")
+
+    pos = DELTA_HEADER.size
+    header = delta[pos : pos + header_size]
+    try:
+        view = memoryview(zlib.decompress(delta[pos + header_size :], -zlib.MAX_WBITS))
+    except zlib.error as e:
+        raise DeltaError(f"invalid delta: {e}") from None
+
+    base_data, pos, out = base_content.data, 0, bytearray()
+    try:
+        while pos < len(view):
+            if view[pos : pos + 1] == b"C":
+                _, index, count = COPY.unpack_from(view, pos)
+                pos += COPY.size
+                start = index * block_size
+                end = start + count * block_size
+                if end > len(base_data):
+                    raise DeltaError("copy out of range")
+                out += base_data[start:end]
+            else:
+                _, length = LITERAL.unpack_from(view, pos)
+                pos += LITERAL.size
+                if pos + length > len(view):
+                    raise DeltaError("truncated delta")
+                out += view[pos : pos + length]
+                pos += length
+    except struct.error as e:
+        raise DeltaError(f"truncated delta: {e}") from None
+
+    if mode == MODE_GZIP:
+        return _gzip(Content(mode, bytes(out), header, level))
+    return bytes(out)
@@ -0,0 +1,101 @@
+"""
+Directory sync, the files under a directory of `file_sync_path` are compared with
+the server's store by their manifests, `[path, size, mtime, hash]`, and only the
+missing or changed ones are transferred. A file changed on both sides goes from
+the side with the newer modification time, for the server the upload time.
+
+Deletions are not synced, without a record of the deleted files a file removed
+here cannot be told from one added elsewhere.
+"""
+
+from __future__ import annotations
+
+import os
+import posixpath
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from .file_index import FileIndex
+
+__all__ = (
+    "ManifestEntry",
+    "SyncPlan",
+    "normalize_dir",
+    "local_manifest",
+    "remote_manifest",
+    "diff_manifests",
+)
+
+# transfers and writes in progress
+SKIP_SUFFIXES = (".part", ".tmp")
+
+
+class ManifestEntry(NamedTuple):
+    path: str  # relative to `file_sync_path`
+    size: int
+    mtime: float
+    hash: str
+
+
+class SyncPlan(NamedTuple):
+    upload: list[str]
+    download: list[str]
+
+
+def normalize_dir(directory: str) -> Optional[str]:
+    """a directory relative to `file_sync_path`, "" for all of it, None when it
+    points outside
+    """
+    directory = posixpath.normpath(directory.replace("\\", "/").strip("/") or ".")
+    if directory == ".":
+        return ""
+    if directory == ".." or directory.startswith("../"):
+        return None
+    return directory
+
+
+def local_manifest(index: FileIndex, directory: str) -> dict[str, ManifestEntry]:
+    """only files changed since they were indexed are hashed"""
+    manifest = {}
+    for base, dirs, files in os.walk(index.root / directory):
+        dirs[:] = [i for i in dirs if not i.startswith(".")]
+        for name in files:
+            if name.startswith(".") or name.endswith(SKIP_SUFFIXES):
+                continue
+
+            path = Path(base) / name
+            try:
+                stat = path.stat()
+                file_hash = index.get_hash(path)
+            except OSError:
+                continue
+            key = index.key(path)
+            manifest[key] = ManifestEntry(key, stat.st_size, stat.st_mtime, file_hash)
+
+    index.save()
+    return manifest
+
+
+def remote_manifest(files: list[list]) -> dict[str, ManifestEntry]:
+    manifest = {}
+    for path, size, mtime, file_hash in files:
+        # pulled files are written under the same path
+        if normalize_dir(path) != path or not path:
+            continue
+        manifest[path] = ManifestEntry(path, size, mtime, file_hash)
+    return manifest
+
+
+def diff_manifests(
+    local: dict[str, ManifestEntry], remote: dict[str, ManifestEntry]
+) -> SyncPlan:
+    plan = SyncPlan([], [])
+    for path in sorted(local.keys() | remote.keys()):
+        mine, theirs = local.get(path), remote.get(path)
+        if theirs is None:
+            plan.upload.append(path)
+        elif mine is None:
+            plan.download.append(path)
+        elif mine.hash != theirs.hash:
+            (plan.upload if mine.mtime > theirs.mtime else plan.download).append(path)
+    return plan
@@ -0,0 +1,141 @@
+"""
+Content hash index of `file_sync_path`, so a synced file already held locally is
+not transferred again
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+__all__ = ("FileIndex",)
+
+READ_SIZE = 1024 * 1024
+
+
+class IndexEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    hash: str
+
+
+def hash_file(path: Path) -> str:
+    sha = hashlib.sha256()
+    with path.open("rb") as f:
+        while data := f.read(READ_SIZE):
+            sha.update(data)
+    return sha.hexdigest()
+
+
+class FileIndex:
+    """sha256 of the files under `root`, cached by size and modification time"""
+
+    def __init__(self, root: Path, cache_path: Optional[Path] = None) -> None:
+        self.root = root
+        self.cache_path = cache_path
+        self.entries: dict[str, IndexEntry] = {}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.dirty = False
+
+        # transfers skipped because the content was already here
+        self.hits = 0
+        self.misses = 0
+        self.saved_bytes = 0
+
+        self.load()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def key(self, path: Path) -> Optional[str]:
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            # outside the indexed directory
+            return None
+
+    def get_hash(self, path: Path) -> str:
+        """hash of the file, only read when changed since it was indexed"""
+        stat = path.stat()
+        if (key := self.key(path)) is None:
+            return hash_file(path)
+
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return entry.hash
+
+        file_hash = hash_file(path)
+        with self.lock:
+            self.entries[key] = IndexEntry(stat.st_size, stat.st_mtime_ns, file_hash)
+            self.dirty = True
+        return file_hash
+
+    def update(self, path: Path, file_hash: str) -> None:
+        """record a file whose hash is already known, e.g. after a transfer"""
+        if (key := self.key(path)) is None:
+            return
+
+        stat = path.stat()
+        with self.lock:
+            self.entries[key] = IndexEntry(stat.st_size, stat.st_mtime_ns, file_hash)
+            self.dirty = True
+        self.save()
+
+    def find(self, file_hash: str, size: int, suffix: str = "") -> Optional[Path]:
+        """a local file with this content, only files of the same size are hashed"""
+        if not self.root.is_dir():
+            return None
+
+        found = None
+        for path in self.root.rglob(f"*{suffix}"):
+            try:
+                if not path.is_file() or path.stat().st_size != size:
+                    continue
+                if self.get_hash(path) == file_hash:
+                    found = path
+                    break
+            except OSError:
+                continue
+
+        self.save()
+        return found
+
+    def record(self, hit: bool, size: int) -> None:
+        with self.lock:
+            if hit:
+                self.hits += 1
+                self.saved_bytes += size
+            else:
+                self.misses += 1
+
+    def load(self) -> None:
+        if self.cache_path is None or not self.cache_path.is_file():
+            return
+
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            self.entries = {k: IndexEntry(*v) for k, v in data.items()}
+        except (OSError, ValueError, TypeError):
+            self.entries = {}
+
+    def save(self) -> None:
+        if self.cache_path is None or not self.dirty:
+            return
+
+        with self.save_lock:
+            with self.lock:
+                data = json.dumps({k: list(v) for k, v in self.entries.items()})
+                self.dirty = False
+
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.tmp")
+            tmp_path.write_text(data, encoding="utf-8")
+            os.replace(tmp_path, self.cache_path)
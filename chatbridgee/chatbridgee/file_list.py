@@ -0,0 +1,147 @@
+"""
+In memory listing of `file_sync_path` for `!!sch list`, kept fresh by checking
+the modification time of each directory instead of walking every file
+"""
+
+from __future__ import annotations
+
+import os
+import posixpath
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+__all__ = ("FileInfo", "FileListIndex", "SORT_KEYS")
+
+
+class FileInfo(NamedTuple):
+    name: str  # relative to the root, without the extension
+    size: int
+    mtime: float
+
+
+class DirEntry(NamedTuple):
+    mtime_ns: int
+    files: dict[str, FileInfo]
+
+
+SORT_KEYS = {
+    "name": (lambda x: x.name.lower(), False),
+    "size": (lambda x: x.size, True),  # largest first
+    "date": (lambda x: x.mtime, True),  # newest first
+}
+
+
+class FileListIndex:
+    """
+    files are indexed per directory, a directory is only listed again when its
+    modification time changes, a file rewritten in place does not change it so
+    writers in this plugin call `update`
+    """
+
+    def __init__(self, root: Path, suffix: str) -> None:
+        self.root = root
+        self.suffix = suffix
+        self.dirs: dict[str, DirEntry] = {}  # "" is the root
+        self.sorted: dict[str, list[FileInfo]] = {}
+        self.lock = threading.Lock()
+
+    def files(
+        self, sort: str = "name", keyword: Optional[str] = None
+    ) -> list[FileInfo]:
+        """all files in `sort` order, filtered by a case insensitive `keyword`"""
+        key, reverse = SORT_KEYS[sort]
+        with self.lock:
+            self.refresh()
+            if (files := self.sorted.get(sort)) is None:
+                files = [
+                    i for entry in self.dirs.values() for i in entry.files.values()
+                ]
+                files.sort(key=key, reverse=reverse)
+                self.sorted[sort] = files
+
+        if keyword:
+            keyword = keyword.lower()
+            return [i for i in files if keyword in i.name.lower()]
+        return files
+
+    def update(self, path: Path) -> None:
+        """a file under the root was written or removed"""
+        try:
+            rel = path.parent.relative_to(self.root).as_posix()
+        except ValueError:
+            return
+        rel = "" if rel == "." else rel
+
+        with self.lock:
+            if (entry := self.dirs.get(rel)) is None:
+                # unknown directory, picked up by the next refresh
+                return
+            if not path.name.endswith(self.suffix):
+                return
+
+            try:
+                entry.files[path.name] = self.file_info(rel, path.name, path.stat())
+            except OSError:
+                entry.files.pop(path.name, None)
+            self.sorted.clear()
+
+    def refresh(self) -> None:
+        if not self.dirs:
+            self.scan_dir("")
+            return
+
+        for rel, entry in list(self.dirs.items()):
+            if rel not in self.dirs:
+                # dropped with its parent
+                continue
+            try:
+                mtime_ns = (self.root / rel).stat().st_mtime_ns
+            except OSError:
+                self.drop_dir(rel)
+                continue
+            if mtime_ns != entry.mtime_ns:
+                self.scan_dir(rel)
+
+    def scan_dir(self, rel: str) -> None:
+        path = self.root / rel
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            self.drop_dir(rel)
+            return
+
+        files, subdirs = {}, set()
+        for i in entries:
+            try:
+                if i.is_dir():
+                    subdirs.add(posixpath.join(rel, i.name))
+                elif i.is_file() and i.name.endswith(self.suffix):
+                    files[i.name] = self.file_info(rel, i.name, i.stat())
+            except OSError:
+                continue
+
+        self.dirs[rel] = DirEntry(mtime_ns, files)
+        self.sorted.clear()
+
+        for sub in list(self.dirs):
+            if sub != rel and posixpath.dirname(sub) == rel and sub not in subdirs:
+                self.drop_dir(sub)
+        for sub in subdirs:
+            if sub not in self.dirs:
+                self.scan_dir(sub)
+
+    def drop_dir(self, rel: str) -> None:
+        prefix = f"{rel}/" if rel else ""
+        for i in [i for i in self.dirs if i == rel or i.startswith(prefix)]:
+            del self.dirs[i]
+        self.sorted.clear()
+
+    def file_info(self, rel: str, name: str, stat: os.stat_result) -> FileInfo:
+        return FileInfo(
+            posixpath.join(rel, name.removesuffix(self.suffix)),
+            stat.st_size,
+            stat.st_mtime,
+        )
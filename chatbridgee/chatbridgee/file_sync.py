@@ -1,12 +1,39 @@
+import functools
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import NamedTuple
+from typing import Callable, Optional
 
-from mcdreforged.api.all import CommandSource, GreedyText, Literal, RColor, RText, RTextList, RAction
+from mcdreforged.api.all import (
+    AbstractNode,
+    CommandSource,
+    GreedyText,
+    Integer,
+    Literal,
+    RAction,
+    RColor,
+    RText,
+    RTextList,
+    Text,
+    new_thread,
+)
+from socketio import exceptions
 
+from .delta import MAX_FILE_SIZE, MIN_FILE_SIZE, make_signature
+from .dir_sync import diff_manifests, local_manifest, normalize_dir, remote_manifest
+from .file_index import FileIndex
+from .file_list import SORT_KEYS, FileInfo, FileListIndex
 from .plugin import META, BasePlugin, tr
-from .utils import FileEncode, format_size_number
+from .transfer import ACK_TIMEOUT, IncomingTransfer, OutgoingTransfer, TransferError, delta_transfer
+from .utils import FileChunk, FileEncode, format_size_number
+from .writer import FileWriter, WriteQueueFull
 
 PER_PAGE_SIZE = 10
+# seconds to wait for a file pulled by the directory sync
+PULL_TIMEOUT = 600
 
 
 def display_help(prefix: str, source: CommandSource):
@@ -19,7 +46,29 @@ class FileSyncPlugin(BasePlugin):
             return
 
         self.log.info(f"file sync path: {Path(self.config.file_sync_path).absolute()}")
+        self.incoming: dict[str, IncomingTransfer] = {}
+        # `file_sync` packets failing their checksum and transfers failing their
+        # size, hash or delta check
+        self.corrupt_files = 0
+        self.writer = FileWriter(
+            self.log,
+            self.config.file_sync_max_pending_writes,
+            self.config.file_sync_max_pending_size * 1024 * 1024,
+        )
+        self.index = FileIndex(
+            Path(self.config.file_sync_path),
+            Path(self.server.get_data_folder()) / "file_index.json",
+        )
+        self.files = FileListIndex(Path(self.config.file_sync_path), self.config.file_sync_extension)
+        # pulls waited for by the directory sync, by name
+        self.pulls: dict[str, Future] = {}
+        self.dir_sync_lock = threading.Lock()
+        self.dir_sync_stop = threading.Event()
         self.sio.on("file_sync", self.on_file_sync)
+        self.sio.on("file_transfer_begin", self.on_transfer_begin)
+        self.sio.on("file_chunk", self.on_file_chunk)
+        self.sio.on("file_transfer_end", self.on_transfer_end)
+        self.sio.on("file_available", self.on_file_available)
         self.server.register_help_message(
             self.config.file_sync_command_prefix,
             tr("file_help_summary"),
@@ -32,30 +81,268 @@ class FileSyncPlugin(BasePlugin):
                 .runs(self.on_command_send)
                 .then(GreedyText("filename").runs(self.on_command_send))
             )
+            .then(self.list_node(Literal("list"), self.on_command_list))
+            .then(Literal("search").then(self.list_node(Text("keyword"), self.on_command_search)))
+            .then(Literal("pull").then(GreedyText("name").runs(self.on_command_pull)))
+            .then(
+                Literal("remote")
+                .runs(self.on_command_remote)
+                .then(GreedyText("index").runs(self.on_command_remote))
+            )
             .then(
-                Literal("list")
-                .runs(self.on_command_list)
-                .then(GreedyText("index").runs(self.on_command_list))
+                Literal("dirsync")
+                .runs(self.on_command_dir_sync)
+                .then(GreedyText("directory").runs(self.on_command_dir_sync))
             )
+            .then(Literal("stats").runs(self.on_command_stats))
         )
+        if self.config.file_sync_dirs and self.config.file_sync_dir_interval > 0:
+            threading.Thread(target=self.dir_sync_loop, name="chatbridge-dir-sync", daemon=True).start()
+
+    def list_node(self, node: AbstractNode, callback: Callable) -> AbstractNode:
+        """`<node> [index]` and `<node> <name|size|date> [index]`"""
+        node.runs(callback).then(Integer("index").runs(callback))
+        for sort in SORT_KEYS:
+            sort_callback = functools.partial(callback, sort=sort)
+            node.then(Literal(sort).runs(sort_callback).then(Integer("index").runs(sort_callback)))
+        return node
 
     def on_file_sync(self, raw_data: bytes) -> None:
-        data = FileEncode.decode(raw_data)
+        if not self.config.file_sync_enabled:
+            self.log.info("chatbridgee 收到檔案同步請求，但檔案同步功能未啟用")
+            return
+
+        try:
+            data = FileEncode.decode(raw_data)
+        except (TypeError, ValueError) as e:
+            # nothing is written, a broken schematic is worse than none
+            self.corrupt_files += 1
+            self.log.error(f"收到損壞的檔案同步封包: {e}")
+            return
         root = False  # TODO add root option from flag
         file_path, server_name = data.path, data.server_name
 
+        path = (Path() if root else Path(self.config.file_sync_path)) / file_path
+
+        def done(error: Optional[OSError]) -> None:
+            if error is not None:
+                self.log.error(f"檔案寫入失敗 {path}: {error}")
+                self.from_server(server_name, f"檔案同步失敗 ({file_path})", color=RColor.red)
+                return
+
+            self.files.update(path)
+            self.from_server(
+                server_name,
+                f"Files are synchronized. [檔案同步完成] ({file_path})",
+                color=RColor.gold,
+            )
+
+        # written in the writer thread, other events are not held up
+        try:
+            self.writer.submit(path, data.data, done)
+        except WriteQueueFull as e:
+            self.log.error(f"檔案寫入佇列已滿, 捨棄 {file_path}: {e}")
+            self.from_server(server_name, f"檔案寫入佇列已滿, 同步失敗 ({file_path})", color=RColor.red)
+
+    def on_file_available(self, info: dict) -> None:
+        # only a notice, the content is pulled on demand
+        text = RText(
+            f"[{info.get('server_name')}] New file available - [新檔案可下載]: "
+            f"{info['name']} ({format_size_number(info['size'])})",
+            color=RColor.gold,
+        )
+        text.c(RAction.run_command, f"{self.config.file_sync_command_prefix} pull {info['name']}")
+        text.h(RText("點擊下載檔案", color=RColor.gold))
+        self.say(text)
+
+    def on_unload(self) -> None:
+        if self.config.file_sync_enabled:
+            self.dir_sync_stop.set()
+            self.writer.close()
+
+    def on_connect(self) -> None:
         if not self.config.file_sync_enabled:
-            self.log.info("chatbridgee 收到檔案同步請求，但檔案同步功能未啟用")
             return
 
-        path = (Path() if root else Path(self.config.file_sync_path)) / file_path
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("wb") as f:
-            f.write(data.data)
+        # ask for the chunks missed while disconnected
+        for transfer in list(self.incoming.values()):
+            self.request_resume(transfer)
+
+    def on_transfer_begin(self, info: dict) -> None:
+        if info["id"] in self.incoming:
+            return
+
+        path = Path(self.config.file_sync_path) / info["path"]
+        if (file_hash := info.get("hash")) and self.reuse_local(path, file_hash, info["size"]):
+            self.index.record(True, info["size"])
+            self.sio.emit("file_transfer_skip", {"id": info["id"]})
+            if self.settle_pull(info["path"]):
+                return
+            self.from_server(
+                info.get("server_name"),
+                f"Files are synchronized. [檔案同步完成] ({info['path']})",
+                color=RColor.gold,
+            )
+            return
+
+        self.index.record(False, info["size"])
+        self.incoming[info["id"]] = transfer = IncomingTransfer(info, path)
+        # only now the server starts sending the chunks
+        self.request_resume(transfer)
+
+    def reuse_local(self, path: Path, file_hash: str, size: int) -> bool:
+        """use a local file with the same content instead of transferring it"""
+        try:
+            if path.is_file() and path.stat().st_size == size and self.index.get_hash(path) == file_hash:
+                return True
+            if (source := self.index.find(file_hash, size, path.suffix)) is None:
+                return False
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.part")
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, path)
+            self.index.update(path, file_hash)
+            self.files.update(path)
+        except OSError as e:
+            self.log.warning(f"無法使用本地檔案 {path}: {e}")
+            return False
+
+        return True
+
+    def on_file_chunk(self, raw_data: bytes) -> dict:
+        """the return value is the acknowledgement, the server sends more chunks
+        while `next` follows the chunk
+        """
+        try:
+            chunk = FileChunk.decode(raw_data)
+        except ValueError as e:
+            self.log.debug(f"invalid file chunk: {e}")
+            return {"error": f"invalid chunk: {e}"}
+        if (transfer := self.incoming.get(chunk.id.hex())) is None:
+            return {"error": "unknown transfer"}
+
+        with transfer.accepting:
+            transfer.wait_turn(chunk)
+            if not transfer.expects(chunk):
+                # duplicate or its turn did not come, the server stops sending
+                # at it, asked again unless it is left from before the last resume
+                if (
+                    chunk.index >= transfer.resumed_at
+                    and self.incoming.get(transfer.id) is transfer
+                ):
+                    self.request_resume(transfer)
+                return {"next": transfer.next}
+
+            # written in the writer thread, other events are not held up
+            try:
+                self.writer.call(
+                    transfer.name,
+                    functools.partial(transfer.write, chunk),
+                    len(chunk.data),
+                    functools.partial(self.on_chunk_written, transfer),
+                )
+            except WriteQueueFull:
+                self.stall(transfer)
+                return {"next": transfer.next}
+
+            transfer.next += 1
+            transfer.accepting.notify_all()
+            return {"next": transfer.next}
+
+    def on_chunk_written(
+        self, transfer: IncomingTransfer, error: Optional[Exception]
+    ) -> None:
+        if error is None or self.incoming.pop(transfer.id, None) is None:
+            return
+
+        transfer.abort()
+        self.log.error(f"檔案寫入失敗 {transfer}: {error}")
+        if not self.settle_pull(transfer.name, error):
+            self.from_server(
+                transfer.server_name,
+                f"檔案同步失敗 ({transfer.name})",
+                color=RColor.red,
+            )
+
+    def stall(self, transfer: IncomingTransfer) -> None:
+        """the writer is full, ask for the rest once it has written half"""
+        if transfer.stalled:
+            return
+        transfer.stalled = True
+
+        def resume() -> None:
+            transfer.stalled = False
+            if self.incoming.get(transfer.id) is transfer:
+                self.request_resume(transfer)
+
+        self.writer.when_ready(resume)
+
+    def on_transfer_end(self, info: dict) -> None:
+        if (transfer := self.incoming.get(info["id"])) is None:
+            return
+
+        if transfer.received:
+            self.finish_transfer(transfer)
+        else:
+            self.request_resume(transfer)
+
+    def request_resume(self, transfer: IncomingTransfer) -> None:
+        def callback(result: Optional[dict] = None) -> None:
+            if not result or result.get("error"):
+                self.log.warning(f"檔案傳輸無法繼續 {transfer}: {result}")
+                if self.incoming.pop(transfer.id, None) is not None:
+                    transfer.abort()
+                    self.settle_pull(transfer.name, TransferError(f"transfer aborted: {result}"))
+
+        with transfer.accepting:
+            transfer.resumed_at = transfer.next
+            self.sio.emit(
+                "file_transfer_resume",
+                {"id": transfer.id, "next": transfer.next},
+                callback=callback,
+            )
+
+    def finish_transfer(self, transfer: IncomingTransfer) -> None:
+        if self.incoming.pop(transfer.id, None) is None:
+            return
+
+        def finish() -> None:
+            transfer.finish()
+            self.files.update(transfer.path)
+            if transfer.hash:
+                self.index.update(transfer.path, transfer.hash)
 
+        # after its chunks in the writer thread, they are already accepted
+        self.writer.call(
+            transfer.name,
+            finish,
+            0,
+            functools.partial(self.on_transfer_finished, transfer),
+            force=True,
+        )
+
+    def on_transfer_finished(
+        self, transfer: IncomingTransfer, error: Optional[Exception]
+    ) -> None:
+        if error is not None:
+            if isinstance(error, TransferError):
+                self.corrupt_files += 1
+            if transfer.base is not None:
+                # e.g. the local file changed since the pull
+                self.log.warning(f"檔案差異同步失敗 {transfer}: {error}, 改為完整下載")
+                self.pull(None, transfer.name, delta=False)
+                return
+            self.log.error(f"檔案同步失敗 {transfer}: {error}")
+            self.settle_pull(transfer.name, error)
+            return
+
+        if self.settle_pull(transfer.name):
+            # reported by the directory sync
+            return
         self.from_server(
-            server_name,
-            f"Files are synchronized. [檔案同步完成] ({file_path})",
+            transfer.server_name,
+            f"Files are synchronized. [檔案同步完成] ({transfer.name})",
             color=RColor.gold,
         )
 
@@ -73,30 +360,205 @@ class FileSyncPlugin(BasePlugin):
             source.reply(RText("檔案未找到", color=RColor.red))
             return
 
-        self.sio.emit("file_sync", FileEncode(filename, path.read_bytes()).encode())
+        self.send_file(source, path, filename)
+
+    @new_thread("chatbridge-file-sync")
+    def send_file(self, source: CommandSource, path: Path, filename: str) -> None:
+        try:
+            self.upload(path, filename)
+        except (OSError, TransferError) as e:
+            source.reply(RText(f"檔案傳送失敗: {e}", color=RColor.red))
+            return
 
         source.reply("檔案傳送完成")
 
-    class FileInfo(NamedTuple):
-        name: str
-        size: int
+    def upload(self, path: Path, filename: str, *, announce: bool = True) -> None:
+        """blocking, raises `OSError` or `TransferError`"""
+        # chunked, the file is never read into memory at once, except for a delta
+        # against the version the server holds
+        file_hash = self.index.get_hash(path)
+        if (transfer := delta_transfer(self.sio, path, filename, file_hash, announce=announce)) is not None:
+            try:
+                transfer.send()
+                return
+            except TransferError as e:
+                self.log.warning(f"檔案差異傳送失敗 {filename}: {e}, 改為完整傳送")
+        OutgoingTransfer(self.sio, path, filename, file_hash=file_hash, announce=announce).send()
+
+    def on_command_pull(self, source: CommandSource, ctx: dict) -> None:
+        self.pull(source, str(ctx["name"]))
+
+    @new_thread("chatbridge-file-sync")
+    def pull(self, source: Optional[CommandSource], name: str, *, delta: bool = True) -> None:
+        info = {"name": name}
+        path = Path(self.config.file_sync_path) / name
+        # an older version here is updated with a delta
+        try:
+            if delta and path.is_file() and MIN_FILE_SIZE <= path.stat().st_size <= MAX_FILE_SIZE:
+                info.update(base=self.index.get_hash(path), signature=make_signature(path.read_bytes()))
+        except OSError as e:
+            self.log.warning(f"無法讀取本地檔案 {path}: {e}")
+
+        def callback(result: Optional[dict] = None) -> None:
+            if not result or (error := result.get("error")):
+                message = f"檔案下載失敗: {name} ({result and error})"
+                if self.settle_pull(name, TransferError(message)):
+                    return
+                if source is None:
+                    self.log.error(message)
+                else:
+                    source.reply(RText(message, color=RColor.red))
+
+        # the file arrives as a transfer, see `on_transfer_begin`
+        self.sio.emit("file_pull", info, callback=callback)
+        if source is not None:
+            source.reply(RText(f"開始下載檔案: {name}", color=RColor.gray))
+
+    def fetch(self, name: str) -> None:
+        """pull a file and wait until it is written, raises `TransferError`"""
+        future = self.pulls[name] = Future()
+        self.pull(None, name)
+        try:
+            future.result(PULL_TIMEOUT)
+        except FutureTimeoutError:
+            self.pulls.pop(name, None)
+            raise TransferError("pull timed out") from None
+
+    def settle_pull(self, name: str, error: Optional[Exception] = None) -> bool:
+        """finish a pull waited for by `fetch`, False when nobody waits for it"""
+        if (future := self.pulls.pop(name, None)) is None:
+            return False
+
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+        return True
+
+    def on_command_dir_sync(self, source: CommandSource, ctx: dict = {}) -> None:
+        if "directory" in ctx:
+            directories = [str(ctx["directory"])]
+        elif not (directories := self.config.file_sync_dirs):
+            source.reply(RText(tr("no_args").format(arg="directory"), color=RColor.red))
+            return
+
+        self.sync_dirs(source, directories)
+
+    def dir_sync_loop(self) -> None:
+        interval = self.config.file_sync_dir_interval * 60
+        while not self.dir_sync_stop.wait(interval):
+            if self.sio.connected:
+                self.sync_dirs(None, self.config.file_sync_dirs)
+
+    @new_thread("chatbridge-dir-sync")
+    def sync_dirs(self, source: Optional[CommandSource], directories: list[str]) -> None:
+        def reply(message: str, color: RColor = RColor.gold) -> None:
+            if source is None:
+                self.log.info(message)
+            else:
+                source.reply(RText(message, color=color))
+
+        # the scheduled sync and the command do not run at once
+        if not self.dir_sync_lock.acquire(blocking=False):
+            reply("目錄同步進行中", RColor.red)
+            return
+
+        try:
+            for directory in directories:
+                if (name := normalize_dir(directory)) is None:
+                    reply(f"目錄不在檔案同步路徑中: {directory}", RColor.red)
+                    continue
+                try:
+                    uploaded, downloaded, failed = self.sync_dir(name)
+                except TransferError as e:
+                    reply(f"目錄同步失敗 {directory}: {e}", RColor.red)
+                    continue
+                if uploaded or downloaded or failed or source is not None:
+                    reply(
+                        f"目錄同步完成 {directory or '/'}: 上傳 {uploaded}, 下載 {downloaded}, 失敗 {failed}",
+                        RColor.red if failed else RColor.gold,
+                    )
+        finally:
+            self.dir_sync_lock.release()
+
+    def sync_dir(self, directory: str) -> tuple[int, int, int]:
+        """transfer the files differing from the server, returns the number of
+        uploaded, downloaded and failed files
+        """
+        try:
+            result = self.sio.call("file_manifest", {"prefix": directory}, timeout=ACK_TIMEOUT) or {}
+        except exceptions.SocketIOError as e:
+            raise TransferError(f"manifest request failed: {e!r}") from None
+        if "files" not in result:
+            raise TransferError(result.get("error") or "manifest request failed")
+
+        plan = diff_manifests(local_manifest(self.index, directory), remote_manifest(result["files"]))
+        root = Path(self.config.file_sync_path)
+        with ThreadPoolExecutor(self.config.file_sync_dir_concurrency, "chatbridge-dir-sync") as executor:
+            jobs = [executor.submit(self.upload, root / i, i, announce=False) for i in plan.upload]
+            jobs += [executor.submit(self.fetch, i) for i in plan.download]
+
+        done = [0, 0]
+        for i, (path, job) in enumerate(zip(plan.upload + plan.download, jobs)):
+            if (error := job.exception()) is not None:
+                self.log.warning(f"目錄同步檔案失敗 {path}: {error}")
+            else:
+                done[i >= len(plan.upload)] += 1
+        return done[0], done[1], len(jobs) - sum(done)
+
+    def on_command_remote(self, source: CommandSource, ctx: dict = {}) -> None:
+        def callback(result: Optional[dict] = None) -> None:
+            files = (result or {}).get("files")
+            if not files:
+                source.reply(RText("There are no files on the server - [伺服器上沒有檔案]", color=RColor.red))
+                return
+
+            def render(i: int, info: dict) -> RTextList:
+                line = RTextList(RText("- ", color=RColor.gray))
+                line.append(RText(f"[{i:02d}] ", color=RColor.gold))
+                line.append(RText(f"{info['name']}\n", color=RColor.green))
+                line.c(RAction.suggest_command, f"{self.config.file_sync_command_prefix} pull {info['name']}")
+                line.h(
+                    RText(
+                        f"點擊下載檔案 ({format_size_number(info['size'])}, {info.get('server_name') or '-'})",
+                        color=RColor.gold,
+                    )
+                )
+                return line
 
-        @classmethod
-        def from_path(cls, path: Path, file_sync_extension: str) -> "FileSyncPlugin.FileInfo":
-            return cls(
-                path.relative_to(path.parent).as_posix().removesuffix(file_sync_extension),
-                path.stat().st_size,
+            self.reply_page(source, "remote", "A list of server files - [伺服器檔案列表]", files, ctx, render)
+
+        self.sio.emit("file_store_list", {}, callback=callback)
+
+    def on_command_stats(self, source: CommandSource) -> None:
+        index = self.index
+        source.reply(
+            RText(
+                f"檔案同步快取命中率 {index.hit_rate:.1%} "
+                f"(命中 {index.hits} / 未命中 {index.misses}), "
+                f"節省 {format_size_number(index.saved_bytes)}, "
+                f"損壞檔案 {self.corrupt_files}",
+                color=RColor.gold,
             )
+        )
 
-    def get_dir_files(self, path: Path) -> list[FileInfo]:
-        return [
-            self.FileInfo.from_path(file_path, self.config.file_sync_extension)
-            for file_path in path.rglob(f"*{self.config.file_sync_extension}")
-        ]
+    def on_command_list(self, source: CommandSource = None, ctx: dict = {}, *, sort: str = "name") -> None:
+        self.reply_files(source, ctx, sort, "list" if sort == "name" else f"list {sort}")
 
-    def on_command_list(self, source: CommandSource = None, ctx: dict = {}) -> None:
-        config = self.config
-        path, index = Path(config.file_sync_path), ctx.get("index", 1)
+    def on_command_search(self, source: CommandSource, ctx: dict, *, sort: str = "name") -> None:
+        keyword = ctx["keyword"]
+        command = f"search {keyword}" if sort == "name" else f"search {keyword} {sort}"
+        self.reply_files(source, ctx, sort, command, keyword)
+
+    def reply_files(
+        self,
+        source: CommandSource,
+        ctx: dict,
+        sort: str,
+        command: str,
+        keyword: Optional[str] = None,
+    ) -> None:
+        path = Path(self.config.file_sync_path)
         if not path.is_dir():
             err_msg = RText(
                 "The archive directory was not found - [檔案目錄未找到]",
@@ -105,30 +567,53 @@ class FileSyncPlugin(BasePlugin):
             source.reply(err_msg)
             return
 
-        try:
-            index = int(index)
-            if index < 1:
-                raise ValueError
-        except ValueError:
+        # only directories changed since the last listing are read again
+        files = self.files.files(sort, keyword)
+        if not files:
             err_msg = RText(
-                "The index must be an integer - [索引必須為正整數]",
+                "There is no such archive in the archive catalog - [檔案目錄中沒有這樣的檔案]",
                 color=RColor.red,
             )
             source.reply(err_msg)
             return
 
-        files = self.get_dir_files(path)
-        if not files:
+        def render(i: int, file: FileInfo) -> RTextList:
+            line = RTextList(RText("- ", color=RColor.gray))
+            line.append(RText(f"[{i:02d}] ", color=RColor.gold))
+            line.append(RText(f"{file.name}\n", color=RColor.green))
+            line.c(
+                RAction.suggest_command,
+                f"{self.config.file_sync_command_prefix} sync {file.name}",
+            )
+            line.h(RText(f"點擊傳送檔案 ({format_size_number(file.size)})", color=RColor.gold))
+            return line
+
+        self.reply_page(source, command, "A list of files - [檔案列表]", files, ctx, render)
+
+    def reply_page(
+        self,
+        source: CommandSource,
+        command: str,
+        title: str,
+        items: list,
+        ctx: dict,
+        render: Callable[[int, object], RTextList],
+    ) -> None:
+        try:
+            index = int(ctx.get("index", 1))
+            if index < 1:
+                raise ValueError
+        except ValueError:
             err_msg = RText(
-                "There is no such archive in the archive catalog - [檔案目錄中沒有這樣的檔案]",
+                "The index must be an integer - [索引必須為正整數]",
                 color=RColor.red,
             )
             source.reply(err_msg)
             return
 
-        files_len = len(files)
+        items_len = len(items)
         start = (index - 1) * PER_PAGE_SIZE
-        if files_len < start:
+        if items_len < start:
             err_msg = RText(
                 "The index is out of range - [索引超出範圍]",
                 color=RColor.red,
@@ -137,25 +622,17 @@ class FileSyncPlugin(BasePlugin):
             return
         end = start + PER_PAGE_SIZE
 
-        text = RTextList(RText("A list of files - [檔案列表]: \n", color=RColor.gray))
-        for i, (file_name, size) in enumerate(files[start:end]):
-            component1 = RTextList(RText("- ", color=RColor.gray))
-            component1.append(RText(f"[{start+i+1:02d}] ", color=RColor.gold))
-            component1.append(RText(f"{file_name}\n", color=RColor.green))
-            component1.c(
-                RAction.suggest_command,
-                f"{self.config.file_sync_command_prefix} sync {file_name}",
-            )
-            component1.h(RText(f"點擊傳送檔案 ({format_size_number(size)})", color=RColor.gold))
-            text.append(component1)
+        text = RTextList(RText(f"{title}: \n", color=RColor.gray))
+        for i, item in enumerate(items[start:end]):
+            text.append(render(start + i + 1, item))
 
-        max_page = (files_len - 1) // PER_PAGE_SIZE + 1
+        max_page = (items_len - 1) // PER_PAGE_SIZE + 1
         component2 = RTextList(RText("----", color=RColor.yellow))
         if index > 1:
             component3 = RTextList(RText(" <<<", color=RColor.gold))
             component3.c(
                 RAction.run_command,
-                f"{self.config.file_sync_command_prefix} list {index - 1}",
+                f"{self.config.file_sync_command_prefix} {command} {index - 1}",
             )
             component3.h(RText("上一頁", color=RColor.gold))
             component2.append(component3)
@@ -168,7 +645,7 @@ class FileSyncPlugin(BasePlugin):
             component3 = RTextList(RText(">>> ", color=RColor.gold))
             component3.c(
                 RAction.run_command,
-                f"{self.config.file_sync_command_prefix} list {index + 1}",
+                f"{self.config.file_sync_command_prefix} {command} {index + 1}",
             )
             component3.h(RText("下一頁", color=RColor.gold))
             component2.append(component3)
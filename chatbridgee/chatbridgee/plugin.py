@@ -35,6 +35,12 @@ class BasePlugin(ABC):
     def setup(self) -> None:
         pass
 
+    def on_connect(self) -> None:
+        """called after every (re)connect to the server"""
+
+    def on_unload(self) -> None:
+        """called when the plugin is unloaded"""
+
     def say(self, msg: str) -> None:
         self.server.broadcast(msg)
 
@@ -0,0 +1,288 @@
+"""
+Chunked file transfer, client side of `server.core.transfer`
+"""
+
+from __future__ import annotations
+
+import functools
+import io
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+import socketio
+from socketio import exceptions
+
+from .delta import MAX_FILE_SIZE, MIN_FILE_SIZE, DeltaError, apply_delta, make_delta
+from .file_index import hash_file
+from .utils import FileChunk
+
+__all__ = (
+    "CHUNK_SIZE",
+    "TransferError",
+    "OutgoingTransfer",
+    "IncomingTransfer",
+    "delta_transfer",
+)
+
+CHUNK_SIZE = 256 * 1024
+# chunks sent before waiting for an acknowledgement
+WINDOW_SIZE = 8
+ACK_TIMEOUT = 30
+RECONNECT_TIMEOUT = 120
+# seconds a received chunk waits for the one before it, see `IncomingTransfer`
+REORDER_TIMEOUT = 5
+# rounds without progress before giving up
+MAX_RETRIES = 5
+
+
+class TransferError(Exception):
+    pass
+
+
+class OutgoingTransfer:
+    def __init__(
+        self,
+        sio: socketio.Client,
+        path: Path,
+        name: str,
+        *,
+        flag: int = 0,
+        chunk_size: int = CHUNK_SIZE,
+        file_hash: Optional[str] = None,
+        delta: Optional[bytes] = None,
+        base: Optional[str] = None,
+        announce: bool = True,
+    ) -> None:
+        self.sio = sio
+        self.path = path
+        self.name = name
+        self.flag = flag
+        self.hash = file_hash
+        self.chunk_size = chunk_size
+        self.id = uuid.uuid4()
+        self.size = path.stat().st_size
+        # sent instead of the file, against the server's version `base`
+        self.delta = delta
+        self.base = base
+        # false for directory sync, the other clients are not notified
+        self.announce = announce
+
+    @property
+    def body_size(self) -> int:
+        return self.size if self.delta is None else len(self.delta)
+
+    @property
+    def chunks(self) -> int:
+        return -(-self.body_size // self.chunk_size)
+
+    def info(self) -> dict:
+        info = {
+            "id": self.id.hex,
+            "path": self.name,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "flag": self.flag,
+            # sha256, receivers holding the same content skip the transfer
+            "hash": self.hash,
+            "announce": self.announce,
+        }
+        if self.delta is not None:
+            info.update(base=self.base, body_size=self.body_size)
+        return info
+
+    def call(self, event: str, data: dict) -> dict:
+        """emit and wait for the acknowledgement, waits for a reconnect first"""
+        deadline = time.monotonic() + RECONNECT_TIMEOUT
+        while not self.sio.connected:
+            if time.monotonic() > deadline:
+                raise TransferError("connection lost")
+            time.sleep(1)
+
+        result = self.sio.call(event, data, timeout=ACK_TIMEOUT) or {}
+        if error := result.get("error"):
+            raise TransferError(error)
+        return result
+
+    def send(self) -> None:
+        """send the whole file, blocking, resumes from the server's position"""
+        retries, position = 0, -1
+        with self.path.open("rb") if self.delta is None else io.BytesIO(self.delta) as f:
+            while True:
+                try:
+                    # also the resume point after a reconnect
+                    next_index = self.call("file_transfer_begin", self.info())["next"]
+                    if next_index >= self.chunks:
+                        break
+
+                    retries = 0 if next_index > position else retries + 1
+                    position = next_index
+                    self.send_chunks(f, next_index)
+                except exceptions.SocketIOError:
+                    retries += 1
+
+                if retries > MAX_RETRIES:
+                    raise TransferError(f"no progress after {MAX_RETRIES} retries")
+
+            self.call("file_transfer_end", {"id": self.id.hex})
+
+    def send_chunks(self, f: BinaryIO, start: int) -> None:
+        """send from `start` with a window of unacknowledged chunks, returns on the
+        first rejected chunk or timeout so `send` continues from the server's position
+        """
+        window = threading.Semaphore(WINDOW_SIZE)
+        rejected = threading.Event()
+
+        def on_ack(index: int, result: Optional[dict] = None) -> None:
+            if not result or result.get("next") != index + 1:
+                rejected.set()
+            window.release()
+
+        f.seek(start * self.chunk_size)
+        for index in range(start, self.chunks):
+            if not window.acquire(timeout=ACK_TIMEOUT) or rejected.is_set():
+                return
+
+            chunk = FileChunk(self.id.bytes, index, f.read(self.chunk_size))
+            self.sio.emit(
+                "file_chunk",
+                chunk.encode(),
+                callback=functools.partial(on_ack, index),
+            )
+
+        # wait for the last window
+        for _ in range(WINDOW_SIZE):
+            if not window.acquire(timeout=ACK_TIMEOUT):
+                return
+
+
+class IncomingTransfer:
+    """
+    chunks are accepted in order by the socketio handler (`next`) and written to
+    `<path>.part` later by the `FileWriter` thread (`written`)
+
+    each event is handled in its own thread, a chunk overtaking the one before it
+    waits for its turn on `accepting` up to `REORDER_TIMEOUT`
+    """
+
+    def __init__(self, info: dict, path: Path) -> None:
+        self.id: str = info["id"]
+        self.name: str = info["path"]
+        self.size: int = info["size"]
+        self.chunk_size: int = info["chunk_size"]
+        self.flag: int = info.get("flag", 0)
+        self.hash: Optional[str] = info.get("hash")
+        self.server_name: str = info.get("server_name")
+        # the body is a delta against the local file with the hash `base`
+        self.base: Optional[str] = info.get("base")
+        self.body_size: int = info.get("body_size", self.size)
+
+        self.path = path
+        self.part_path = path.with_name(f"{path.name}.part")
+        self.next = 0  # chunks before this index are accepted
+        self.written = 0
+        # guards `next` and `resumed_at`, reentrant
+        self.accepting = threading.Condition()
+        # `next` when the chunks were last asked for, earlier ones are left from
+        # the sending that resume replaced
+        self.resumed_at = 0
+        # waiting for the writer, see `FileWriter.when_ready`
+        self.stalled = False
+        self.lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = self.part_path.open("wb")
+
+    @property
+    def chunks(self) -> int:
+        return -(-self.body_size // self.chunk_size)
+
+    @property
+    def received(self) -> bool:
+        """every chunk is accepted"""
+        return self.next >= self.chunks
+
+    def expects(self, chunk: FileChunk) -> bool:
+        return chunk.index == self.next < self.chunks and not self.file.closed
+
+    def wait_turn(self, chunk: FileChunk) -> None:
+        """with `accepting` held"""
+        self.accepting.wait_for(
+            lambda: chunk.index <= self.next or self.file.closed, REORDER_TIMEOUT
+        )
+
+    def write(self, chunk: FileChunk) -> None:
+        """blocking, in the writer thread"""
+        with self.lock:
+            # aborted meanwhile
+            if self.file.closed:
+                return
+
+            self.file.seek(chunk.index * self.chunk_size)
+            self.file.write(chunk.data)
+            self.written += 1
+
+    def finish(self) -> None:
+        with self.lock:
+            self.file.close()
+        if (size := self.part_path.stat().st_size) != self.body_size:
+            self.abort()
+            raise TransferError(f"size mismatch, {size} != {self.body_size}")
+        if self.base is not None:
+            try:
+                self.part_path.write_bytes(apply_delta(self.path.read_bytes(), self.part_path.read_bytes()))
+            except (OSError, DeltaError) as e:
+                self.abort()
+                raise TransferError(f"invalid delta: {e}")
+        if self.hash and (file_hash := hash_file(self.part_path)) != self.hash:
+            self.abort()
+            raise TransferError(f"hash mismatch, {file_hash} != {self.hash}")
+
+        os.replace(self.part_path, self.path)
+
+    def abort(self) -> None:
+        with self.lock:
+            self.file.close()
+        self.part_path.unlink(missing_ok=True)
+
+    def __str__(self) -> str:
+        return (
+            f"<IncomingTransfer id={self.id} path={self.name} "
+            f"received={self.next}/{self.chunks} written={self.written}>"
+        )
+
+    __repr__ = __str__
+
+
+def delta_transfer(
+    sio: socketio.Client,
+    path: Path,
+    name: str,
+    file_hash: str,
+    *,
+    announce: bool = True,
+) -> Optional[OutgoingTransfer]:
+    """a transfer of the changes against the server's version of `name`, None when
+    the server has no usable version
+    """
+    if not MIN_FILE_SIZE <= path.stat().st_size <= MAX_FILE_SIZE:
+        return None
+
+    try:
+        result = sio.call("file_signature", {"name": name}, timeout=ACK_TIMEOUT) or {}
+    except exceptions.SocketIOError:
+        return None
+    if not (signature := result.get("signature")):
+        return None
+
+    try:
+        delta = make_delta(path.read_bytes(), signature)
+    except DeltaError:
+        return None
+    if delta is None:
+        return None
+
+    return OutgoingTransfer(sio, path, name, file_hash=file_hash, delta=delta, base=result["hash"], announce=announce)
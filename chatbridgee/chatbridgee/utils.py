@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import struct
+import zlib
 from io import BytesIO as IoBytesIO
 from pathlib import Path
+from typing import NamedTuple
 
 __all__ = (
     "format_size_number",
     "BytesIO",
+    "FLAG_CHECKSUM",
     "FileEncode",
+    "FileChunk",
 )
 
 
@@ -34,17 +39,85 @@ class BytesIO(IoBytesIO):
         return len(self)
 
 
+# flag bit of version 2 packets, which carry a checksum
+FLAG_CHECKSUM = 0x80
+
+_FILE_HEAD = struct.Struct(">BH")  # flag, path length
+_FILE_DATA_LENGTH = struct.Struct(">I")
+_FILE_DATA_HEAD = struct.Struct(">II")  # data length, checksum
+_FILE_NAME_LENGTH = struct.Struct(">H")
+
+
+def _file_checksum(path: bytes | memoryview, data: bytes | memoryview) -> int:
+    return zlib.crc32(data, zlib.crc32(path))
+
+
+class _FileHeader(NamedTuple):
+    flag: int
+    path: str
+    data_start: int
+    data_end: int
+    server_name: str | None
+
+
+def _parse_file_header(view: memoryview) -> _FileHeader:
+    """parse and verify a `FileEncode` packet without copying the data"""
+    try:
+        flag, path_length = _FILE_HEAD.unpack_from(view)
+        offset = _FILE_HEAD.size
+        path_view = view[offset : offset + path_length]
+        offset += path_length
+
+        if flag & FLAG_CHECKSUM:
+            data_length, checksum = _FILE_DATA_HEAD.unpack_from(view, offset)
+            data_start = offset + _FILE_DATA_HEAD.size
+        else:
+            (data_length,) = _FILE_DATA_LENGTH.unpack_from(view, offset)
+            data_start, checksum = offset + _FILE_DATA_LENGTH.size, None
+        data_end = data_start + data_length
+        if data_end > len(view):
+            raise ValueError("file data is truncated")
+
+        server_name = None
+        if data_end < len(view):
+            (name_length,) = _FILE_NAME_LENGTH.unpack_from(view, data_end)
+            name_start = data_end + _FILE_NAME_LENGTH.size
+            if name_start + name_length > len(view):
+                raise ValueError("server name is truncated")
+            server_name = str(view[name_start : name_start + name_length], "utf-8")
+    except struct.error:
+        raise ValueError("file packet is truncated") from None
+
+    if checksum is not None and checksum != _file_checksum(
+        path_view,
+        view[data_start:data_end],
+    ):
+        raise ValueError("file checksum mismatch")
+
+    return _FileHeader(
+        flag & ~FLAG_CHECKSUM,
+        str(path_view, "utf-8"),
+        data_start,
+        data_end,
+        server_name,
+    )
+
+
 class FileEncode:
     """
-    | `offset` | `bytes` | `description`          |
-    | -------- | ------- | ---------------------- |
-    | `0`      | `1`     | flag                   |
-    | `1`      | `2`     | path length (n)        |
-    | `3`      | `n`     | path                   |
-    | `3+n`    | `4`     | data length (m)        |
-    | `7+n`    | `m`     | data                   |
-    | `7+n+m`  | `2`     | server name length (o) |
-    | `9+n+m`  | `o`     | server name            |
+    | `offset`  | `bytes` | `description`                   |
+    | --------- | ------- | ------------------------------- |
+    | `0`       | `1`     | flag                            |
+    | `1`       | `2`     | path length (n)                 |
+    | `3`       | `n`     | path                            |
+    | `3+n`     | `4`     | data length (m)                 |
+    | `7+n`     | `c`     | crc32 of the path and data      |
+    | `7+n+c`   | `m`     | data                            |
+    | `7+n+c+m` | `2`     | server name length (o)          |
+    | `9+n+c+m` | `o`     | server name, set by the server  |
+
+    `c` is 4 when the flag has `FLAG_CHECKSUM`, packets without it (version 1) are
+    still decoded, `flag` holds the other bits
     """
 
     def __init__(
@@ -60,30 +133,27 @@ class FileEncode:
         self.flag = flag
         self.server_name = server_name
 
-    def encode(self) -> bytes:
-        data = (
-            # flag (1)
-            self.flag.to_bytes(1, "big")
-            # [n] path length (2)
-            + len(path_bytes := self.path.encode(encoding="utf-8")).to_bytes(2, "big")
-            # path (n)
-            + path_bytes
-            # [m] data length (4)
-            + len(data_bytes := self.data).to_bytes(4, "big")
-            # data (m)
-            + data_bytes
+    def encode(self) -> bytearray:
+        path_bytes = self.path.encode("utf-8")
+        name_bytes = self.server_name.encode("utf-8") if self.server_name else b""
+        data_start = _FILE_HEAD.size + len(path_bytes) + _FILE_DATA_HEAD.size
+        data_end = data_start + len(self.data)
+
+        # written in place, the data is copied once
+        buffer = bytearray(data_end + (_FILE_NAME_LENGTH.size + len(name_bytes) if name_bytes else 0))
+        _FILE_HEAD.pack_into(buffer, 0, self.flag | FLAG_CHECKSUM, len(path_bytes))
+        buffer[_FILE_HEAD.size : _FILE_HEAD.size + len(path_bytes)] = path_bytes
+        _FILE_DATA_HEAD.pack_into(
+            buffer,
+            data_start - _FILE_DATA_HEAD.size,
+            len(self.data),
+            _file_checksum(path_bytes, self.data),
         )
-        if self.server_name:
-            data += (
-                # [o] server name length
-                len(server_name_bytes := self.server_name.encode("utf-8")).to_bytes(
-                    2,
-                    "big",
-                )
-                # server name (o)
-                + server_name_bytes
-            )
-        return data
+        buffer[data_start:data_end] = self.data
+        if name_bytes:
+            _FILE_NAME_LENGTH.pack_into(buffer, data_end, len(name_bytes))
+            buffer[data_end + _FILE_NAME_LENGTH.size :] = name_bytes
+        return buffer
 
     def __str__(self) -> str:
         return f"<FileEncode path={self.path} flag={self.flag} " f"server_name={self.server_name}>"
@@ -92,11 +162,55 @@ class FileEncode:
 
     @classmethod
     def decode(cls, raw_data: bytes) -> "FileEncode":
-        """encode to data"""
-        with BytesIO(raw_data) as bio:
-            flag = int.from_bytes(bio.read(1), "big")
-            path = bio.read(int.from_bytes(bio.read(2), "big")).decode("utf-8")
-            data = bio.read(int.from_bytes(bio.read(4), "big"))
-            server_name = None if bio.end else bio.read(int.from_bytes(bio.read(2), "big")).decode("utf-8")
-
-            return cls(path, data, flag=flag, server_name=server_name)
+        """decode a packet, raises `ValueError` when it is truncated or corrupt"""
+        view = memoryview(raw_data)
+        header = _parse_file_header(view)
+
+        return cls(
+            header.path,
+            bytes(view[header.data_start : header.data_end]),
+            flag=header.flag,
+            server_name=header.server_name,
+        )
+
+
+class FileChunk:
+    """
+    one chunk of a chunked file transfer, see `chatbridgee.transfer`
+
+    | `offset` | `bytes` | `description` |
+    | -------- | ------- | ------------- |
+    | `0`      | `16`    | transfer id   |
+    | `16`     | `4`     | chunk index   |
+    | `20`     | `n`     | data          |
+    """
+
+    HEADER_SIZE = 20
+
+    def __init__(self, id: bytes, index: int, data: bytes) -> None:
+        self.id = id
+        self.index = index
+        self.data = data
+
+    def encode(self) -> bytes:
+        return self.id + self.index.to_bytes(4, "big") + self.data
+
+    def __str__(self) -> str:
+        return (
+            f"<FileChunk id={self.id.hex()} index={self.index} size={len(self.data)}>"
+        )
+
+    __repr__ = __str__
+
+    @classmethod
+    def decode(cls, raw_data: bytes) -> "FileChunk":
+        if not isinstance(raw_data, (bytes, bytearray)):
+            raise ValueError(f"file chunk must be bytes, got {type(raw_data).__name__}")
+        if len(raw_data) < cls.HEADER_SIZE:
+            raise ValueError("file chunk is too short")
+
+        return cls(
+            raw_data[:16],
+            int.from_bytes(raw_data[16:20], "big"),
+            raw_data[cls.HEADER_SIZE :],
+        )
@@ -0,0 +1,157 @@
+"""
+Received files are written by a dedicated thread so the socketio handlers are
+not held up by the disk. A file received in one piece goes to a temporary file
+renamed over the target, the chunks of a transfer are written to its `.part`
+file and its `finish` renames it, a crash never leaves a partial file. The
+jobs run in the order they are submitted.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import queue
+import tempfile
+import threading
+from logging import Logger
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+__all__ = ("WriteQueueFull", "FileWriter", "write_atomic")
+
+# seconds to wait for the pending writes on unload
+CLOSE_TIMEOUT = 30
+
+
+class WriteQueueFull(Exception):
+    pass
+
+
+class WriteJob(NamedTuple):
+    name: str  # for the log
+    run: Callable[[], None]
+    size: int  # bytes held until it is done
+    callback: Callable[[Optional[Exception]], None]
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class FileWriter:
+    def __init__(self, log: Logger, max_pending: int, max_pending_bytes: int) -> None:
+        self.log = log
+        self.max_pending = max_pending
+        self.max_pending_bytes = max_pending_bytes
+
+        self.queue: queue.Queue[Optional[WriteJob]] = queue.Queue()
+        self.pending = 0
+        self.pending_bytes = 0
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        # called once the queue is half empty, see `when_ready`
+        self.waiters: list[Callable[[], None]] = []
+
+    def submit(
+        self, path: Path, data: bytes, callback: Callable[[Optional[Exception]], None]
+    ) -> None:
+        """queue a file received in one piece, see `call`"""
+        self.call(
+            str(path), functools.partial(write_atomic, path, data), len(data), callback
+        )
+
+    def call(
+        self,
+        name: str,
+        run: Callable[[], None],
+        size: int,
+        callback: Callable[[Optional[Exception]], None],
+        *,
+        force: bool = False,
+    ) -> None:
+        """queue `run` holding `size` bytes, `callback` gets the error or None once
+        it is done. Raises `WriteQueueFull` over the limits, a single job larger
+        than the byte limit is accepted when nothing is pending. `force` skips the
+        limits, for the last step of work already accepted.
+        """
+        with self.lock:
+            if not force and (
+                self.pending >= self.max_pending
+                or (self.pending and self.pending_bytes + size > self.max_pending_bytes)
+            ):
+                raise WriteQueueFull(
+                    f"{self.pending} writes, {self.pending_bytes} bytes pending"
+                )
+
+            self.pending += 1
+            self.pending_bytes += size
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="chatbridge-file-writer", daemon=True
+                )
+                self.thread.start()
+
+        self.queue.put(WriteJob(name, run, size, callback))
+
+    def when_ready(self, callback: Callable[[], None]) -> None:
+        """call `callback` once at most half of the limits are pending, right away
+        when that is already the case, to submit again after `WriteQueueFull`
+        """
+        with self.lock:
+            if not self.ready:
+                self.waiters.append(callback)
+                return
+        callback()
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self.pending <= self.max_pending // 2
+            and self.pending_bytes <= self.max_pending_bytes // 2
+        )
+
+    def run(self) -> None:
+        while (job := self.queue.get()) is not None:
+            error = None
+            try:
+                job.run()
+            except Exception as e:
+                error = e
+            finally:
+                with self.lock:
+                    self.pending -= 1
+                    self.pending_bytes -= job.size
+                    waiters = []
+                    if self.waiters and self.ready:
+                        waiters, self.waiters = self.waiters, []
+
+            for callback in (functools.partial(job.callback, error), *waiters):
+                try:
+                    callback()
+                except Exception:
+                    self.log.exception(f"檔案寫入回呼錯誤 {job.name}")
+
+    def close(self) -> None:
+        """finish the pending writes and stop the thread"""
+        with self.lock:
+            if (thread := self.thread) is None:
+                return
+            self.thread = None
+
+        self.queue.put(None)
+        thread.join(CLOSE_TIMEOUT)
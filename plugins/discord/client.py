@@ -1,18 +1,21 @@
 from __future__ import annotations
 
 import asyncio
+import os
 import platform
 import random
+import tempfile
 import time
 from asyncio import AbstractEventLoop
 from datetime import datetime
-from functools import reduce
 from pathlib import Path
 from typing import Optional
 
+import aiohttp
 import discord
 from discord import (
     ApplicationContext,
+    Attachment,
     Color,
     DiscordException,
     Embed,
@@ -32,7 +35,13 @@ from rich.panel import Panel
 from rich.columns import Columns
 
 from server import Plugin
-from server.utils import FileEncode, FormatMessage, format_number
+from server.utils import FormatMessage, format_number
+
+# attachments downloaded at once after the sync is confirmed
+DOWNLOAD_CONCURRENCY = 4
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# seconds between progress edits, message edits are rate limited by discord
+PROGRESS_INTERVAL = 2
 
 
 class Bot(commands.Bot):
@@ -172,27 +181,25 @@ class Bot(commands.Bot):
         return contents
 
     async def on_message(self, msg: Message):
+        options = self.config.options
         ctx: commands.Context = await self.get_context(msg)
         if ctx.command and (
-            msg.channel.id in self.config.get("command_channels", [])
-            or msg.channel.category_id in self.config.get("parents_for_command", [])
+            msg.channel.id in options.command_channel_ids
+            or msg.channel.category_id in options.command_parent_ids
         ):
             return await self.process_commands(msg)
 
         if (author := msg.author) == self.user or author.system or author.bot:
             return
 
-        canned_message: dict[str, str | list[str]] = self.config.get(
-            "canned_message",
-            {},
-        )
+        canned_message = options.canned_message
         if (
             (key := msg.content) in canned_message
             and msg.channel.id
-            not in (self.config.get("black_canned_message_channel", {})).get(key, [])
+            not in options.black_canned_message_channel.get(key, [])
             and msg.channel.category_id
             and msg.channel.category_id
-            not in (self.config.get("black_canned_message_category", {})).get(key, [])
+            not in options.black_canned_message_category.get(key, [])
         ):
             await msg.channel.send(
                 random.choice(value)
@@ -220,22 +227,14 @@ class Bot(commands.Bot):
             await self.server.send(content)
 
         # sync_channel
-        if self.config.get("sync_enabled") and msg.channel.id == self.config.get(
-            "sync_channel"
-        ):
-            sync_file_extensions = tuple(
-                self.config.get("sync_file_extensions").split(",")
-            )
-            if files := [
-                FileEncode(
-                    path=attachment.filename,
-                    data=await attachment.read(),
-                    server_name="Discord",
-                )
+        if options.sync_enabled and msg.channel.id == options.sync_channel:
+            # nothing is downloaded before the sync is confirmed
+            if attachments := [
+                attachment
                 for attachment in msg.attachments
-                if attachment.filename.endswith(sync_file_extensions)
+                if attachment.filename.endswith(options.sync_extensions)
             ]:
-                if not self.config.get("auto_sync_updata"):
+                if not options.auto_sync_updata:
                     await msg.add_reaction("❓")
                     await msg.reply(
                         "Are you sure you want to sync files? Please click `❓` "
@@ -258,22 +257,80 @@ class Bot(commands.Bot):
                     else:
                         await msg.clear_reaction("❓")
 
-                now_time = time.time()
-                reply_msg = await msg.reply(
-                    f"Please wait later... [同步中請稍後...](0/{len(files)})",
-                    mention_author=False,
-                )
-                for index, file in enumerate(files):
+                await self.sync_attachments(msg, attachments)
+
+    async def sync_attachments(self, msg: Message, attachments: list[Attachment]):
+        now_time = time.time()
+        reply_msg = await msg.reply(
+            f"Please wait later... [同步中請稍後...](0/{len(attachments)})",
+            mention_author=False,
+        )
+        semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+        done, last_edit = 0, time.monotonic()
+
+        async def sync(session: aiohttp.ClientSession, attachment: Attachment):
+            nonlocal done, last_edit
+            async with semaphore:
+                path = await self.download(session, attachment)
+            # announced once stored, the others keep downloading
+            await self.server.publish_path(
+                attachment.filename,
+                path,
+                server_name="Discord",
+            )
+
+            done += 1
+            if (
+                done < len(attachments)
+                and (now := time.monotonic()) - last_edit >= PROGRESS_INTERVAL
+            ):
+                last_edit = now
+                try:
                     await reply_msg.edit(
-                        "Please wait later... [同步中請稍後...]" f"({index+1}/{len(files)})",
+                        f"Please wait later... [同步中請稍後...]({done}/{len(attachments)})"
                     )
-                    await self.server.emit("file_sync", file.encode())
+                except DiscordException:
+                    pass
+
+        async with aiohttp.ClientSession() as session:
+            results = await asyncio.gather(
+                *(sync(session, i) for i in attachments),
+                return_exceptions=True,
+            )
 
-                await msg.add_reaction("✅")
-                await reply_msg.edit(
-                    "Synchronization completed [同步完成] "
-                    f"- {time.time() - now_time:.2f}s",
+        failed = []
+        for attachment, result in zip(attachments, results):
+            if isinstance(result, Exception):
+                self.log.error(
+                    f"discord 附件同步失敗 {attachment.filename}: {result!r}"
                 )
+                failed.append(attachment.filename)
+
+        await msg.add_reaction("❌" if failed else "✅")
+        await reply_msg.edit(
+            "Synchronization completed [同步完成] "
+            f"- {time.time() - now_time:.2f}s"
+            + (f"\nFailed [同步失敗]: {', '.join(failed)}" if failed else "")
+        )
+
+    async def download(
+        self,
+        session: aiohttp.ClientSession,
+        attachment: Attachment,
+    ) -> Path:
+        """stream an attachment into a temporary file, never held in memory"""
+        fd, path = tempfile.mkstemp(prefix="chatbridgee-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async with session.get(attachment.url, raise_for_status=True) as resp:
+                    async for data in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        # a slow disk does not stall the gateway
+                        await self.loop.run_in_executor(None, f.write, data)
+        except BaseException:
+            os.remove(path)
+            raise
+
+        return Path(path)
 
     async def get_or_fetch_message(
         self,
@@ -363,12 +420,9 @@ class BotCommand(BaseCog):
         embed.add_field(
             name=(
                 "List of members [成員列表]"
-                f"({reduce(lambda x, y: x + y, map(lambda x: len(x[1]), data))})"
+                f"({sum(len(v.players or ()) for _, v in data)})"
             ),
-            value="\n".join(
-                f"- [{k.display_name}]({len(v)}): {', '.join(map(fix_msg, v))}"
-                for k, v in data
-            )
+            value="\n".join(plugin.format_server(k, v, fix_msg) for k, v in data)
             + f"\n\nTotal number of servers [總伺服器數]: {len(data)}",
         )
 
@@ -383,6 +437,80 @@ class BotCommand(BaseCog):
         )
         await ctx.send(embed=embed)
 
+    @commands.command()
+    async def tps(self, ctx: ApplicationContext):
+        try:
+            from plugins.tps import Tps
+
+            if (plugin := self.server.get_plugin(Tps.__plugin_name__)) is None:
+                raise Exception
+            plugin: Tps
+        except Exception:
+            return await ctx.send("The Tps plug-in is not enabled [未啟用 Tps 插件]")
+
+        embed = Embed(color=Color.blue(), timestamp=datetime.now())
+        embed.set_author(name="TPS / MSPT", icon_url=ctx.guild.icon)
+        lines = [
+            plugin.format_server(name, ticks, fix_msg)
+            for name, ticks in plugin.servers.items()
+        ]
+        embed.description = "\n".join(lines) or "No servers [無伺服器]"
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    async def sessions(self, ctx: ApplicationContext, *args: str):
+        try:
+            from plugins.sessions import HOUR, Sessions
+
+            if (plugin := self.server.get_plugin(Sessions.__plugin_name__)) is None:
+                raise Exception
+            plugin: Sessions
+        except Exception:
+            return await ctx.send(
+                "The Sessions plug-in is not enabled [未啟用 Sessions 插件]"
+            )
+
+        name, arg, *number = args + ("", "", "")
+        embed = Embed(color=Color.blue(), timestamp=datetime.now())
+        try:
+            if name in ("hourly", "player") and not arg:
+                return await ctx.send("Usage [用法]: sessions hourly|player <name>")
+            if name == "hourly":
+                hours = int(number[0] or 24)
+                rows = await plugin.hourly(arg, hours)
+                embed.set_author(name=f"{arg} hourly [每小時在線] ({hours}h)")
+                lines = [
+                    f"{plugin.format_time(i.hour * HOUR)} "
+                    f"{'█' * min(i.peak, 30)} {i.peak}"
+                    for i in rows
+                ]
+            elif name == "player":
+                days = int(number[0] or 7)
+                rows = await plugin.player(arg, days)
+                embed.set_author(name=f"{arg} sessions [遊玩紀錄] ({days}d)")
+                lines = [
+                    f"{fix_msg(i.server)}: {plugin.format_time(i.joined_at)} - "
+                    f"{plugin.format_time(i.left_at)}"
+                    for i in rows
+                ]
+            else:
+                hours = int(name or 24)
+                rows = await plugin.summary(hours)
+                embed.set_author(name=f"Sessions [遊玩統計] ({hours}h)")
+                lines = [
+                    f"- [{fix_msg(i.server)}] peak [最高] {i.peak}, "
+                    f"{i.hours:.1f} player hours [遊玩時數], "
+                    f"{i.joins} joins [加入], {i.online} online [在線]"
+                    for i in rows
+                ]
+        except ValueError:
+            return await ctx.send("The range must be a number [時間範圍必須是整數]")
+
+        # the description is limited to 4096 characters, the latest lines are kept
+        description = "\n".join(lines) or "No records [無紀錄]"
+        embed.description = description[-4000:]
+        await ctx.send(embed=embed)
+
 
 def fix_msg(msg: str):
     for c in ["\\", "`", "*", "_", "<", ">", "@"]:
@@ -7,10 +7,10 @@ import aiohttp
 from discord import MISSING, File, TextChannel, Webhook
 from discord.errors import LoginFailure
 
-from server import BaseServer, Context, Plugin
-from server.utils import Config, FileEncode
+from server import BaseServer, Context, FileTransfer, Plugin
+from server.utils import Config, FileEncodeView, derived
 
-from .client import Bot, fix_msg
+from .client import Bot, BotCommand, fix_msg
 
 
 class DiscordConfig(Config):
@@ -34,6 +34,18 @@ class DiscordConfig(Config):
     black_canned_message_channel: dict[str, list[int]] = {}
     black_canned_message_category: dict[str, list[int]] = {}
 
+    @derived
+    def sync_extensions(self) -> tuple[str, ...]:
+        return tuple(self.sync_file_extensions)
+
+    @derived
+    def command_channel_ids(self) -> frozenset[int]:
+        return frozenset(self.command_channels)
+
+    @derived
+    def command_parent_ids(self) -> frozenset[int]:
+        return frozenset(self.parents_for_command)
+
 
 class Discord(Plugin, config=DiscordConfig):
     def __init__(self, server: BaseServer):
@@ -43,8 +55,39 @@ class Discord(Plugin, config=DiscordConfig):
         self.chat_channel: TextChannel | None = ...
         self.player_join_channel: TextChannel | None = ...
         self.sync_channel: TextChannel | None = ...
+        # hot reload, the running bot is passed between the old and new plugin
+        self._bot_kept = self._bot_handed_over = False
+
+    def save_state(self) -> dict:
+        self._bot_handed_over = True
+        return {
+            "bot": self.bot,
+            "channels": (
+                self.chat_channel,
+                self.player_join_channel,
+                self.sync_channel,
+            ),
+        }
+
+    def load_state(self, state: dict) -> None:
+        # keep the gateway session, the bot takes the methods of the new module,
+        # `Bot.__init__` is not run again so what it sets is rebound here
+        bot: Bot = state["bot"]
+        bot.__class__ = Bot
+        bot.plugin, bot.log, bot.config = self, self.log, self.config
+        bot.server = self.server
+        bot.command_prefix = self.config.get("prefix")
+        bot.remove_cog(BotCommand.__cog_name__)
+        bot.add_cog(BotCommand(bot))
+
+        self.bot, self._bot_kept = bot, True
+        channels = state["channels"]
+        self.chat_channel, self.player_join_channel, self.sync_channel = channels
 
     def on_load(self):
+        if self._bot_kept:
+            return
+
         config = self.config
 
         async def runner():
@@ -65,6 +108,9 @@ class Discord(Plugin, config=DiscordConfig):
         self.loop.create_task(runner())
 
     def on_unload_before(self):
+        if self._bot_handed_over:
+            return
+
         async def close():
             try:
                 await self.bot.close()
@@ -126,6 +172,10 @@ class Discord(Plugin, config=DiscordConfig):
     async def on_server_stop(self, ctx: Context):
         await self.send("The server shuts down - 伺服器關閉", ctx=ctx)
 
+    @Plugin.listener
+    async def on_tps_alert(self, ctx: Context, message: str):
+        await self.send(message, ctx=ctx)
+
     @Plugin.listener
     async def on_player_chat(self, ctx: Context, player_name: str, content: str):
         await self.send(content, ctx=ctx, player_name=player_name)
@@ -164,7 +214,7 @@ class Discord(Plugin, config=DiscordConfig):
         )
 
     @Plugin.listener
-    async def on_file_sync(self, ctx: Context, data: FileEncode):
+    async def on_file_sync(self, ctx: Context, data: FileEncodeView):
         if not self.config.get("sync_enabled"):
             return
 
@@ -182,6 +232,26 @@ class Discord(Plugin, config=DiscordConfig):
             channel=self.sync_channel,
         )
 
+    @Plugin.listener
+    async def on_file_transfer(self, ctx: Context, transfer: FileTransfer):
+        if not self.config.get("sync_enabled"):
+            return
+
+        server_name = transfer.server_name
+
+        if self.sync_channel is ...:
+            self.sync_channel = await self.bot.get_or_fetch_channel(
+                self.config.get("sync_channel")
+            )
+
+        # streamed from the spool file, closed by discord after sending
+        await self.send(
+            f"A file published from {server_name} - 從 {server_name} 發布的檔案",
+            ctx=ctx,
+            file=File(transfer.open(), Path(transfer.path).name),
+            channel=self.sync_channel,
+        )
+
 
 def setup(server: BaseServer):
     server.add_plugin(Discord(server))
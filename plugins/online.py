@@ -1,21 +1,21 @@
 from __future__ import annotations
 
+import asyncio
 import re
-from functools import reduce
-from typing import overload
+import time
+from typing import Callable, NamedTuple, overload
 
-from server import BaseServer, Context, Plugin
-from server.utils import Config, RconClient
+from server import BaseServer, Context, Plugin, parse_player_list
+from server.utils import Config
 
-minecraft_list_match = re.compile(
-    r"There are \d+ of a max(?: of)? \d+ players online:(.*)"
-)
 minecraft_GList_match = re.compile(r"\[(.*)\] \(\d*\):((?:.*[ ,]?)+)")
 
 
 class OnlineConfig(Config):
     online_enabled = True
     query_online_names = ["Survival"]
+    # seconds each server has to answer, a slower one is shown stale or unknown
+    query_timeout = 3
     bungeecord_list = {
         "BungeecordA": {
             "address": "127.0.0.1",
@@ -25,45 +25,73 @@ class OnlineConfig(Config):
     }
 
 
+class ServerOnline(NamedTuple):
+    players: set[str] | None  # None when never answered
+    # seconds of the rcon query, None when answered from presence or not answered
+    latency: float | None
+    # the players of the last answer, the server did not answer this time
+    stale: bool = False
+
+
 class Online(Plugin, config=OnlineConfig):
     def __init__(self, server: BaseServer) -> None:
         super().__init__(server)
-        self._glist_rcon_catch: dict[str, RconClient] = {}
+        # {client name: players} of the last answer, for a server not answering
+        self.last_known: dict[str, set[str]] = {}
+
+    def save_state(self) -> dict[str, set[str]]:
+        return self.last_known
+
+    def load_state(self, state: dict[str, set[str]]) -> None:
+        self.last_known = state
 
-    # <1.16  There are 3 of a max 50 players online: A, B, C
-    # >=1.16 There are 3 of a max of 50 players online: A, B, C
     @staticmethod
     def handle_minecraft(data: str) -> set[str]:
-        if parsed := minecraft_list_match.match(data):
-            return set(i.strip() for i in parsed.group(1).split(",") if i)
-
-        return set()
+        return parse_player_list(data) or set()
 
     # [Creative] (2): A, B
     # [Survival] (4): A, B, C, D
     # Total players online: 6
     @staticmethod
     def handle_bungee(data: str) -> dict[str, set[str]] | None:
-        result, no_command = {}, False
+        result, is_glist = {}, False
 
         for line in data.splitlines():
             if line.startswith("Total players online:"):
-                no_command = True
+                is_glist = True
                 continue
-            if parsed := minecraft_GList_match.match(data):
+            if parsed := minecraft_GList_match.match(line):
                 result[parsed.group(1)] = set(
                     i.strip() for i in parsed.group(2).split(",") if i
                 )
 
-        if no_command:
+        if not is_glist:
             return None
         return result
 
+    @staticmethod
+    def format_server(
+        ctx: Context,
+        online: ServerOnline,
+        escape: Callable[[str], str] = str,
+    ) -> str:
+        if online.players is None:
+            return f"- [{ctx.display_name}](?): no response [無回應]"
+
+        names = ", ".join(map(escape, sorted(online.players)))
+        if online.stale:
+            status = ", stale [舊資料]"
+        elif online.latency is not None:
+            status = f", {online.latency * 1000:.0f}ms"
+        else:
+            status = ""
+        return f"- [{ctx.display_name}]({len(online.players)}{status}): {names}"
+
     # fmt: off
     @overload
-    async def query(self, *, order = True) -> list[tuple[Context, set[str]]]:  ...  # noqa: E
+    async def query(self, *, order = True) -> list[tuple[Context, ServerOnline]]:  ...  # noqa: E
     @overload
-    async def query(self, *, order=False) -> dict[Context, set[str]]:  ...  # noqa: E
+    async def query(self, *, order=False) -> dict[Context, ServerOnline]:  ...  # noqa: E
     # fmt: on
 
     @Plugin.listener
@@ -72,59 +100,121 @@ class Online(Plugin, config=OnlineConfig):
         self.log.debug(f"get online players: {data}")
         print(
             "List of members [成員列表]"
-            f"({reduce(lambda x, y: x + y, map(lambda x: len(x[1]), data))})"
+            f"({sum(len(v.players or ()) for _, v in data)})"
         )
         print(
-            "\n".join(
-                f"- [{k.display_name}]({len(v)}): {', '.join(v)}" for k, v in data
-            )
+            "\n".join(self.format_server(k, v) for k, v in data)
             + f"\n\nTotal number of servers [總伺服器數]: {len(data)}"
         )
 
-    async def query(self, *, order: bool = False):
-        result: dict[Context, set[str]] = {}
-        minecraft_GList_match: dict[str, dict] = self.config.get(
-            "minecraft_GList_match",
-            {},
-        )
+    @Plugin.listener
+    async def on_player_joined(self, ctx: Context, player_name: str):
+        self.invalidate_glist()
 
-        for name, server in minecraft_GList_match.items():
-            try:
-                rcon = self._glist_rcon_catch.get(
-                    name,
-                    RconClient(
-                        host=server.get("address", None),
-                        port=server.get("port", None),
-                        password=server.get("password", None),
-                    ),
-                )
-                self._glist_rcon_catch[name] = rcon
-                await rcon.connect()
+    @Plugin.listener
+    async def on_player_left(self, ctx: Context, player_name: str):
+        self.invalidate_glist()
+
+    def invalidate_glist(self) -> None:
+        # a player on any backend server changes the proxy's list
+        for server in self.config.get("bungeecord_list", {}).values():
+            self.server.rcon.invalidate(
+                server.get("address", None),
+                server.get("port", None),
+                server.get("password", None),
+                ["glist"],
+            )
 
-                if (res := await rcon.execute("glist")) and (
-                    data := self.handle_bungee(res["data"])
-                ):
-                    for id, value in data.items():
-                        result.update({self.server.get_client(id): value})
-            except Exception as e:
-                self.log.error(f"query {name} error: {e}")
+    async def query_bungee(
+        self,
+        name: str,
+        server: dict,
+    ) -> tuple[dict[str, set[str]], float]:
+        start = time.perf_counter()
+        res = await self.server.rcon.query(
+            server.get("address", None),
+            server.get("port", None),
+            server.get("password", None),
+            "glist",
+        )
+        if not res or (data := self.handle_bungee(res["data"])) is None:
+            raise ValueError(f"unexpected glist response: {res!r}")
+        return data, time.perf_counter() - start
+
+    async def query_client(self, client: Context) -> tuple[set[str], float] | None:
+        start = time.perf_counter()
+        if (res := await client.query_command("list")) is ...:
+            # no rcon
+            return None
+        if not res:
+            raise ValueError(f"unexpected list response: {res!r}")
+        return self.handle_minecraft(res["data"]), time.perf_counter() - start
 
+    async def query(self, *, order: bool = False):
+        """the players tracked from events by `server.presence`, servers not seeded
+        yet are asked at once, one not answering in `query_timeout` gets the players
+        of its last answer marked stale, or None
+        """
+        names: list[str] = self.config.get("query_online_names", [])
+        timeout: float = self.config.get("query_timeout", 3)
+        result: dict[Context, ServerOnline] = {}
+        clients = []
         for client in self.server.clients.values():
-            try:
-                if res := await client.execute_command("list"):
-                    result.update({client: self.handle_minecraft(res["data"])})
-            except Exception as e:
-                self.log.error(f"query {client.display_name} error: {e}")
-
-        result = {
-            k: set(s for s in v if s.strip())
-            for k, v in result.items()
-            if k.name in self.config.get("query_online_names", [])
-        }
+            if client.name not in names:
+                continue
+            presence = self.server.presence.get(client.name)
+            if presence is not None and presence.complete:
+                result[client] = ServerOnline(set(presence.players), None)
+            else:
+                clients.append(client)
+
+        bungees: dict[str, dict] = (
+            self.config.get("bungeecord_list", {}) if clients else {}
+        )
+
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(self.query_bungee(name, server), timeout)
+                for name, server in bungees.items()
+            ),
+            *(asyncio.wait_for(self.query_client(i), timeout) for i in clients),
+            return_exceptions=True,
+        )
+        bungee_results, client_results = (
+            results[: len(bungees)],
+            results[len(bungees) :],
+        )
+
+        answered: dict[str, ServerOnline] = {}
+        for name, res in zip(bungees, bungee_results):
+            if isinstance(res, BaseException):
+                self.log.error(f"query {name} error: {res!r}")
+                continue
+            data, latency = res
+            for id, players in data.items():
+                answered[id] = ServerOnline(players, latency)
+
+        for client, res in zip(clients, client_results):
+            if isinstance(res, BaseException):
+                self.log.error(f"query {client.display_name} error: {res!r}")
+            elif res is not None:
+                answered[client.name] = ServerOnline(*res)
+
+            if (online := answered.get(client.name)) is not None:
+                online = online._replace(players=set(i for i in online.players if i))
+                self.last_known[client.name] = online.players
+            elif (players := self.last_known.get(client.name)) is not None:
+                online = ServerOnline(players, None, stale=True)
+            elif presence := self.server.presence.get(client.name):
+                # only the events since the client connected
+                online = ServerOnline(set(presence.players), None, stale=True)
+            else:
+                online = ServerOnline(None, None)
+            result[client] = online
 
         if order:
             ret = []
-            for id in self.config.get("query_online_names", []):
+            for id in names:
                 for ctx, value in result.copy().items():
                     if ctx.name == id:
                         ret.append((ctx, value))
@@ -134,10 +224,6 @@ class Online(Plugin, config=OnlineConfig):
 
         return result
 
-    def on_unload(self) -> None:
-        for client in self._glist_rcon_catch.values():
-            client.disconnect()
-
 
 def setup(server: BaseServer):
     server.add_plugin(Online(server))
@@ -0,0 +1,438 @@
+"""
+Player sessions
+===============
+Who played when, kept in SQLite (`db_path`) from the `player_joined` /
+`player_left` events of every client.
+
+`sessions` holds one row per visit. `hourly` holds per server and hour the peak
+number of players online, the joins and the seconds played. It is updated with
+every event, so the reports read a few rows per hour and never the visits. An
+hour without events gets the number of players online through it as its peak.
+
+The players online are reconciled with `presence_synced`, it starts the visits of
+the players already online when a client connects and ends those of players who
+left without an event.
+
+The database is used from one thread, the writes keep the order of the events.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator, NamedTuple, Optional
+
+from rich import print as rich_print
+from rich.table import Table
+
+from server import BaseServer, Context, Plugin
+from server.utils import MISSING, Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    server TEXT NOT NULL,
+    player TEXT NOT NULL,
+    joined_at REAL NOT NULL,
+    left_at REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_player ON sessions (player, joined_at);
+CREATE INDEX IF NOT EXISTS sessions_open
+    ON sessions (server, player) WHERE left_at IS NULL;
+CREATE TABLE IF NOT EXISTS hourly (
+    server TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    peak INTEGER NOT NULL DEFAULT 0,
+    joins INTEGER NOT NULL DEFAULT 0,
+    seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (server, hour)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+UPSERT_HOUR = """
+INSERT INTO hourly (server, hour, peak, joins, seconds) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (server, hour) DO UPDATE SET
+    peak = max(peak, excluded.peak),
+    joins = joins + excluded.joins,
+    seconds = seconds + excluded.seconds
+"""
+
+# an hour bucket is `int(timestamp // 3600)`
+HOUR = 3600
+# hours filled at most when a server had no event for long
+MAX_FILL_HOURS = 24 * 366
+
+
+class SessionsConfig(Config):
+    db_path = "sessions.db"
+
+
+class ServerSummary(NamedTuple):
+    server: str
+    peak: int
+    hours: float  # played by all players
+    joins: int
+    online: int  # now
+
+
+class HourStats(NamedTuple):
+    hour: int
+    peak: int
+    joins: int
+    seconds: float
+
+
+class PlayerSession(NamedTuple):
+    server: str
+    joined_at: float
+    left_at: Optional[float]  # None while online
+
+
+def split_hours(start: float, end: float) -> Iterator[tuple[int, float]]:
+    """the seconds of `start` to `end` in each hour"""
+    while start < end:
+        hour = int(start // HOUR)
+        stop = min(end, (hour + 1) * HOUR)
+        yield hour, stop - start
+        start = stop
+
+
+class SessionStore:
+    """the database, only used from the executor thread"""
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.executescript(SCHEMA)
+        # {server: hour of the last event}
+        self.last_hour: dict[str, int] = {}
+
+    def close(self) -> None:
+        self.db.close()
+
+    def touch(self, server: str, now: float, online: int) -> None:
+        """the hours since the last event of the server had `online` players"""
+        hour = int(now // HOUR)
+        start = min(self.last_hour.get(server, hour) + 1, hour)
+        self.db.executemany(
+            UPSERT_HOUR,
+            (
+                (server, i, online, 0, 0)
+                for i in range(max(start, hour - MAX_FILL_HOURS), hour + 1)
+            ),
+        )
+        self.last_hour[server] = hour
+        self.db.execute(
+            "INSERT OR REPLACE INTO meta VALUES ('last_event', ?)",
+            (now,),
+        )
+
+    def join(self, server: str, player: str, now: float, online: int) -> None:
+        with self.db:
+            self.touch(server, now, online)
+            self.db.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, NULL)",
+                (server, player, now),
+            )
+            self.db.execute(UPSERT_HOUR, (server, int(now // HOUR), online + 1, 1, 0))
+
+    def leave(
+        self,
+        server: str,
+        player: str,
+        joined_at: float,
+        now: float,
+        online: int,
+    ) -> None:
+        with self.db:
+            self.touch(server, now, online)
+            self.close_session(server, player, joined_at, now)
+
+    def close_session(
+        self,
+        server: str,
+        player: str,
+        joined_at: float,
+        now: float,
+    ) -> None:
+        self.db.execute(
+            "UPDATE sessions SET left_at = ? "
+            "WHERE server = ? AND player = ? AND left_at IS NULL",
+            (now, server, player),
+        )
+        self.db.executemany(
+            UPSERT_HOUR,
+            (
+                (server, hour, 0, 0, seconds)
+                for hour, seconds in split_hours(joined_at, now)
+            ),
+        )
+
+    def close_dangling(self) -> int:
+        """end the visits left open by a crash, when the plugin was last seen running"""
+        row = self.db.execute(
+            "SELECT value FROM meta WHERE key = 'last_event'"
+        ).fetchone()
+        dangling = self.db.execute(
+            "SELECT server, player, joined_at FROM sessions WHERE left_at IS NULL"
+        ).fetchall()
+        with self.db:
+            for server, player, joined_at in dangling:
+                end = max(joined_at, row[0] if row else joined_at)
+                self.close_session(server, player, joined_at, end)
+        return len(dangling)
+
+    def summary(self, since: float, online: dict[str, int]) -> list[tuple]:
+        with self.db:
+            for server, count in online.items():
+                self.touch(server, time.time(), count)
+        return self.db.execute(
+            "SELECT server, max(peak), sum(seconds), sum(joins) FROM hourly "
+            "WHERE hour >= ? GROUP BY server ORDER BY server",
+            (int(since // HOUR),),
+        ).fetchall()
+
+    def hourly(self, server: str, since: float, online: int) -> list[tuple]:
+        with self.db:
+            self.touch(server, time.time(), online)
+        return self.db.execute(
+            "SELECT hour, peak, joins, seconds FROM hourly "
+            "WHERE server = ? AND hour >= ? ORDER BY hour",
+            (server, int(since // HOUR)),
+        ).fetchall()
+
+    def player(self, player: str, since: float) -> list[tuple]:
+        return self.db.execute(
+            "SELECT server, joined_at, left_at FROM sessions "
+            "WHERE player = ? AND (left_at IS NULL OR left_at >= ?) "
+            "ORDER BY joined_at",
+            (player, since),
+        ).fetchall()
+
+
+class Sessions(Plugin, config=SessionsConfig):
+    def __init__(self, server: BaseServer) -> None:
+        super().__init__(server)
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="sessions")
+        self.store = SessionStore(self.config.get("db_path"))
+        # {server: {player: joined_at}}
+        self.online: dict[str, dict[str, float]] = {}
+        self.handed_over = False
+
+    def save_state(self) -> Any:
+        # the visits go on through a hot reload
+        self.handed_over = True
+        return self.online
+
+    def load_state(self, state: dict[str, dict[str, float]]) -> None:
+        self.online = state
+
+    def on_load(self) -> None:
+        if self.online:
+            return
+
+        self.write(self.store.close_dangling)
+        # players already online when the plugin is loaded
+        for ctx in self.server.clients.values():
+            if (presence := self.server.presence.get(ctx.name)) is not None:
+                for player in presence.players:
+                    self.join(ctx.name, player)
+
+    def on_unload(self) -> None:
+        if not self.handed_over:
+            for server in list(self.online):
+                self.leave_all(server)
+        self.executor.submit(self.store.close)
+        self.executor.shutdown(wait=True)
+
+    def submit(self, func, *args: Any):
+        return self.loop.run_in_executor(self.executor, func, *args)
+
+    def write(self, func, *args: Any) -> None:
+        def done(future) -> None:
+            if not future.cancelled() and (e := future.exception()):
+                self.log.error(f"玩家紀錄寫入失敗: {e!r}")
+
+        self.submit(func, *args).add_done_callback(done)
+
+    def join(self, server: str, player: str) -> None:
+        players = self.online.setdefault(server, {})
+        if player in players:
+            return
+        players[player] = now = time.time()
+        self.write(self.store.join, server, player, now, len(players) - 1)
+
+    def leave(self, server: str, player: str) -> None:
+        players = self.online.get(server, {})
+        if (joined_at := players.pop(player, None)) is None:
+            return
+        now = time.time()
+        self.write(self.store.leave, server, player, joined_at, now, len(players) + 1)
+
+    def leave_all(self, server: str) -> None:
+        for player in list(self.online.get(server, ())):
+            self.leave(server, player)
+        self.online.pop(server, None)
+
+    @Plugin.listener
+    async def on_player_joined(self, ctx: Context, player_name: str):
+        self.join(ctx.name, player_name)
+
+    @Plugin.listener
+    async def on_player_left(self, ctx: Context, player_name: str):
+        self.leave(ctx.name, player_name)
+
+    @Plugin.listener
+    async def on_presence_synced(self, ctx: Context, players: frozenset[str]):
+        online = self.online.get(ctx.name, {})
+        for player in online.keys() - players:
+            self.leave(ctx.name, player)
+        for player in players - online.keys():
+            self.join(ctx.name, player)
+
+    @Plugin.listener
+    async def on_server_stop(self, ctx: Context):
+        self.leave_all(ctx.name)
+
+    @Plugin.listener
+    async def on_disconnect(self, ctx: Context):
+        # not when a newer connection of the same client took over
+        if self.server.get_client(ctx.name) is None:
+            self.leave_all(ctx.name)
+
+    # ----- queries -----
+
+    def open_seconds(self, server: str, since: float) -> Iterator[tuple[int, float]]:
+        """the hours of the visits not ended yet, not in the database until then"""
+        now = time.time()
+        for joined_at in self.online.get(server, {}).values():
+            yield from split_hours(max(joined_at, since), now)
+
+    async def summary(self, hours: int = 24) -> list[ServerSummary]:
+        since = time.time() - hours * HOUR
+        online = {k: len(v) for k, v in self.online.items()}
+        rows = await self.submit(self.store.summary, since, online)
+
+        result = []
+        for server, peak, seconds, joins in rows:
+            seconds += sum(i for _, i in self.open_seconds(server, since))
+            result.append(
+                ServerSummary(
+                    server, peak, seconds / HOUR, joins, online.get(server, 0)
+                )
+            )
+        return result
+
+    async def hourly(self, server: str, hours: int = 24) -> list[HourStats]:
+        since = time.time() - hours * HOUR
+        online = len(self.online.get(server, ()))
+        rows = {
+            i[0]: HourStats(*i)
+            for i in await self.submit(self.store.hourly, server, since, online)
+        }
+        for hour, seconds in self.open_seconds(server, since):
+            if (row := rows.get(hour)) is not None:
+                rows[hour] = row._replace(seconds=row.seconds + seconds)
+        return list(rows.values())
+
+    async def player(self, player: str, days: int = 7) -> list[PlayerSession]:
+        since = time.time() - days * 24 * HOUR
+        rows = await self.submit(self.store.player, player, since)
+        return [PlayerSession(*i) for i in rows]
+
+    # ----- commands -----
+
+    @staticmethod
+    def format_time(timestamp: Optional[float]) -> str:
+        if timestamp is None:
+            return "online [在線]"
+        return datetime.fromtimestamp(timestamp).strftime("%m-%d %H:%M")
+
+    @staticmethod
+    def format_duration(seconds: float) -> str:
+        minutes = int(seconds // 60)
+        return f"{minutes // 60}h{minutes % 60:02d}m"
+
+    @Plugin.listener
+    async def on_command_sessions(
+        self,
+        name: str = MISSING,
+        arg: str = MISSING,
+        number: str = MISSING,
+    ):
+        """
+        sessions [hours]
+        sessions hourly <server> [hours]
+        sessions player <name> [days]
+        """
+        if name in ("hourly", "player") and arg is MISSING:
+            print(f"請輸入{'伺服器' if name == 'hourly' else '玩家'}名稱")
+            return
+
+        try:
+            if name == "hourly":
+                rows = await self.hourly(
+                    arg, int(number) if number is not MISSING else 24
+                )
+                table = Table(header_style="bold magenta")
+                for column in ("時間", "最高在線", "加入次數", "遊玩時數"):
+                    table.add_column(column)
+                for row in rows:
+                    table.add_row(
+                        self.format_time(row.hour * HOUR),
+                        str(row.peak),
+                        str(row.joins),
+                        f"{row.seconds / HOUR:.1f}",
+                    )
+            elif name == "player":
+                rows = await self.player(
+                    arg, int(number) if number is not MISSING else 7
+                )
+                table = Table(header_style="bold magenta")
+                for column in ("伺服器", "加入", "離開", "時長"):
+                    table.add_column(column)
+                for row in rows:
+                    table.add_row(
+                        row.server,
+                        self.format_time(row.joined_at),
+                        self.format_time(row.left_at),
+                        self.format_duration(
+                            (row.left_at or time.time()) - row.joined_at
+                        ),
+                    )
+            else:
+                rows = await self.summary(int(name) if name is not MISSING else 24)
+                table = Table(header_style="bold magenta")
+                for column in (
+                    "伺服器",
+                    "最高在線",
+                    "遊玩時數",
+                    "加入次數",
+                    "目前在線",
+                ):
+                    table.add_column(column)
+                for row in rows:
+                    table.add_row(
+                        row.server,
+                        str(row.peak),
+                        f"{row.hours:.1f}",
+                        str(row.joins),
+                        str(row.online),
+                    )
+        except ValueError:
+            print("時間範圍必須是整數")
+            return
+
+        rich_print(table)
+
+
+def setup(server: BaseServer):
+    server.add_plugin(Sessions(server))
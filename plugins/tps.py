@@ -1,31 +1,321 @@
+"""
+TPS monitor
+===========
+Poll the tick health of every connected server over RCON. The probes of `probes`
+are tried in order until one answers, vanilla `tick query` (1.20.3+), paper
+`mspt`, spigot `tps`, the one that answered is kept for the server.
+
+A healthy server is polled less often, the interval doubles up to
+`poll_interval_max` and drops back to `poll_interval_min` on a bad sample. The
+last `samples` samples of each server are kept, a server that disconnects is
+marked offline and keeps them until it is back.
+
+An alert is sent after `alert_samples` bad samples in a row, and once the server
+is back for as many good samples. A server alerts at most once per
+`alert_cooldown` seconds, a lag spike does not flood the channels. Alerts are
+logged and dispatched as `tps_alert(ctx, message)` for the other plugins.
+"""
+
 from __future__ import annotations
 
+import asyncio
+import math
 import re
+import time
+from collections import deque
+from typing import Callable, NamedTuple, Optional
 
-from server import BaseServer, Plugin
+from rich import print as rich_print
+from rich.table import Table
+
+from server import BaseServer, Context, Plugin
 from server.utils import Config
 
-minecraft_list_match = re.compile(
-    r"There are \d+ of a max(?: of)? \d+ players online:(.*)"
-)
-minecraft_GList_match = re.compile(r"\[(.*)\] \(\d*\):((?:.*[ ,]?)+)")
+PROBE_TIMEOUT = 10
+# seconds between checks of which servers are due
+SCHEDULE_INTERVAL = 1
+SPARK = "▁▂▃▄▅▆▇█"
+color_match = re.compile(r"§.")
+
+
+class TpsConfig(Config):
+    # seconds between polls, doubled while healthy up to the max
+    poll_interval_min = 10
+    poll_interval_max = 120
+    # samples kept per server
+    samples = 360
+    alert_mspt = 50.0
+    alert_tps = 18.0
+    # bad samples in a row before an alert, good ones before it is over
+    alert_samples = 3
+    alert_cooldown = 600
+    # tried in order, `tps` or `mspt` may be missing, the first group is the value
+    probes = [
+        {
+            "command": "tick query",
+            "tps": r"Target tick rate: ([\d.]+)",
+            "mspt": r"Average time per tick: ([\d.]+)ms",
+        },
+        {
+            "command": "mspt",
+            "mspt": r"from last 5s, 10s, 1m:\W*([\d.]+)/",
+        },
+        {
+            "command": "tps",
+            "tps": r"TPS from last 1m, 5m, 15m: \*?([\d.]+)",
+        },
+    ]
+
+
+class TickSample(NamedTuple):
+    time: float
+    tps: float
+    mspt: Optional[float]  # None when the server only reports TPS
+
+
+class ServerTicks:
+    def __init__(self, size: int, interval: float) -> None:
+        self.samples: deque[TickSample] = deque(maxlen=size)
+        self.interval = interval
+        self.next_poll = 0.0
+        self.polling = False
+        self.online = True  # connected to the bridge
+        self.probe: Optional[int] = None  # index of the probe that answered
+        self.bad = self.good = 0  # samples in a row
+        self.alerted = False
+        self.last_alert: Optional[float] = None  # time.monotonic()
 
 
-class OnlineConfig(Config):
-    online_enabled = True
-    query_online_names = ["Survival"]
-    bungeecord_list = {
-        "BungeecordA": {
-            "address": "127.0.0.1",
-            "port": 39999,
-            "password": "Bungee Rcon Password",
-        }
-    }
+class Probe(NamedTuple):
+    command: str
+    tps: Optional[re.Pattern]
+    mspt: Optional[re.Pattern]
 
+    def parse(self, data: str) -> Optional[tuple[float, Optional[float]]]:
+        data = color_match.sub("", data)
+        tps = mspt = None
+        if self.mspt and (parsed := self.mspt.search(data)):
+            mspt = float(parsed.group(1))
+        if self.tps and (parsed := self.tps.search(data)):
+            tps = float(parsed.group(1))
+        if mspt is None and tps is None:
+            return None
 
-class Tps(Plugin, config=OnlineConfig):
+        if mspt is not None:
+            # the target rate, lower when the ticks take longer than it allows
+            tps = min(20.0 if tps is None else tps, 1000 / mspt if mspt else 20.0)
+        return tps, mspt
+
+
+class Tps(Plugin, config=TpsConfig):
     def __init__(self, server: BaseServer) -> None:
         super().__init__(server)
+        self.servers: dict[str, ServerTicks] = {}  # {client name: ticks}
+        self.probes = [
+            Probe(
+                i["command"],
+                re.compile(i["tps"]) if i.get("tps") else None,
+                re.compile(i["mspt"]) if i.get("mspt") else None,
+            )
+            for i in self.config.get("probes", [])
+        ]
+        self.task: Optional[asyncio.Task] = None
+
+    def save_state(self) -> dict[str, ServerTicks]:
+        return self.servers
+
+    def load_state(self, state: dict[str, ServerTicks]) -> None:
+        self.servers = state
+        for ticks in self.servers.values():
+            ticks.polling = False
+            ticks.online = True  # corrected by the next `schedule`
+
+    def on_load(self) -> None:
+        self.task = self.loop.create_task(self.schedule())
+
+    def on_unload(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+
+    async def schedule(self) -> None:
+        while True:
+            now = time.monotonic()
+            clients = list(self.server.clients.values())
+            names = {ctx.name for ctx in clients}
+            for name, ticks in self.servers.items():
+                ticks.online = name in names
+
+            for ctx in clients:
+                if (ticks := self.servers.get(ctx.name)) is None:
+                    ticks = self.servers[ctx.name] = ServerTicks(
+                        self.config.get("samples"),
+                        self.config.get("poll_interval_min"),
+                    )
+                if not ticks.polling and now >= ticks.next_poll:
+                    ticks.polling = True
+                    self.loop.create_task(self.poll(ctx, ticks))
+            await asyncio.sleep(SCHEDULE_INTERVAL)
+
+    async def poll(self, ctx: Context, ticks: ServerTicks) -> None:
+        try:
+            sample = await self.probe(ctx, ticks)
+        except Exception as e:
+            self.log.debug(f"TPS 查詢失敗 [{ctx.display_name}]: {e!r}")
+            sample = None
+        finally:
+            ticks.polling = False
+
+        interval_max = self.config.get("poll_interval_max")
+        if sample is None:
+            # no rcon or no probe answers, tried again later
+            ticks.interval = interval_max
+        else:
+            ticks.samples.append(sample)
+            if self.healthy(sample):
+                ticks.interval = min(ticks.interval * 2, interval_max)
+            else:
+                ticks.interval = self.config.get("poll_interval_min")
+            await self.check_alert(ctx, ticks, sample)
+        ticks.next_poll = time.monotonic() + ticks.interval
+
+    async def probe(self, ctx: Context, ticks: ServerTicks) -> Optional[TickSample]:
+        order = range(len(self.probes))
+        if ticks.probe is not None:
+            order = [ticks.probe, *(i for i in order if i != ticks.probe)]
+
+        for index in order:
+            probe = self.probes[index]
+            res = await asyncio.wait_for(
+                ctx.execute_command(probe.command),
+                PROBE_TIMEOUT,
+            )
+            if res is ...:
+                return None  # no rcon
+            if res and (parsed := probe.parse(res["data"])):
+                ticks.probe = index
+                return TickSample(time.time(), *parsed)
+
+        ticks.probe = None
+        return None
+
+    def healthy(self, sample: TickSample) -> bool:
+        if sample.mspt is not None and sample.mspt > self.config.get("alert_mspt"):
+            return False
+        return sample.tps >= self.config.get("alert_tps")
+
+    async def check_alert(
+        self,
+        ctx: Context,
+        ticks: ServerTicks,
+        sample: TickSample,
+    ) -> None:
+        if self.healthy(sample):
+            ticks.bad, ticks.good = 0, ticks.good + 1
+        else:
+            ticks.bad, ticks.good = ticks.bad + 1, 0
+
+        count = self.config.get("alert_samples")
+        if ticks.alerted:
+            if ticks.good < count:
+                return
+            ticks.alerted = False
+            message = f"TPS recovered [TPS 已恢復]: {self.format_sample(sample)}"
+        elif ticks.bad >= count and (
+            ticks.last_alert is None
+            or time.monotonic() - ticks.last_alert >= self.config.get("alert_cooldown")
+        ):
+            ticks.alerted = True
+            ticks.last_alert = time.monotonic()
+            message = f"Server lagging [伺服器卡頓]: {self.format_sample(sample)}"
+        else:
+            return
+
+        self.log.warning(f"[{ctx.display_name}] {message}")
+        self.server.dispatch("tps_alert", ctx, message)
+
+    # ----- display -----
+
+    @staticmethod
+    def format_sample(sample: TickSample) -> str:
+        if sample.mspt is None:
+            return f"TPS {sample.tps:.1f}"
+        return f"TPS {sample.tps:.1f}, MSPT {sample.mspt:.1f}ms"
+
+    @staticmethod
+    def sparkline(samples: deque[TickSample], width: int = 30) -> str:
+        values = [
+            i.mspt if i.mspt is not None else 1000 / i.tps if i.tps > 0 else math.inf
+            for i in list(samples)[-width:]
+        ]
+        if not values:
+            return ""
+        # one full tick at the least, a stalled server (TPS 0) is a full bar
+        top = max(max((i for i in values if i < math.inf), default=0.0), 50.0)
+        return "".join(
+            SPARK[min(int(min(i, top) / top * len(SPARK)), len(SPARK) - 1)]
+            for i in values
+        )
+
+    def format_server(
+        self,
+        name: str,
+        ticks: ServerTicks,
+        escape: Callable[[str], str] = str,
+    ) -> str:
+        offline = "" if ticks.online else " offline [離線]"
+        if not ticks.samples:
+            return f"- [{escape(name)}]{offline or ' no data [無資料]'}"
+
+        last = ticks.samples[-1]
+        mspts = [i.mspt for i in ticks.samples if i.mspt is not None]
+        peak = f", peak [最高] {max(mspts):.1f}ms" if mspts else ""
+        status = (" ⚠" if ticks.alerted else "") + offline
+        return (
+            f"- [{escape(name)}]{status} {self.format_sample(last)}{peak} "
+            f"`{self.sparkline(ticks.samples)}`"
+        )
+
+    @Plugin.listener
+    async def on_command_tps(self):
+        table = Table(header_style="bold magenta")
+        for column in (
+            "伺服器",
+            "TPS",
+            "MSPT",
+            "平均 MSPT",
+            "最高 MSPT",
+            "樣本",
+            "間隔 s",
+            "趨勢",
+        ):
+            table.add_column(column)
+
+        for name, ticks in self.servers.items():
+            if not ticks.online:
+                name = f"[dim]{name} (離線)[/dim]"
+            elif ticks.alerted:
+                name = f"[red]{name}[/red]"
+
+            if not ticks.samples:
+                table.add_row(
+                    name, "-", "-", "-", "-", "0", f"{ticks.interval:.0f}", ""
+                )
+                continue
+
+            last = ticks.samples[-1]
+            mspts = [i.mspt for i in ticks.samples if i.mspt is not None]
+            table.add_row(
+                name,
+                f"{last.tps:.1f}",
+                "-" if last.mspt is None else f"{last.mspt:.1f}",
+                f"{sum(mspts) / len(mspts):.1f}" if mspts else "-",
+                f"{max(mspts):.1f}" if mspts else "-",
+                str(len(ticks.samples)),
+                f"{ticks.interval:.0f}",
+                self.sparkline(ticks.samples),
+            )
+
+        rich_print(table)
 
 
 def setup(server: BaseServer):
@@ -1,4 +1,5 @@
 import logging
+import tracemalloc
 
 from rich import print as rich_print
 from rich.table import Table
@@ -24,6 +25,17 @@ class BasePlugin_Commands(BasePlugin, description="指令處理"):
                 v.__plugin_description__,
             )
 
+        for setup in self.server.setups.values():
+            if not setup.isolated or setup.process is None:
+                continue
+            for name, description in setup.process.plugins:
+                table.add_row(
+                    str(table.row_count + 1),
+                    name,
+                    f"{setup.name[len(self.server.plugins_dir) + 1 :]} (子進程)",
+                    description,
+                )
+
         rich_print(table)
 
     @Plugin.listener
@@ -57,20 +69,69 @@ class BasePlugin_Commands(BasePlugin, description="指令處理"):
 
     @Plugin.listener
     async def on_command_plugin_reload(self, name: str = MISSING):
+        # hot reload, events are buffered during the reload instead of dropped
         if name is MISSING:
-            for plugin in self.server.plugins.copy().values():
-                if isinstance(plugin, BasePlugin):
-                    continue
-
-                name = plugin.__module__[len(self.server.plugins_dir) + 1 :]
-                await self.on_command_plugin_remove(name)
-                await self.on_command_plugin_add(name)
+            for setup_name in list(self.server.setups):
+                try:
+                    await self.server.hot_reload_extension(setup_name)
+                except Exception:
+                    log.exception(f"插件 {setup_name} 重新加載失敗")
 
             print("插件重新加載完成")
             return
 
-        if await self.on_command_plugin_remove(name):
-            await self.on_command_plugin_add(name)
+        try:
+            await self.server.hot_reload_extension(f"{self.server.plugins_dir}.{name}")
+        except ExtensionNotFound:
+            print("插件不存在")
+        except Exception:
+            log.exception(f"插件 {name} 重新加載失敗")
+        else:
+            print("插件重新加載完成")
+
+    @Plugin.listener
+    async def on_command_plugin_stats(self, name: str = MISSING):
+        collector = self.server.plugin_stats
+        collector.sample_memory(self.server.plugins)
+        tracing = tracemalloc.is_tracing()
+
+        table = Table(show_lines=True, header_style="bold magenta")
+        for column in (
+            "插件",
+            "調用次數",
+            "總耗時 ms",
+            "平均 ms",
+            "最長 ms",
+            "任務數",
+            "錯誤",
+        ):
+            table.add_column(column)
+        if tracing:
+            table.add_column("記憶體 KiB")
+
+        names = list(self.server.plugins) if name is MISSING else [name]
+        for plugin_name in names:
+            if plugin_name not in self.server.plugins:
+                print(f"插件 {plugin_name} 不存在")
+                return
+            stats = collector.get(plugin_name)
+            row = [
+                plugin_name,
+                str(stats.calls),
+                f"{stats.total_time * 1000:.1f}",
+                f"{stats.average_time * 1000:.2f}",
+                f"{stats.max_time * 1000:.1f}",
+                str(stats.live_tasks),
+                str(stats.errors),
+            ]
+            if tracing:
+                row.append(f"{(stats.memory or 0) / 1024:.1f}")
+            table.add_row(*row)
+
+        rich_print(table)
+
+        if name is not MISSING and (error := collector.get(name).last_error):
+            print(f"最後錯誤: {error}")
 
     @Plugin.listener
     async def on_command_send_all(self, message: str = MISSING):
@@ -4,7 +4,7 @@ import asyncio
 from asyncio import Future
 from typing import TYPE_CHECKING, Any, Callable, List, Optional, Union
 
-from .utils import MISSING, RconClient
+from .utils import MISSING
 
 if TYPE_CHECKING:
     from . import BaseServer
@@ -29,15 +29,15 @@ class Context:
         self._extra_command_wait: dict[str, list[Future[dict]]] = {}
         self.server.add_listener(self._cmd_callback_callback, name="cmd_callback")
 
-        self.rcon: RconClient | None = None
+        # connections are shared through `server.rcon`, only the target is kept
+        self.rcon_target: tuple[str | None, int | None, str | None] | None = None
 
         # check rcon config is valid
         if isinstance(rcon := self.auth.get("rcon"), dict):
-            self.rcon = RconClient(
-                host=rcon.get("ip", None),
-                port=rcon.get("port", None),
-                password=rcon.get("password", None),
-                loop=server.loop,
+            self.rcon_target = (
+                rcon.get("ip", None),
+                rcon.get("port", None),
+                rcon.get("password", None),
             )
 
     async def _cmd_callback_callback(self, ctx: "Context", result: dict) -> None:
@@ -106,16 +106,37 @@ class Context:
 
     async def execute_command(self, command: str, exc_timeout: bool = True):
         """execute command on rcon"""
-        if not self.rcon:
+        if not self.rcon_target:
             return ...
 
-        await self.rcon.connect()
         try:
-            return await self.rcon.execute(command)
-        except TimeoutError as e:
+            return await self.server.rcon.execute(*self.rcon_target, command)
+        except asyncio.TimeoutError as e:
             if exc_timeout:
                 raise e
 
+    async def query_command(
+        self,
+        command: str,
+        exc_timeout: bool = True,
+        *,
+        ttl: float | None = None,
+    ):
+        """execute a read-only command on rcon, cached, see `RconPool.query`"""
+        if not self.rcon_target:
+            return ...
+
+        try:
+            return await self.server.rcon.query(*self.rcon_target, command, ttl=ttl)
+        except asyncio.TimeoutError as e:
+            if exc_timeout:
+                raise e
+
+    def invalidate_queries(self) -> None:
+        """drop the cached query responses of this server"""
+        if self.rcon_target:
+            self.server.rcon.invalidate(*self.rcon_target)
+
     @property
     def name(self) -> str:
         return self.user.name
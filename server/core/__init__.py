@@ -1,3 +1,6 @@
 from .command import *
 from .logging import *
+from .presence import *
+from .rcon import *
 from .server import *
+from .transfer import *
@@ -5,6 +5,8 @@ from typing import Any, Dict, Generic, Literal, NamedTuple, Optional, TypeVar, U
 
 import yaml
 
+from ..utils.schema import ConfigRecord, Schema
+
 __all__ = ("Config", "ConfigType")
 
 
@@ -15,7 +17,7 @@ _T = TypeVar("_T")
 
 class UserAuth(NamedTuple):
     password: str
-    display_name: Optional[str]
+    display_name: Optional[str] = None
 
 
 class UserData(NamedTuple):
@@ -25,11 +27,27 @@ class UserData(NamedTuple):
 
 class ConfigType(NamedTuple):
     stop_plugins: list[str] = []
+    # {plugin name: [event names]}, imported on the first matching event
+    lazy_plugins: Dict[str, list[str]] = {}
+    # plugin names hosted in a child process
+    process_plugins: list[str] = []
+    # sample plugin memory with tracemalloc in `plugin stats`, slows the server
+    trace_plugin_memory: bool = False
     users: Dict[str, UserAuth] = {
         "Survival": UserAuth("SurvivalPassword", "生存服")._asdict()
     }  # dict[name, UserAuth]
     plugins_path: str = "plugins"
-    port: str = 8081
+    # synced files kept for the clients to pull, least recently used evicted first
+    file_store_path: str = "file_store"
+    file_store_max_size: int = 1024  # MiB
+    # rcon connections shared by the plugins, per server
+    rcon_max_connections: int = 2
+    rcon_idle_timeout: int = 600  # seconds
+    # {command name: seconds} read-only query responses are cached
+    rcon_query_ttl: Dict[str, float] = {"list": 5, "glist": 5, "scoreboard": 10}
+    # seconds between rcon `list` checks of the players tracked from events, 0 never
+    presence_reconcile_interval: int = 300
+    port: int = 8081
     host: str = "localhost"
 
 
@@ -45,10 +63,12 @@ class Config(Generic[_RT]):
         self.config_type = config_type
         self.filepath = self.directory / f"{config_name}.{config_type}"
 
-        if default_config is None:
-            self.default_config = ConfigType()
+        self.default_config = ConfigType() if default_config is None else default_config
+        self.schema = Schema.from_class(type(self.default_config))
+        self.options: ConfigRecord
 
         self.check_config()
+        self.compile()
 
     def check_config(self, replay: bool = False) -> None:
         self.directory.mkdir(parents=True, exist_ok=True)
@@ -81,6 +101,11 @@ class Config(Generic[_RT]):
 
         return dict(**data)
 
+    def compile(self) -> ConfigRecord:
+        """validate the config file once, the result is cached in `self.options`"""
+        self.options = self.schema.compile(self.read_config(), source=self.filepath)
+        return self.options
+
     def write(self, data: _RT) -> None:
         self.check_config()
 
@@ -90,11 +115,10 @@ class Config(Generic[_RT]):
             elif self.config_type == "yaml":
                 yaml.dump(data, f, allow_unicode=True, indent=2)
 
+        self.compile()
+
     def get(self, key: str, default: Optional[_T] = None) -> _T:
-        return self.read_config().get(
-            key,
-            default or self.default_config._field_defaults.get(key),
-        )
+        return getattr(self.options, key, default)
 
     def set(self, key: str, value: Any) -> None:
         data = self.read_config()
@@ -115,7 +139,7 @@ class Config(Generic[_RT]):
             return None
 
         try:
-            data = self.get(key, [])
+            data = list(self.get(key, []))
             data.remove(value)
         except ValueError:
             pass
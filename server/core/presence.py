@@ -0,0 +1,186 @@
+"""
+Presence
+========
+The online players of every client, kept from the `player_joined` / `player_left`
+events instead of asking RCON each time.
+
+A client is seeded with one RCON `list` when it connects and on `server_startup`,
+a started server without RCON starts empty. Every `reconcile_interval` seconds the
+lists are asked again to correct missed events. `server_stop` empties the players,
+a disconnect forgets them.
+
+Events arriving while a `list` is on the way are replayed on top of its answer,
+joining and leaving are idempotent, so it does not matter whether the answer
+already saw them.
+
+Each answered `list` is dispatched as `presence_synced(ctx, players)` with the
+players after the replay, for the plugins keeping their own state from the events.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from ..context import Context
+    from .server import BaseServer
+
+__all__ = ("PresenceTracker", "Presence", "parse_player_list")
+
+log = logging.getLogger("chat-bridgee")
+
+LIST_TIMEOUT = 10
+
+# <1.16  There are 3 of a max 50 players online: A, B, C
+# >=1.16 There are 3 of a max of 50 players online: A, B, C
+player_list_match = re.compile(
+    r"There are \d+ of a max(?: of)? \d+ players online:(.*)"
+)
+
+
+def parse_player_list(data: str) -> Optional[set[str]]:
+    """the players of a `list` response, None when it is not one"""
+    if parsed := player_list_match.match(data):
+        return set(i.strip() for i in parsed.group(1).split(",") if i.strip())
+    return None
+
+
+class Presence(NamedTuple):
+    players: frozenset[str]
+    # False while only the events since the connection are known
+    complete: bool
+    updated: float  # time.time()
+
+
+class PresenceEntry:
+    def __init__(self, sid: str) -> None:
+        self.sid = sid
+        self.players: set[str] = set()
+        self.complete = False
+        self.updated = time.time()
+        # (joined, player) received while a `list` is running, None otherwise
+        self.journal: Optional[list[tuple[bool, str]]] = None
+
+    def apply(self, joined: bool, player: str) -> None:
+        if joined:
+            self.players.add(player)
+        else:
+            self.players.discard(player)
+        self.updated = time.time()
+        if self.journal is not None:
+            self.journal.append((joined, player))
+
+
+class PresenceTracker:
+    def __init__(self, server: BaseServer, *, reconcile_interval: float = 300) -> None:
+        self.server = server
+        self.reconcile_interval = reconcile_interval
+        self.entries: dict[str, PresenceEntry] = {}  # {client name: entry}
+        self.reconcile_task: Optional[asyncio.Task] = None
+
+        for listener in (
+            self.on_connect,
+            self.on_disconnect,
+            self.on_server_startup,
+            self.on_server_stop,
+            self.on_player_joined,
+            self.on_player_left,
+        ):
+            server.add_listener(listener)
+
+        if reconcile_interval > 0:
+            self.reconcile_task = server.loop.create_task(self.reconcile())
+
+    def get(self, name: str) -> Optional[Presence]:
+        """the players of a client by name, None when it is not connected"""
+        if (entry := self.entries.get(name)) is None:
+            return None
+        return Presence(frozenset(entry.players), entry.complete, entry.updated)
+
+    def snapshot(self) -> dict[str, Presence]:
+        """the players of every client, sent to the plugin processes"""
+        return {name: self.get(name) for name in self.entries}
+
+    def entry(self, ctx: Context) -> PresenceEntry:
+        if (entry := self.entries.get(ctx.name)) is None or entry.sid != ctx.sid:
+            entry = self.entries[ctx.name] = PresenceEntry(ctx.sid)
+        return entry
+
+    async def sync(self, ctx: Context) -> bool:
+        """seed a client from RCON `list`, False when it could not be asked"""
+        entry = self.entry(ctx)
+        if entry.journal is not None:
+            return False  # already running
+
+        entry.journal = []
+        try:
+            res = await asyncio.wait_for(ctx.execute_command("list"), LIST_TIMEOUT)
+        except Exception as e:
+            log.debug(f"玩家列表同步失敗 [{ctx}]: {e!r}")
+            return False
+        finally:
+            journal, entry.journal = entry.journal, None
+
+        if res is ... or not res:
+            return False  # no rcon
+        if (players := parse_player_list(res["data"])) is None:
+            return False
+        if self.entries.get(ctx.name) is not entry:
+            return False  # disconnected meanwhile
+
+        if entry.complete and players != entry.players:
+            log.info(
+                f"玩家列表已校正 [{ctx}]: {sorted(entry.players)} -> {sorted(players)}"
+            )
+        entry.players = players
+        for joined, player in journal:
+            entry.apply(joined, player)
+        entry.complete = True
+        entry.updated = time.time()
+        self.server.dispatch("presence_synced", ctx, frozenset(entry.players))
+        return True
+
+    async def reconcile(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            clients = list(self.server.clients.values())
+            await asyncio.gather(
+                *(self.sync(i) for i in clients), return_exceptions=True
+            )
+
+    def close(self) -> None:
+        if self.reconcile_task is not None:
+            self.reconcile_task.cancel()
+            self.reconcile_task = None
+
+    async def on_connect(self, ctx: Context, auth: dict) -> None:
+        await self.sync(ctx)
+
+    async def on_disconnect(self, ctx: Context) -> None:
+        # not a newer connection of the same client
+        if (entry := self.entries.get(ctx.name)) and entry.sid == ctx.sid:
+            del self.entries[ctx.name]
+
+    def clear(self, ctx: Context) -> None:
+        entry = self.entry(ctx)
+        entry.players.clear()
+        entry.complete = True
+        entry.updated = time.time()
+
+    async def on_server_startup(self, ctx: Context) -> None:
+        # nobody is on a server that just started, right without rcon too
+        self.clear(ctx)
+        await self.sync(ctx)
+
+    async def on_server_stop(self, ctx: Context) -> None:
+        self.clear(ctx)
+
+    async def on_player_joined(self, ctx: Context, player_name: str) -> None:
+        self.entry(ctx).apply(True, player_name)
+
+    async def on_player_left(self, ctx: Context, player_name: str) -> None:
+        self.entry(ctx).apply(False, player_name)
@@ -0,0 +1,279 @@
+"""
+RCON pool
+=========
+Rcon connections shared by the whole server and every plugin, by host, port and
+password. A target keeps up to `max_connections` connections, a command goes to
+the least busy one and another connection is only opened when all are busy.
+
+Idle connections are probed with an empty packet every `HEALTH_INTERVAL` seconds
+and closed after `idle_timeout`, a connection failing a probe or a command is
+dropped and opened again by the next command. Failed connects are retried after
+an exponential backoff, commands fail fast in between.
+
+Read-only commands (`list`, `glist`, scoreboard queries) go through `query`, the
+response is kept for the command's TTL and concurrent identical queries share one
+round trip. `invalidate` drops what is cached for a server, the bridge calls it
+when a player joins or leaves.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from asyncio import AbstractEventLoop
+from typing import Iterable, NamedTuple, Optional
+
+from ..utils import (
+    RconClient,
+    RconConnectionError,
+    RconPacketData,
+    ReconException,
+)
+
+__all__ = ("RconKey", "RconPool")
+
+log = logging.getLogger("chat-bridgee")
+
+CONNECT_TIMEOUT = 10
+HEALTH_INTERVAL = 30
+PING_TIMEOUT = 10
+MIN_BACKOFF = 1
+MAX_BACKOFF = 60
+
+
+class RconKey(NamedTuple):
+    host: str
+    port: int
+    password: str
+
+    @classmethod
+    def create(
+        cls,
+        host: Optional[str],
+        port: int | str | None,
+        password: Optional[str],
+    ) -> RconKey:
+        """with the defaults of `RconClient`"""
+        return cls(
+            "localhost" if host is None else host,
+            int(25575 if port is None else port),
+            "" if password is None else password,
+        )
+
+    def __str__(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+class RconTarget:
+    def __init__(self, key: RconKey) -> None:
+        self.key = key
+        self.clients: list[RconClient] = []
+        # commands waiting on each connection and when it was last used
+        self.busy: dict[RconClient, int] = {}
+        self.last_used: dict[RconClient, float] = {}
+        self.failures = 0
+        self.retry_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def add(self, client: RconClient) -> None:
+        self.clients.append(client)
+        self.busy[client] = 0
+        self.last_used[client] = time.monotonic()
+
+    def drop(self, client: RconClient) -> None:
+        if client in self.busy:
+            self.clients.remove(client)
+            del self.busy[client], self.last_used[client]
+        client.disconnect()
+
+    def least_busy(self) -> Optional[RconClient]:
+        for client in [i for i in self.clients if not i.is_connected]:
+            self.drop(client)
+        return min(self.clients, key=self.busy.__getitem__, default=None)
+
+
+class RconPool:
+    def __init__(
+        self,
+        loop: AbstractEventLoop,
+        *,
+        max_connections: int = 2,
+        idle_timeout: float = 600,
+        query_ttl: dict[str, float] | None = None,
+    ) -> None:
+        self.loop = loop
+        self.max_connections = max(1, max_connections)
+        self.idle_timeout = idle_timeout
+        self.targets: dict[RconKey, RconTarget] = {}
+        self.health_task: Optional[asyncio.Task] = None
+
+        # {command name: seconds}, other commands are only coalesced
+        self.query_ttl = {} if query_ttl is None else query_ttl
+        # {(target, command): (expire time, response)}
+        self.cache: dict[tuple[RconKey, str], tuple[float, RconPacketData]] = {}
+        self.inflight: dict[tuple[RconKey, str], asyncio.Task] = {}
+
+    async def execute(
+        self,
+        host: Optional[str],
+        port: int | str | None,
+        password: Optional[str],
+        command: str,
+        *,
+        timeout: float | None = None,
+    ) -> RconPacketData:
+        """run a command, raises `ReconException`, `OSError` or `TimeoutError`"""
+        key = RconKey.create(host, port, password)
+        if (target := self.targets.get(key)) is None:
+            target = self.targets[key] = RconTarget(key)
+        if self.health_task is None:
+            self.health_task = self.loop.create_task(self.check_health())
+
+        client = await self.acquire(target)
+        target.busy[client] += 1
+        try:
+            return await client.execute(command, timeout=timeout)
+        except (ReconException, asyncio.TimeoutError):
+            if not client.is_connected:
+                target.drop(client)
+            raise
+        finally:
+            if client in target.busy:
+                target.busy[client] -= 1
+                target.last_used[client] = time.monotonic()
+
+    async def query(
+        self,
+        host: Optional[str],
+        port: int | str | None,
+        password: Optional[str],
+        command: str,
+        *,
+        ttl: float | None = None,
+        timeout: float | None = None,
+    ) -> RconPacketData:
+        """`execute` a read-only command, cached for `ttl` seconds (`query_ttl` of
+        the command name by default), concurrent calls wait for the same response
+        """
+        key = (RconKey.create(host, port, password), command)
+        if (cached := self.cache.get(key)) and cached[0] > time.monotonic():
+            return cached[1]
+
+        if (task := self.inflight.get(key)) is None:
+            if ttl is None:
+                ttl = self.query_ttl.get(command.split(" ", 1)[0], 0)
+            task = self.inflight[key] = self.loop.create_task(
+                self._query(key, ttl, timeout)
+            )
+            # retrieved even when every caller was cancelled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        # a caller cancelled does not cancel the others
+        return await asyncio.shield(task)
+
+    async def _query(
+        self,
+        key: tuple[RconKey, str],
+        ttl: float,
+        timeout: float | None,
+    ) -> RconPacketData:
+        task = asyncio.current_task()
+        try:
+            result = await self.execute(*key[0], key[1], timeout=timeout)
+        finally:
+            if self.inflight.get(key) is task:
+                del self.inflight[key]
+            else:
+                # invalidated while running, the response may be stale
+                ttl = 0
+
+        if ttl > 0:
+            self.cache[key] = (time.monotonic() + ttl, result)
+        return result
+
+    def invalidate(
+        self,
+        host: Optional[str],
+        port: int | str | None,
+        password: Optional[str],
+        commands: Iterable[str] | None = None,
+    ) -> None:
+        """drop the cached responses of a server, of the given command names only
+        when `commands` is set, running queries are not cached
+        """
+        target = RconKey.create(host, port, password)
+        names = None if commands is None else set(commands)
+        for store in (self.cache, self.inflight):
+            for key in [i for i in store if i[0] == target]:
+                if names is None or key[1].split(" ", 1)[0] in names:
+                    del store[key]
+
+    async def acquire(self, target: RconTarget) -> RconClient:
+        client = target.least_busy()
+        if client is not None and (
+            not target.busy[client] or len(target.clients) >= self.max_connections
+        ):
+            return client
+
+        async with target.lock:
+            # opened while waiting for the lock
+            if (client := target.least_busy()) is not None and (
+                not target.busy[client] or len(target.clients) >= self.max_connections
+            ):
+                return client
+
+            if (wait := target.retry_at - time.monotonic()) > 0:
+                if client is not None:
+                    return client
+                raise RconConnectionError(f"{target.key} 無法連線, {wait:.0f} 秒後重試")
+
+            new_client = RconClient(*target.key, loop=self.loop)
+            try:
+                await asyncio.wait_for(new_client.connect(), CONNECT_TIMEOUT)
+            except (ReconException, OSError, asyncio.TimeoutError) as e:
+                new_client.disconnect()
+                backoff = min(MAX_BACKOFF, MIN_BACKOFF * 2**target.failures)
+                target.failures += 1
+                target.retry_at = time.monotonic() + backoff
+                log.warning(f"rcon 連線失敗 {target.key}: {e!r}, {backoff} 秒後重試")
+                if client is not None:
+                    return client
+                raise
+
+            target.failures = 0
+            target.add(new_client)
+            return new_client
+
+    async def check_health(self) -> None:
+        while True:
+            await asyncio.sleep(HEALTH_INTERVAL)
+            now = time.monotonic()
+            for key in [k for k, v in self.cache.items() if v[0] <= now]:
+                del self.cache[key]
+
+            for target in list(self.targets.values()):
+                for client in list(target.clients):
+                    if target.busy.get(client, 1):
+                        continue
+                    if now - target.last_used[client] >= self.idle_timeout:
+                        target.drop(client)
+                        continue
+                    try:
+                        await client.ping(timeout=PING_TIMEOUT)
+                    except (ReconException, asyncio.TimeoutError) as e:
+                        log.info(f"rcon 連線中斷 {target.key}: {e!r}")
+                        target.drop(client)
+
+                if not target.clients and now >= target.retry_at:
+                    del self.targets[target.key]
+
+    def close(self) -> None:
+        if self.health_task is not None:
+            self.health_task.cancel()
+            self.health_task = None
+        for target in self.targets.values():
+            for client in list(target.clients):
+                target.drop(client)
+        self.targets.clear()
+        self.cache.clear()
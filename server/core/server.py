@@ -4,19 +4,38 @@ import asyncio
 import inspect
 import logging
 import os
+import sys
+import time
+import tracemalloc
 from asyncio import AbstractEventLoop
+from collections import deque
 from pathlib import Path
-from typing import Any, Callable, Coroutine, List, Optional, TypeVar, Union
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    List,
+    NamedTuple,
+    Optional,
+    TypeVar,
+    Union,
+)
 
 import rich
 from aiohttp import web
 from socketio import AsyncServer
 
 from ..context import Context
-from ..plugin import PluginMixin, SoloSetup
-from ..utils import MISSING, FileEncode, FormatMessage
+from ..errors import ExtensionNotFound
+from ..plugin import PluginMixin, SoloSetup, _is_submodule
+from ..stats import TRACEMALLOC_FRAMES, PluginStatsCollector, current_plugin
+from ..utils import MISSING, FileEncodeView, FormatMessage
 from . import CommandManager
-from .config import Config, UserData
+from .config import Config, UserAuth, UserData
+from .presence import PresenceTracker
+from .rcon import RconPool
+from .store import FileStore
+from .transfer import TransferManager
 
 __all__ = ("BaseServer",)
 
@@ -25,6 +44,16 @@ log = logging.getLogger("chat-bridgee")
 CoroFunc = Callable[..., Coroutine[Any, Any, Any]]
 CoroFuncT = TypeVar("CoroFuncT", bound=CoroFunc)
 
+# max events kept for plugins that are still loading
+EVENT_BUFFER_SIZE = 1000
+
+
+class BufferedEvent(NamedTuple):
+    name: str
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+    pending: set[str]  # setup names that have not received the event yet
+
 
 class BaseServer(PluginMixin):
     def __init__(
@@ -36,6 +65,11 @@ class BaseServer(PluginMixin):
 
         self.loop = asyncio.get_running_loop() if loop is None else loop
         self.extra_events: dict[str, list[CoroFunc]] = {}
+        self.event_buffer: deque[BufferedEvent] = deque(maxlen=EVENT_BUFFER_SIZE)
+        self.lazy_extensions: dict[str, list[Path]] = {}  # {event_method: [path]}
+        self.paused_setups: set[str] = set()  # events are buffered, see `dispatch`
+        self.plugin_stats = PluginStatsCollector()
+        self.plugin_stats.install(self.loop)
 
         self.clients: dict[str, Context] = {}
         self.sio_server = AsyncServer(
@@ -48,7 +82,29 @@ class BaseServer(PluginMixin):
         self.config = Config("chatbridgee-config", config_type=config_type)
         self.plugins_dir = self.config.get("plugins_path")
 
+        self.transfers: TransferManager = TransferManager(
+            self,
+            FileStore(
+                self.config.get("file_store_path"),
+                self.config.get("file_store_max_size") * 1024 * 1024,
+            ),
+        )
+        self.rcon: RconPool = RconPool(
+            self.loop,
+            max_connections=self.config.get("rcon_max_connections"),
+            idle_timeout=self.config.get("rcon_idle_timeout"),
+            query_ttl=dict(self.config.get("rcon_query_ttl")),
+        )
+        self.presence: PresenceTracker = PresenceTracker(
+            self,
+            reconcile_interval=self.config.get("presence_reconcile_interval"),
+        )
+
+        if self.config.get("trace_plugin_memory") and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
         self.sio_server.attach(self.app)
+        self.transfers.attach(self.sio_server)
         self.__handle_events()
 
         self.app.on_shutdown.append(self.__on_shutdown)
@@ -94,6 +150,17 @@ class BaseServer(PluginMixin):
         method = f"on_{event_name}"
         log.debug(f"Dispatching event {event_name!r}, {args}, {kwargs}")
 
+        for path in self.lazy_extensions.pop(method, []):
+            self.load_lazy_extension(path)
+
+        # replayed to the plugins once they are loaded or reloaded
+        if pending := self.loading_setups.keys() | self.paused_setups:
+            if len(self.event_buffer) == self.event_buffer.maxlen:
+                log.warning(f"事件緩衝區已滿, 丟棄最舊的事件 ({pending})")
+            self.event_buffer.append(
+                BufferedEvent(event_name, args, kwargs, pending),
+            )
+
         try:
             coro = getattr(self, method)
         except AttributeError:
@@ -102,8 +169,14 @@ class BaseServer(PluginMixin):
             self._schedule_event(coro, method, *args, **kwargs)
 
         for func in self.extra_events.get(method, []):
+            if self.paused_setups and self._is_paused(func):
+                continue
             self._schedule_event(func, event_name, *args, **kwargs)
 
+    def _is_paused(self, func: CoroFunc) -> bool:
+        module = getattr(func, "__module__", None) or ""
+        return any(_is_submodule(name, module) for name in self.paused_setups)
+
     async def _run_event(
         self,
         coro: Callable[..., Coroutine[Any, Any, Any]],
@@ -111,6 +184,12 @@ class BaseServer(PluginMixin):
         *args: Any,
         **kwargs: Any,
     ) -> None:
+        stats = None
+        if (owner := self.plugin_stats.owner_of(coro)) is not None:
+            stats = self.plugin_stats.get(owner)
+            stats.calls += 1
+        start = time.perf_counter()
+
         try:
             if asyncio.iscoroutinefunction(coro):
                 # inhibition `TypeError takes x positional argument but x were given`
@@ -119,11 +198,19 @@ class BaseServer(PluginMixin):
                 await coro(*args, **kwargs)
             else:
                 coro(*args, **kwargs)
-        except Exception:
+        except Exception as e:
+            if stats is not None:
+                stats.errors += 1
+                stats.last_error = f"{event_name}: {e!r}"
             try:
                 await self.on_error(event_name, *args, **kwargs)
             except asyncio.CancelledError:
                 pass
+        finally:
+            if stats is not None:
+                elapsed = time.perf_counter() - start
+                stats.total_time += elapsed
+                stats.max_time = max(stats.max_time, elapsed)
 
     def __get_args_len(self, coro: Callable[..., Any]) -> int:
         count = 0
@@ -142,10 +229,16 @@ class BaseServer(PluginMixin):
         *args: Any,
         **kwargs: Any,
     ):
-        return asyncio.create_task(
-            self._run_event(coro, event_name, *args, **kwargs),
-            name=f"ChatBridgeE: {event_name}",
-        )
+        # the task and the tasks it creates belong to the listener's plugin, not
+        # to a plugin dispatching the event
+        token = current_plugin.set(self.plugin_stats.owner_of(coro))
+        try:
+            return asyncio.create_task(
+                self._run_event(coro, event_name, *args, **kwargs),
+                name=f"ChatBridgeE: {event_name}",
+            )
+        finally:
+            current_plugin.reset(token)
 
     # ----- `on_` events -----
 
@@ -205,7 +298,13 @@ class BaseServer(PluginMixin):
                 args = raw_data
 
             if event_name == "file_sync":
-                data = FileEncode.decode(raw_data)
+                # header only, the data is not copied until a plugin reads it
+                try:
+                    data = FileEncodeView(raw_data)
+                except (TypeError, ValueError) as e:
+                    self.transfers.stats.corrupt_packets += 1
+                    log.warning(f"收到從 [{ctx}] 發送的損壞檔案: {e}")
+                    return
                 data.server_name = ctx.display_name
 
                 args = [data]
@@ -218,8 +317,9 @@ class BaseServer(PluginMixin):
     async def start(self) -> web.AppRunner:
         runner = web.AppRunner(self.app)
         await runner.setup()
-        port = int(self.config.get("port", os.getenv("PORT")))
-        site = web.TCPSite(runner, self.config.get("host", os.getenv("HOST")), port)
+        options = self.config.options
+        port = options.port or int(os.getenv("PORT"))
+        site = web.TCPSite(runner, options.host or os.getenv("HOST"), port)
         await site.start()
 
         print(f"======= Serving on http://localhost:{port}/ ======")
@@ -230,17 +330,14 @@ class BaseServer(PluginMixin):
         # use copy inhibition `RuntimeError: dictionary changed size during iteration`
         for client in self.clients.copy().values():
             await client.disconnect()
+        self.transfers.close()
+        self.rcon.close()
+        self.presence.close()
 
     def check_user(self, name: str, password: str) -> Optional[UserData]:
-        users = self.config.get("users", {})
-        try:
-            if (user := users.get(name)) and user.get("password") == password:
-                return UserData(
-                    name=name,
-                    display_name=user.get("display_name"),
-                )
-        except TypeError:
-            pass
+        users: dict[str, UserAuth] = self.config.options.users
+        if (user := users.get(name)) and user.password == password:
+            return UserData(name=name, display_name=user.display_name)
 
         return None
 
@@ -251,6 +348,38 @@ class BaseServer(PluginMixin):
 
         return None
 
+    async def publish_file(
+        self,
+        name: str,
+        data: Union[bytes, memoryview],
+        *,
+        server_name: Optional[str] = None,
+        skip_sid: Optional[str] = None,
+    ) -> None:
+        """keep a file in the store and tell the clients it is available to pull"""
+        await self.transfers.publish(
+            name,
+            data,
+            server_name=server_name,
+            skip_sid=skip_sid,
+        )
+
+    async def publish_path(
+        self,
+        name: str,
+        path: Union[str, Path],
+        *,
+        server_name: Optional[str] = None,
+        skip_sid: Optional[str] = None,
+    ) -> None:
+        """like `publish_file` for a file on disk, which is moved into the store"""
+        await self.transfers.publish_path(
+            name,
+            path,
+            server_name=server_name,
+            skip_sid=skip_sid,
+        )
+
     async def emit(
         self,
         event: str,
@@ -308,23 +437,142 @@ class BaseServer(PluginMixin):
             **kwargs,
         )
 
-    def load_extension(self, name: str | Path | SoloSetup) -> None:
-        setup = self.setup_from_name(name)
-        setup.setup_func()
+    def add_lazy_extension(self, path: Path, events: list[str]) -> None:
+        """load the extension on the first dispatch of one of `events`"""
+        for event in events:
+            if event.startswith("command_"):
+                self.command_manager.add_command(" ".join(event.split("_")[1:]))
 
+            self.lazy_extensions.setdefault(f"on_{event}", []).append(path)
+
+    def load_lazy_extension(self, path: Path) -> None:
+        for paths in self.lazy_extensions.values():
+            if path in paths:
+                paths.remove(path)
+
+        log.info(f"延遲加載插件: {path}")
+        try:
+            self.load_extension_background(path)
+        except Exception:
+            log.exception(f"延遲加載插件 {path} 失敗")
+
+    def _on_setup_done(self, setup: SoloSetup, loaded: bool) -> None:
+        plugins = [
+            plugin
+            for plugin in self.plugins.values()
+            if loaded and _is_submodule(setup.name, plugin.__module__)
+        ]
+
+        for event in self.event_buffer:
+            if setup.name not in event.pending:
+                continue
+            event.pending.discard(setup.name)
+
+            method = f"on_{event.name}"
+            for plugin in plugins:
+                for name, method_names in plugin.__plugin_events__.items():
+                    if method not in (name, f"on_{name}"):
+                        continue
+                    for method_name in method_names:
+                        self._schedule_event(
+                            getattr(plugin, method_name),
+                            event.name,
+                            *event.args,
+                            **event.kwargs,
+                        )
+
+        # drop events every loading plugin has received
+        while self.event_buffer and not self.event_buffer[0].pending:
+            self.event_buffer.popleft()
+
+    def load_extension(
+        self,
+        name: str | Path | SoloSetup,
+        *,
+        process: bool = False,
+    ) -> None:
+        super().load_extension(name, process=process)
         self.config.remove("stop_plugins", name)
-        return super().load_extension(setup)
 
     def unload_extension(self, name: str | Path | SoloSetup) -> None:
-        setup = self.setup_from_name(name)
-        setup.setup_func()
-
+        plugins = set(self.plugins)
+        super().unload_extension(name)
+        # kept over a reload, dropped with the plugin
+        for plugin_name in plugins - self.plugins.keys():
+            self.plugin_stats.remove(plugin_name)
         self.config.append("stop_plugins", name, only_one=True)
-        return super().unload_extension(setup)
 
     def reload_extension(self, name: str | Path | SoloSetup) -> None:
+        super().unload_extension(name)
+        super().load_extension(name)
+
+    async def hot_reload_extension(
+        self,
+        name: str | Path | SoloSetup,
+        *,
+        keep_state: bool = True,
+    ) -> SoloSetup:
+        """
+        reload without dropping events, delivery to the extension is paused and its
+        events are buffered while the new module imports, then replayed to the new
+        plugins. With `keep_state` each old plugin can hand over state (`save_state`)
+        to the new plugin with the same name (`load_state`).
+        """
         setup = self.setup_from_name(name)
-        setup.setup_func()
+        if (old := self.setups.get(self._find_setup_name(setup))) is None:
+            raise ExtensionNotFound(setup.name)
+        if old.isolated:
+            # a new child process, it buffers the events until it is ready
+            old.restart()
+            return old
+
+        old_plugins = {
+            plugin_name: plugin
+            for plugin_name, plugin in self.plugins.items()
+            if _is_submodule(old.name, plugin.__module__)
+        }
+
+        self.paused_setups.add(old.name)
+        # the old plugins keep their module objects, only `sys.modules` is reset
+        modules = sys.modules.copy()
+        old.remove_modules()
+        removed = {name: modules[name] for name in modules.keys() - sys.modules.keys()}
+        try:
+            setup = SoloSetup(old.raw_name, type=old.type)
+            setup.resolve()
+            await self.loop.run_in_executor(None, setup.import_module)
+        except Exception:
+            # the old plugins go on, with their modules back for the next import
+            old.remove_modules()
+            sys.modules.update(removed)
+            self.paused_setups.discard(old.name)
+            self._on_setup_done(old, True)
+            raise
+
+        # swap, nothing below awaits so no event can slip in between
+        if keep_state:
+            for plugin_name, plugin in old_plugins.items():
+                try:
+                    if (state := plugin.save_state()) is not MISSING:
+                        self.reload_states[plugin_name] = state
+                except Exception:
+                    log.exception(f"插件 {plugin_name} save_state 出錯")
+
+        for plugin_name in old_plugins:
+            self.remove_plugin(plugin_name)
+        if old.teardown:
+            try:
+                old.teardown(self)
+            except Exception as e:
+                log.exception(e)
+
+        del self.setups[old.name]
+        setup.run_setup(self)
+        self.setups[setup.name] = setup
+        self.reload_states.clear()
+
+        self.paused_setups.discard(old.name)
+        self._on_setup_done(setup, True)
+        log.info(f"插件熱重載完成: {setup.name}")
 
-        self.load_extension(setup)
-        self.unload_extension(setup)
+        return setup
@@ -0,0 +1,191 @@
+"""
+File store
+==========
+Synced files are kept on the server by content hash, clients are only told a
+file is available and pull it when needed. The store is bounded by total size,
+the least recently used files are evicted first.
+
+```
+<directory>/
+  index.json            [StoredFile, ...] least recently used first
+  objects/ab/abcdef...  content, by sha256
+```
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Union
+
+__all__ = ("StoredFile", "FileStore", "is_hash")
+
+log = logging.getLogger("chat-bridgee")
+
+READ_SIZE = 1024 * 1024
+hash_match = re.compile(r"[0-9a-f]{64}")
+
+
+def is_hash(value: object) -> bool:
+    """a sha256 as the store names its objects, for the hashes sent by clients"""
+    return isinstance(value, str) and hash_match.fullmatch(value) is not None
+
+
+class StoredFile(NamedTuple):
+    name: str  # path relative to `file_sync_path` of the clients
+    hash: str
+    size: int
+    server_name: Optional[str]
+    time: float
+
+    def info(self) -> dict:
+        return self._asdict()
+
+
+class FileStore:
+    def __init__(self, directory: Union[str, Path], max_size: int) -> None:
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.index_path = self.directory / "index.json"
+        # least recently used first
+        self.entries: OrderedDict[str, StoredFile] = OrderedDict()
+
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[StoredFile]:
+        return iter(self.entries.values())
+
+    @property
+    def total_size(self) -> int:
+        # names sharing content are counted once
+        return sum({i.hash: i.size for i in self.entries.values()}.values())
+
+    def path_of(self, file_hash: str) -> Path:
+        if not is_hash(file_hash):
+            # a path outside the store otherwise
+            raise ValueError(f"invalid sha256 {file_hash!r}")
+        return self.directory / "objects" / file_hash[:2] / file_hash
+
+    def get(self, name: str) -> Optional[StoredFile]:
+        if (entry := self.entries.get(name)) is not None:
+            self.entries.move_to_end(name)
+        return entry
+
+    def write_file(self, src: Union[str, Path], file_hash: str) -> Path:
+        """move `src` into the store, `file_hash` must be its sha256; blocking, may
+        run in an executor, the index is updated with `add`
+        """
+        if (path := self.path_of(file_hash)).is_file():
+            os.remove(src)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(src, path)
+        return path
+
+    def import_file(self, src: Union[str, Path]) -> tuple[str, int]:
+        """hash `src` and move it into the store, returns its sha256 and size, see
+        `write_file`
+        """
+        sha = hashlib.sha256()
+        with open(src, "rb") as f:
+            while data := f.read(READ_SIZE):
+                sha.update(data)
+            size = f.tell()
+
+        file_hash = sha.hexdigest()
+        self.write_file(src, file_hash)
+        return file_hash, size
+
+    def write_data(self, data: Union[bytes, memoryview]) -> str:
+        """store `data` and return its sha256, see `write_file`"""
+        file_hash = hashlib.sha256(data).hexdigest()
+        if not (path := self.path_of(file_hash)).is_file():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{file_hash}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        return file_hash
+
+    def add(
+        self,
+        name: str,
+        file_hash: str,
+        size: int,
+        *,
+        server_name: Optional[str] = None,
+    ) -> StoredFile:
+        old = self.entries.pop(name, None)
+        self.entries[name] = entry = StoredFile(
+            name,
+            file_hash,
+            size,
+            server_name,
+            time.time(),
+        )
+        if old is not None and old.hash != file_hash:
+            self.__remove_object(old.hash)
+
+        self.evict()
+        self.save()
+        return entry
+
+    def remove(self, name: str) -> None:
+        if (entry := self.entries.pop(name, None)) is not None:
+            self.__remove_object(entry.hash)
+            self.save()
+
+    def evict(self) -> None:
+        total = self.total_size
+        # the newest file stays even when larger than the limit
+        while total > self.max_size and len(self.entries) > 1:
+            _, entry = self.entries.popitem(last=False)
+            if self.__remove_object(entry.hash):
+                total -= entry.size
+            log.debug(f"檔案倉庫已滿, 移除 {entry.name}")
+
+    def __remove_object(self, file_hash: str) -> bool:
+        """remove the content once no name refers to it"""
+        if any(i.hash == file_hash for i in self.entries.values()):
+            return False
+
+        try:
+            os.remove(self.path_of(file_hash))
+        except OSError:
+            pass
+        return True
+
+    def load(self) -> None:
+        if not self.index_path.is_file():
+            return
+
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+            entries = [StoredFile(**i) for i in data]
+        except (OSError, ValueError, TypeError) as e:
+            log.warning(f"檔案倉庫索引讀取失敗: {e!r}")
+            return
+
+        self.entries = OrderedDict(
+            (i.name, i)
+            for i in entries
+            if is_hash(i.hash) and self.path_of(i.hash).is_file()
+        )
+
+    def save(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.tmp")
+        tmp_path.write_text(
+            json.dumps([i.info() for i in self.entries.values()], ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.index_path)
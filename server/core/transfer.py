@@ -0,0 +1,718 @@
+"""
+Chunked file transfer
+=====================
+Files too large for one `FileEncode` packet are sent as fixed-size chunks with a
+transfer id, every chunk is acknowledged by the server with the next index it
+expects, the sender keeps a window of unacknowledged chunks in flight.
+
+Finished uploads are kept in the `FileStore` and announced to the other clients
+with `file_available`, a client pulls a file with `file_pull`, the server then
+begins a transfer of the stored file to that client only.
+
+The begin announces the sha256 and size of the content, a client that already
+holds it answers `file_transfer_skip`, a client missing it asks for the body with
+`file_transfer_resume` from index 0 and joins the transfer's room. Chunks are
+read from the spool file (or the stored file) and every side keeps at most a
+window of chunks in flight, the server waits for the receiver's `{next}` like a
+sender does, memory stays flat on every side. A receiver rejecting a chunk (e.g.
+its disk is busy) resumes later from its `next`.
+
+A changed file is sent as a delta (see `utils.delta`) against the version the
+receiver holds under the same name. Before an upload the sender asks for the
+signature of the stored version with `file_signature` and begins with `base`,
+the hash of that version, and `body_size`, the size of the delta. A pull carries
+`base` and `signature` of the client's version, the begin then has `base` and
+`body_size` too. The receiver rebuilds the file and verifies its hash, a sender
+whose delta is rejected sends the whole file.
+
+Directories are kept in sync by the clients, `file_manifest` lists the stored
+files under a directory as `[name, size, time, hash]`, a client compares it with
+its own files and uploads or pulls the difference. Such uploads begin with
+`announce` false, the other clients reconcile instead of being notified.
+
+| `event`                | `direction`       | `data`            | `ack`               |
+| ---------------------- | ----------------- | ----------------- | ------------------- |
+| `file_transfer_begin`  | sender -> server  | `{id, path, ...}` | `{next}`            |
+| `file_chunk`           | sender -> server  | `FileChunk`       | `{next}`            |
+| `file_transfer_end`    | sender -> server  | `{id}`            | `{next}`            |
+| `file_available`       | server -> clients | `StoredFile`      |                     |
+| `file_store_list`      | client -> server  |                   | `{files}`           |
+| `file_signature`       | client -> server  | `{name}`          | `{hash, signature}` |
+| `file_manifest`        | client -> server  | `{prefix}`        | `{files}`           |
+| `file_pull`            | client -> server  | `{name, ...}`     | `{id}`              |
+| `file_transfer_begin`  | server -> client  | `{id, path, ...}` |                     |
+| `file_chunk`           | server -> client  | `FileChunk`       | `{next}`            |
+| `file_transfer_end`    | server -> client  | `{id}`            |                     |
+| `file_transfer_resume` | client -> server  | `{id, next}`      | `{next}`            |
+| `file_transfer_skip`   | client -> server  | `{id}`            | `{}`                |
+
+A sender resumes by sending `file_transfer_begin` with the same id again and
+continuing from the returned `next`, errors are acknowledged as `{error}`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from asyncio import TimerHandle
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Optional, Union
+
+from ..utils import (
+    MAX_FILE_SIZE,
+    MIN_FILE_SIZE,
+    DeltaError,
+    FileChunk,
+    apply_delta,
+    make_delta,
+    make_signature,
+)
+from .store import FileStore, StoredFile, is_hash
+
+if TYPE_CHECKING:
+    from socketio import AsyncServer
+
+    from ..context import Context
+    from .server import BaseServer
+
+__all__ = ("FileTransfer", "TransferStats", "TransferManager")
+
+log = logging.getLogger("chat-bridgee")
+
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+PULL_CHUNK_SIZE = 256 * 1024
+# chunks sent to a receiver before waiting for its acknowledgement
+PULL_WINDOW_SIZE = 8
+ACK_TIMEOUT = 30
+# idle time before a transfer and its spool file are dropped
+TRANSFER_TIMEOUT = 300
+
+
+async def _maybe_await(result: Any) -> Any:
+    # room methods of `AsyncServer` are coroutines in newer python-socketio
+    return await result if inspect.isawaitable(result) else result
+
+
+class FileTransfer:
+    def __init__(
+        self,
+        id: str,
+        path: str,
+        size: int,
+        chunk_size: int,
+        *,
+        flag: int = 0,
+        hash: Optional[str] = None,
+        sender: str,
+        server_name: str,
+        body_size: Optional[int] = None,
+        base: Optional[str] = None,
+        source_path: Optional[Path] = None,
+        owns_source: bool = False,
+        announce: bool = True,
+    ) -> None:
+        self.id = id
+        self.path = path
+        self.size = size
+        self.chunk_size = chunk_size
+        self.flag = flag
+        self.hash = hash  # sha256 of the content, announced to the clients
+        # the body is a delta against the content with the hash `base`
+        self.base = base
+        self.body_size = size if body_size is None else body_size
+        self.sender = sender  # user name, the sid changes after a reconnect
+        self.server_name = server_name
+        # notify the other clients and plugins once finished
+        self.announce = announce
+
+        self.received = 0  # chunks received, also the next expected index
+        self.finished = False
+        # user names of the clients that fetched / skipped the body
+        self.fetched: set[str] = set()
+        self.skipped: set[str] = set()
+        self.lock = asyncio.Lock()
+        self.expire_handle: TimerHandle | None = None
+        self.reader: BinaryIO | None = None
+        # the chunks are read in executor threads
+        self.read_lock = threading.Lock()
+        # {sid: task} sending the chunks to a receiver, see `on_resume`
+        self.sending: dict[str, asyncio.Task] = {}
+
+        if source_path is not None:
+            # sending a stored file or a delta, nothing to receive
+            self.spool_path, self.spool = str(source_path), None
+            self.owns_spool = owns_source
+            self.received, self.finished = self.chunks, True
+            return
+
+        fd, self.spool_path = tempfile.mkstemp(prefix="chatbridgee-", suffix=".part")
+        self.spool: BinaryIO | None = os.fdopen(fd, "wb")
+        self.owns_spool = True
+        self.digest = hashlib.sha256()
+
+    @property
+    def chunks(self) -> int:
+        return -(-self.body_size // self.chunk_size)
+
+    def chunk_length(self, index: int) -> int:
+        return min(self.chunk_size, self.body_size - index * self.chunk_size)
+
+    def info(self) -> dict[str, Any]:
+        info = {
+            "id": self.id,
+            "path": self.path,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "flag": self.flag,
+            "hash": self.hash,
+            "server_name": self.server_name,
+        }
+        if self.base is not None:
+            info.update(base=self.base, body_size=self.body_size)
+        return info
+
+    def write(self, data: bytes) -> None:
+        """blocking, called in an executor, raises `ValueError` once closed"""
+        if (spool := self.spool) is None:
+            raise ValueError("transfer is closed")
+        spool.write(data)
+        self.digest.update(data)
+        # the reader uses another handle
+        spool.flush()
+        self.received += 1
+
+    def read_chunk(self, index: int) -> bytes:
+        """blocking, called in an executor"""
+        with self.read_lock:
+            if self.reader is None:
+                self.reader = open(self.spool_path, "rb")
+            self.reader.seek(index * self.chunk_size)
+            return self.reader.read(self.chunk_length(index))
+
+    def open(self) -> BinaryIO:
+        """open the received file, available once `finished`"""
+        return open(self.spool_path, "rb")
+
+    def close(self) -> None:
+        for file in (self.spool, self.reader):
+            if file is not None:
+                file.close()
+        self.spool = self.reader = None
+
+        if self.owns_spool:
+            try:
+                os.remove(self.spool_path)
+            except OSError:
+                pass
+
+    def __getstate__(self) -> dict[str, Any]:
+        # sent to plugin processes, which read the spool by path
+        state = self.__dict__.copy()
+        for key in ("lock", "read_lock", "expire_handle", "spool", "reader", "digest"):
+            state[key] = None
+        state["sending"] = {}
+        return state
+
+    def __str__(self) -> str:
+        return (
+            f"<FileTransfer id={self.id} path={self.path} size={self.size} "
+            f"received={self.received}/{self.chunks}>"
+        )
+
+    __repr__ = __str__
+
+
+class TransferStats:
+    """clients that skipped a transfer because they held the content already,
+    transfers sent as a delta, `file_sync` packets failing their checksum and
+    transfers failing their hash or delta checksum
+    """
+
+    __slots__ = (
+        "hits",
+        "misses",
+        "saved_bytes",
+        "deltas",
+        "delta_saved_bytes",
+        "corrupt_packets",
+        "corrupt_files",
+    )
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.saved_bytes = 0
+        self.deltas = 0
+        self.delta_saved_bytes = 0
+        self.corrupt_packets = 0
+        self.corrupt_files = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"<TransferStats hits={self.hits} misses={self.misses} "
+            f"hit_rate={self.hit_rate:.1%} saved_bytes={self.saved_bytes} "
+            f"deltas={self.deltas} delta_saved_bytes={self.delta_saved_bytes} "
+            f"corrupt_packets={self.corrupt_packets} "
+            f"corrupt_files={self.corrupt_files}>"
+        )
+
+    __repr__ = __str__
+
+
+class TransferManager:
+    def __init__(self, server: "BaseServer", store: FileStore) -> None:
+        self.server = server
+        self.store = store
+        self.transfers: dict[str, FileTransfer] = {}
+        self.stats = TransferStats()
+
+    def attach(self, sio_server: "AsyncServer") -> None:
+        # the return values are the acknowledgements
+        for event, handler in (
+            ("file_transfer_begin", self.on_begin),
+            ("file_chunk", self.on_chunk),
+            ("file_transfer_end", self.on_end),
+            ("file_transfer_resume", self.on_resume),
+            ("file_transfer_skip", self.on_skip),
+            ("file_store_list", self.on_store_list),
+            ("file_signature", self.on_signature),
+            ("file_manifest", self.on_manifest),
+            ("file_pull", self.on_pull),
+        ):
+            sio_server.on(event, self.__wrap(handler))
+
+    def __wrap(self, handler):
+        async def wrapper(sid: str, data: Any = None) -> dict[str, Any]:
+            if (ctx := self.server.clients.get(sid)) is None:
+                return {"error": "not logged in"}
+
+            try:
+                return await handler(ctx, data)
+            except (KeyError, TypeError, ValueError) as e:
+                return {"error": f"invalid data: {e!r}"}
+            except OSError as e:
+                log.exception(f"檔案傳輸錯誤 {handler.__name__}")
+                return {"error": f"server error: {e!r}"}
+
+        return wrapper
+
+    def get(self, id: str) -> Optional[FileTransfer]:
+        return self.transfers.get(id)
+
+    def touch(self, transfer: FileTransfer) -> None:
+        if transfer.expire_handle is not None:
+            transfer.expire_handle.cancel()
+        transfer.expire_handle = self.server.loop.call_later(
+            TRANSFER_TIMEOUT,
+            self.remove,
+            transfer.id,
+        )
+
+    def remove(self, id: str) -> None:
+        if (transfer := self.transfers.pop(id, None)) is None:
+            return
+
+        if transfer.expire_handle is not None:
+            transfer.expire_handle.cancel()
+        for task in transfer.sending.values():
+            task.cancel()
+        if not transfer.finished:
+            log.info(f"檔案傳輸逾時 {transfer}")
+        transfer.close()
+        self.server.loop.create_task(
+            _maybe_await(self.server.sio_server.close_room(id))
+        )
+
+    def close(self) -> None:
+        for id in list(self.transfers):
+            self.remove(id)
+
+    async def on_begin(self, ctx: "Context", info: dict) -> dict[str, Any]:
+        if (transfer := self.get(id := str(info["id"]))) is not None:
+            if transfer.sender != ctx.name:
+                return {"error": "transfer id is used"}
+
+            # resume after a reconnect
+            self.touch(transfer)
+            return {"next": transfer.received}
+
+        if len(bytes.fromhex(id)) != 16:
+            return {"error": "transfer id must be 16 bytes"}
+
+        size, chunk_size = int(info["size"]), int(info["chunk_size"])
+        if size < 0 or not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            return {"error": f"invalid size {size} or chunk size {chunk_size}"}
+
+        body_size, base = int(info.get("body_size", size)), info.get("base") or None
+        file_hash = info.get("hash") or None
+        if not all(i is None or is_hash(i) for i in (base, file_hash)):
+            return {"error": "hash and base must be sha256 in lowercase hex"}
+        if base is not None and not self.store.path_of(base).is_file():
+            # e.g. evicted since the signature was sent
+            return {"error": "delta base not found"}
+        if base is not None and not (
+            file_hash and body_size >= 0 and size <= MAX_FILE_SIZE
+        ):
+            return {"error": f"invalid delta, size {size} body size {body_size}"}
+
+        self.transfers[id] = transfer = FileTransfer(
+            id,
+            str(info["path"]),
+            size,
+            chunk_size,
+            flag=int(info.get("flag", 0)),
+            hash=file_hash,
+            sender=ctx.name,
+            server_name=ctx.display_name,
+            body_size=body_size,
+            base=base,
+            announce=bool(info.get("announce", True)),
+        )
+        self.touch(transfer)
+        log.debug(f"檔案傳輸開始 {transfer}")
+
+        return {"next": 0}
+
+    async def on_chunk(self, ctx: "Context", raw_data: bytes) -> dict[str, Any]:
+        chunk = FileChunk.decode(raw_data)
+        if (transfer := self.get(chunk.id.hex())) is None:
+            return {"error": "unknown transfer"}
+
+        async with transfer.lock:
+            # duplicate or out of order, the sender continues from `next`
+            if transfer.finished or chunk.index != transfer.received:
+                return {"next": transfer.received}
+            if len(chunk.data) != transfer.chunk_length(chunk.index):
+                return {"error": f"invalid chunk size {len(chunk.data)}"}
+
+            try:
+                await self.server.loop.run_in_executor(None, transfer.write, chunk.data)
+            except (OSError, ValueError) as e:
+                # e.g. removed while writing
+                return {"error": f"write failed: {e}"}
+            self.touch(transfer)
+
+            return {"next": transfer.received}
+
+    async def on_end(self, ctx: "Context", info: dict) -> dict[str, Any]:
+        if (transfer := self.get(str(info["id"]))) is None:
+            return {"error": "unknown transfer"}
+        if transfer.received < transfer.chunks:
+            return {"error": f"missing chunks from {transfer.received}"}
+
+        async with transfer.lock:
+            if transfer.finished:
+                return {"next": transfer.received}
+
+            transfer.spool.close()
+            transfer.spool = None
+            if transfer.base is None:
+                file_hash = transfer.digest.hexdigest()
+            else:
+                try:
+                    file_hash = await self.server.loop.run_in_executor(
+                        None,
+                        self.__apply_delta,
+                        transfer,
+                    )
+                except (DeltaError, OSError) as e:
+                    self.remove(transfer.id)
+                    if isinstance(e, DeltaError):
+                        self.stats.corrupt_files += 1
+                    log.warning(f"檔案傳輸的差異無效 {transfer}: {e}")
+                    return {"error": f"invalid delta: {e}"}
+
+            if transfer.hash and transfer.hash != file_hash:
+                self.remove(transfer.id)
+                self.stats.corrupt_files += 1
+                log.warning(f"檔案傳輸的雜湊不符 {transfer}: {file_hash}")
+                return {"error": f"hash mismatch, {file_hash} != {transfer.hash}"}
+
+            transfer.finished = True
+            transfer.hash = file_hash
+            log.debug(f"檔案傳輸完成 {transfer}")
+
+            if transfer.base is None:
+                # the spool file becomes the stored file
+                path = await self.server.loop.run_in_executor(
+                    None,
+                    self.store.write_file,
+                    transfer.spool_path,
+                    file_hash,
+                )
+            else:
+                os.remove(transfer.spool_path)
+                path = self.store.path_of(file_hash)
+                self.stats.deltas += 1
+                self.stats.delta_saved_bytes += transfer.size - transfer.body_size
+            transfer.spool_path, transfer.owns_spool = str(path), False
+            entry = self.store.add(
+                transfer.path,
+                file_hash,
+                transfer.size,
+                server_name=transfer.server_name,
+            )
+
+        if transfer.announce:
+            await ctx.emit("file_available", entry.info(), skip_sid=ctx.sid)
+            self.server.dispatch("file_transfer", ctx, transfer)
+
+        return {"next": transfer.received}
+
+    def __apply_delta(self, transfer: FileTransfer) -> str:
+        """rebuild an upload sent as a delta, stored only when the hash matches"""
+        base = self.store.path_of(transfer.base).read_bytes()
+        with open(transfer.spool_path, "rb") as f:
+            data = apply_delta(base, f.read())
+
+        if (file_hash := hashlib.sha256(data).hexdigest()) == transfer.hash:
+            self.store.write_data(data)
+        return file_hash
+
+    async def publish(
+        self,
+        name: str,
+        data: Union[bytes, memoryview],
+        *,
+        server_name: Optional[str] = None,
+        skip_sid: Optional[str] = None,
+    ) -> StoredFile:
+        """store a file received in one piece and announce it to the clients"""
+        file_hash = await self.server.loop.run_in_executor(
+            None,
+            self.store.write_data,
+            data,
+        )
+        entry = self.store.add(name, file_hash, len(data), server_name=server_name)
+        await self.server.emit("file_available", entry.info(), skip_sid=skip_sid)
+
+        return entry
+
+    async def publish_path(
+        self,
+        name: str,
+        path: Union[str, Path],
+        *,
+        server_name: Optional[str] = None,
+        skip_sid: Optional[str] = None,
+    ) -> StoredFile:
+        """store a file written to disk, e.g. streamed by a plugin, and announce it
+        to the clients; `path` is moved into the store, removed on failure
+        """
+        try:
+            file_hash, size = await self.server.loop.run_in_executor(
+                None,
+                self.store.import_file,
+                path,
+            )
+        except OSError:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            raise
+
+        entry = self.store.add(name, file_hash, size, server_name=server_name)
+        await self.server.emit("file_available", entry.info(), skip_sid=skip_sid)
+
+        return entry
+
+    async def on_store_list(self, ctx: "Context", info: Any) -> dict[str, Any]:
+        # most recently used first
+        return {"files": [i.info() for i in reversed(self.store.entries.values())]}
+
+    async def on_manifest(self, ctx: "Context", info: Any) -> dict[str, Any]:
+        # compact, a directory may hold thousands of files
+        prefix = str((info or {}).get("prefix") or "").strip("/")
+        return {
+            "files": [
+                [i.name, i.size, i.time, i.hash]
+                for i in self.store
+                if not prefix or i.name.startswith(f"{prefix}/")
+            ]
+        }
+
+    async def on_signature(self, ctx: "Context", info: dict) -> dict[str, Any]:
+        entry = self.store.entries.get(str(info["name"]))
+        if entry is None or not MIN_FILE_SIZE <= entry.size <= MAX_FILE_SIZE:
+            return {}
+
+        signature = await self.server.loop.run_in_executor(
+            None,
+            lambda: make_signature(self.store.path_of(entry.hash).read_bytes()),
+        )
+        return {"hash": entry.hash, "signature": signature}
+
+    async def on_pull(self, ctx: "Context", info: dict) -> dict[str, Any]:
+        if (entry := self.store.get(str(info["name"]))) is None:
+            return {"error": "file not found"}
+
+        source_path, body_size = self.store.path_of(entry.hash), None
+        base, signature = info.get("base"), info.get("signature")
+        if (
+            is_hash(base)
+            and base != entry.hash
+            and isinstance(signature, bytes)
+            and MIN_FILE_SIZE <= entry.size <= MAX_FILE_SIZE
+        ):
+            try:
+                delta = await self.server.loop.run_in_executor(
+                    None,
+                    self.__write_delta,
+                    source_path,
+                    signature,
+                )
+            except DeltaError as e:
+                return {"error": f"invalid signature: {e}"}
+            if delta is not None:
+                source_path, body_size = delta
+                self.stats.deltas += 1
+                self.stats.delta_saved_bytes += entry.size - body_size
+
+        id = uuid.uuid4().hex
+        self.transfers[id] = transfer = FileTransfer(
+            id,
+            entry.name,
+            entry.size,
+            PULL_CHUNK_SIZE,
+            hash=entry.hash,
+            sender=ctx.name,
+            server_name=entry.server_name or "",
+            body_size=body_size,
+            base=base if body_size is not None else None,
+            source_path=source_path,
+            owns_source=body_size is not None,
+        )
+        self.touch(transfer)
+        # the client answers with `file_transfer_skip` or `file_transfer_resume`
+        await ctx.emit("file_transfer_begin", transfer.info())
+
+        return {"id": id}
+
+    @staticmethod
+    def __write_delta(path: Path, signature: bytes) -> Optional[tuple[Path, int]]:
+        """delta of a stored file into a temporary file"""
+        if (delta := make_delta(path.read_bytes(), signature)) is None:
+            return None
+
+        fd, delta_path = tempfile.mkstemp(prefix="chatbridgee-", suffix=".delta")
+        with os.fdopen(fd, "wb") as f:
+            f.write(delta)
+        return Path(delta_path), len(delta)
+
+    async def on_resume(self, ctx: "Context", info: dict) -> dict[str, Any]:
+        if (transfer := self.get(str(info["id"]))) is None:
+            return {"error": "unknown transfer"}
+
+        start = int(info["next"])
+        async with transfer.lock:
+            # later chunks reach the client through the room
+            await _maybe_await(self.server.sio_server.enter_room(ctx.sid, transfer.id))
+            until = transfer.received
+
+        if ctx.name not in transfer.fetched:
+            transfer.fetched.add(ctx.name)
+            self.stats.misses += 1
+
+        self.touch(transfer)
+        # a receiver resumes after rejecting a chunk, the old send is replaced so
+        # two sends never interleave their chunks
+        if (task := transfer.sending.pop(ctx.sid, None)) is not None:
+            task.cancel()
+        transfer.sending[ctx.sid] = task = self.server.loop.create_task(
+            self.__send(ctx, transfer, start, until)
+        )
+        task.add_done_callback(
+            functools.partial(self.__on_send_done, transfer, ctx.sid)
+        )
+
+        return {"next": until}
+
+    @staticmethod
+    def __on_send_done(transfer: FileTransfer, sid: str, task: asyncio.Task) -> None:
+        if transfer.sending.get(sid) is task:
+            del transfer.sending[sid]
+
+    async def on_skip(self, ctx: "Context", info: dict) -> dict[str, Any]:
+        if (transfer := self.get(str(info["id"]))) is None:
+            return {"error": "unknown transfer"}
+
+        if ctx.name not in transfer.skipped:
+            transfer.skipped.add(ctx.name)
+            self.stats.hits += 1
+            self.stats.saved_bytes += transfer.size
+
+        return {}
+
+    async def __send(
+        self,
+        ctx: "Context",
+        transfer: FileTransfer,
+        start: int,
+        until: int,
+    ) -> None:
+        """send chunks from the spool with a window of unacknowledged chunks, stops
+        on the first rejected chunk or timeout, the receiver resumes from its `next`
+        """
+        id = bytes.fromhex(transfer.id)
+        window = asyncio.Semaphore(PULL_WINDOW_SIZE)
+        rejected = asyncio.Event()
+
+        def on_ack(index: int, result: Optional[dict] = None) -> None:
+            if not isinstance(result, dict) or result.get("next") != index + 1:
+                rejected.set()
+            elif transfer.id in self.transfers:
+                self.touch(transfer)
+            window.release()
+
+        async def acquire() -> bool:
+            try:
+                await asyncio.wait_for(window.acquire(), ACK_TIMEOUT)
+            except asyncio.TimeoutError:
+                log.info(f"檔案傳輸等待確認逾時 {transfer} ({ctx})")
+                return False
+            # disconnected or expired, a reconnected client resumes
+            return (
+                not rejected.is_set()
+                and transfer.id in self.transfers
+                and self.server.clients.get(ctx.sid) is ctx
+            )
+
+        for index in range(start, until):
+            if not await acquire():
+                return
+            try:
+                data = await self.server.loop.run_in_executor(
+                    None,
+                    transfer.read_chunk,
+                    index,
+                )
+            except OSError as e:
+                # e.g. evicted from the store
+                log.warning(f"檔案傳輸中斷 {transfer}: {e!r}")
+                return
+            await ctx.emit(
+                "file_chunk",
+                FileChunk(id, index, data).encode(),
+                callback=functools.partial(on_ack, index),
+            )
+
+        # wait for the last window
+        for _ in range(PULL_WINDOW_SIZE):
+            if not await acquire():
+                return
+
+        if transfer.finished and until >= transfer.chunks:
+            await ctx.emit("file_transfer_end", {"id": transfer.id})
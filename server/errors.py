@@ -23,3 +23,13 @@ class NoEntryPointError(ExtensionError):
 class ExtensionAlreadyLoaded(ExtensionError):
     def __init__(self, name: str) -> None:
         super().__init__(f"Extension {name!r} is loaded repeatedly.")
+
+
+class ConfigError(ChatBridgeEError):
+    def __init__(self, key: str, reason: str, *, source: Any = None) -> None:
+        self.key = key
+        self.reason = reason
+        self.source = source
+
+        where = f"{source}: " if source is not None else ""
+        super().__init__(f"{where}invalid config value {key!r}, {reason}")
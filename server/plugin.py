@@ -3,6 +3,8 @@ from __future__ import annotations
 import inspect
 import logging
 import sys
+import time
+from asyncio import AbstractEventLoop, Task
 from enum import Enum, auto
 from importlib import util as import_util
 from importlib.machinery import ModuleSpec
@@ -11,6 +13,7 @@ from types import ModuleType
 from typing import TYPE_CHECKING, Any, Callable, ClassVar, Optional, Type, TypeVar
 
 from .errors import ExtensionAlreadyLoaded, ExtensionNotFound, NoEntryPointError
+from .stats import current_plugin
 from .utils import MISSING
 from .utils.config import Config
 
@@ -77,7 +80,13 @@ class Plugin(metaclass=PluginMeta):
         if self.__plugin_config__:
             self.config = self.__plugin_config__.load(_auto_create=True)
 
-    def _inject(self: T, server: "BaseServer") -> T:
+    def _inject(self: T, server: "BaseServer", state: Any = MISSING) -> T:
+        if state is not MISSING:
+            try:
+                self.load_state(state)
+            except Exception as e:
+                log.error(f"插件 {self.__plugin_name__} load_state 出錯: {e}")
+
         try:
             for name, method_names in self.__plugin_events__.items():
                 for method_name in method_names:
@@ -118,6 +127,16 @@ class Plugin(metaclass=PluginMeta):
     def on_unload_before(self) -> None:
         pass
 
+    def save_state(self) -> Any:
+        """
+        called on the old instance during a hot reload, the returned value is passed
+        to `load_state` of the new instance before `on_load`, `MISSING` carries nothing
+        """
+        return MISSING
+
+    def load_state(self, state: Any) -> None:
+        pass
+
     @classmethod
     def listener(
         cls,
@@ -148,9 +167,14 @@ class Plugin(metaclass=PluginMeta):
 
 
 class PluginMixin:
+    loop: AbstractEventLoop
+
     def __init__(self) -> None:
         self.__plugins: dict[str, Plugin] = {}
         self.__setup: dict[str, SoloSetup] = {}
+        self.__loading: dict[str, SoloSetup] = {}
+        # {plugin name: state}, handed to the plugin with the same name on add
+        self.reload_states: dict[str, Any] = {}
 
     @property
     def plugins(self) -> dict[str, Plugin]:
@@ -165,7 +189,15 @@ class PluginMixin:
                 raise ExtensionAlreadyLoaded(name)
             self.remove_plugin(name)
 
-        self.__plugins[name] = plugin._inject(self)
+        # tasks created in `on_load` belong to the plugin
+        token = current_plugin.set(name)
+        try:
+            self.__plugins[name] = plugin._inject(
+                self,
+                self.reload_states.pop(name, MISSING),
+            )
+        finally:
+            current_plugin.reset(token)
 
     def get_plugin(self, name: str) -> Optional[Plugin]:
         return self.__plugins.get(name)
@@ -176,13 +208,25 @@ class PluginMixin:
 
         return plugin
 
-    def load_extension(self, name: str | Path | SoloSetup) -> None:
-        self.load_from_setup(self.setup_from_name(name))
+    def load_extension(
+        self,
+        name: str | Path | SoloSetup,
+        *,
+        process: bool = False,
+    ) -> None:
+        """`process=True` hosts the plugin in a child process, see `server.worker`"""
+        setup = self.setup_from_name(name)
+        if process and not setup.isolated:
+            from .worker import ProcessSetup
+
+            setup = ProcessSetup(setup.raw_name, type=setup.type)
+
+        self.load_from_setup(setup)
 
     def unload_extension(self, name: str | Path | SoloSetup) -> None:
         name = self.setup_from_name(name)
-        if (module := self.__setup.pop(name.name, None)) is None:
-            raise ExtensionNotFound(name)
+        if (module := self.__setup.pop(self._find_setup_name(name), None)) is None:
+            raise ExtensionNotFound(name.name)
 
         for plugin_name, plugin in self.__plugins.copy().items():
             if _is_submodule(module.name, plugin.__module__):
@@ -207,16 +251,64 @@ class PluginMixin:
         else:
             return SoloSetup(name)
 
+    def _find_setup_name(self, setup: SoloSetup) -> str | None:
+        # `plugins.discord` is loaded as `plugins.discord.main`
+        for name in (setup.name, f"{setup.name}.main"):
+            if name in self.__setup:
+                return name
+        return None
+
     def load_from_setup(self, setup: SoloSetup) -> None:
-        if setup.name in self.__setup:
+        # resolve only, the module is executed once in `setup.load`
+        setup.resolve()
+        if setup.name in self.__setup or setup.name in self.__loading:
             raise ExtensionAlreadyLoaded(setup.name)
         setup.load(self)
         self.__setup[setup.name] = setup
 
+    def load_extension_background(
+        self,
+        name: str | Path | SoloSetup,
+    ) -> Task[SoloSetup]:
+        """
+        import the module in a worker thread and call `setup` in the event loop,
+        the extension counts as loading as soon as this returns
+        """
+        setup = self.setup_from_name(name)
+        setup.resolve()
+        if setup.name in self.__setup or setup.name in self.__loading:
+            raise ExtensionAlreadyLoaded(setup.name)
+
+        self.__loading[setup.name] = setup
+        return self.loop.create_task(
+            self.__load_background(setup),
+            name=f"ChatBridgeE: load {setup.name}",
+        )
+
+    async def __load_background(self, setup: SoloSetup) -> SoloSetup:
+        loaded = False
+        try:
+            await self.loop.run_in_executor(None, setup.import_module)
+            setup.run_setup(self)
+            self.__setup[setup.name] = setup
+            loaded = True
+        finally:
+            self.__loading.pop(setup.name, None)
+            self._on_setup_done(setup, loaded)
+
+        return setup
+
+    def _on_setup_done(self, setup: SoloSetup, loaded: bool) -> None:
+        pass
+
     @property
     def setups(self):
         return self.__setup
 
+    @property
+    def loading_setups(self) -> dict[str, SoloSetup]:
+        return self.__loading
+
 
 def fix_name(name: str | Path) -> str:
     return str(name).removesuffix(".py").replace("/", ".").replace("\\", ".")
@@ -234,6 +326,7 @@ class SoloSetupType(Enum):
 class SoloSetup:
     setup: Callable[["BaseServer"], None] | None = None
     teardown: Callable[["BaseServer"], None] | None = None
+    isolated: bool = False  # runs in a child process
 
     def __init__(
         self,
@@ -242,6 +335,13 @@ class SoloSetup:
     ) -> None:
         self.raw_name = self.name = name
         self.type = type
+        self.spec: ModuleSpec | None = None
+        # seconds spent executing the module / calling `setup`
+        self.import_time = self.setup_time = 0.0
+
+    @property
+    def load_time(self) -> float:
+        return self.import_time + self.setup_time
 
     def _resolve_name(self, name: str, package: Optional[str] = None) -> str:
         try:
@@ -262,7 +362,17 @@ class SoloSetup:
         if self.setup is None:
             raise NoEntryPointError(module.__name__)
 
-    def setup_func(self) -> None:
+    def _find_spec(self, name: str) -> ModuleSpec | None:
+        try:
+            return import_util.find_spec(name)
+        except (ImportError, ValueError):
+            return None
+
+    def resolve(self) -> ModuleSpec:
+        """resolve the module name and spec without executing the module"""
+        if self.spec is not None:
+            return self.spec
+
         name, spec = self.raw_name, None
         if isinstance(name, Path):
             self.name = str(name)
@@ -271,26 +381,63 @@ class SoloSetup:
         else:
             self.name = self._resolve_name(self.name)
 
-            if not (spec := import_util.find_spec(self.name)) or not spec.has_location:
-                if not self.name.endswith(".main"):
-                    self.name += ".main"
-                    return self.setup_func()
+            if (
+                not (spec := self._find_spec(self.name))
+                or not spec.has_location
+                # package, the entry point is `<package>.main`
+                or spec.submodule_search_locations is not None
+            ) and not self.name.endswith(".main"):
+                if main_spec := self._find_spec(f"{self.name}.main"):
+                    self.name, spec = f"{self.name}.main", main_spec
 
-        if spec:
-            self._setup_module(self._module_from_spec(spec, self.name))
-        else:
+        if not spec:
             raise ExtensionNotFound(self.name)
 
-    def load(self, server: "BaseServer") -> None:
+        self.spec = spec
+        return spec
+
+    def setup_func(self) -> None:
+        spec = self.resolve()
+        self._setup_module(self._module_from_spec(spec, self.name))
+
+    def import_module(self) -> None:
+        """execute the module, safe to call from a worker thread"""
+        start = time.perf_counter()
         self.setup_func()
+        self.import_time = time.perf_counter() - start
 
+    def run_setup(self, server: "BaseServer") -> None:
+        """call the module `setup`, must run in the event loop thread"""
         if self.setup:
+            start = time.perf_counter()
             try:
                 self.setup(server)
             except Exception as e:
                 log.exception(e)
+            self.setup_time = time.perf_counter() - start
+
+        log.debug(
+            f"Loaded plugin {self.name!r} in {self.load_time * 1000:.2f}ms "
+            f"(import {self.import_time * 1000:.2f}ms, "
+            f"setup {self.setup_time * 1000:.2f}ms)"
+        )
+
+    def load(self, server: "BaseServer") -> None:
+        self.import_module()
+        self.run_setup(server)
 
     def unload(self, server: "BaseServer") -> None:
+        self.remove_modules()
+
+        if self.teardown:
+            try:
+                self.teardown(server)
+            except Exception as e:
+                log.exception(e)
+
+    def remove_modules(self) -> None:
+        """drop the plugin modules from `sys.modules`, so the next import is fresh"""
+        self.spec = None
         sys.modules.pop(lib_name := self.name, None)
         if self.type == SoloSetupType.MODULE:
             lib_name = lib_name.removesuffix(".main")
@@ -303,9 +450,3 @@ class SoloSetup:
                     f"Remove module {name!r} when unloading plugin {repr(self)}, "
                     f"success={sys.modules.pop(name, None)}"
                 )
-
-        if self.teardown:
-            try:
-                self.teardown(server)
-            except Exception as e:
-                log.exception(e)
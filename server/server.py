@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import sys
 from asyncio import AbstractEventLoop
 from pathlib import Path
 
 from . import BaseServer, Context
-from .utils import FileEncode
+from .errors import ExtensionError
+from .utils import FileEncodeView
 
 __all__ = ("Server",)
 
@@ -20,11 +22,50 @@ class Server(BaseServer):
 
         path = Path(self.config.get("plugins_path"))
         sys.path.append(str(path.parent.absolute()))
+        # plugins load in the background, the socket server does not wait for them
+        self.loop.create_task(self.load_plugins(path), name="load_plugins")
+
+    async def load_plugins(self, path: Path) -> None:
+        lazy_plugins: dict[str, list[str]] = self.config.get("lazy_plugins")
+        tasks = []
         for file in path.glob("[!_]*"):
             if self.setup_from_name(file).name in self.config.get("stop_plugins"):
                 continue
 
-            self.load_extension(file)
+            if events := lazy_plugins.get(file.stem):
+                self.add_lazy_extension(file, events)
+                continue
+
+            if file.stem in self.config.get("process_plugins"):
+                try:
+                    self.load_extension(file, process=True)
+                except ExtensionError as e:
+                    self.log.error(f"插件加載失敗: {e}")
+                continue
+
+            try:
+                tasks.append(self.load_extension_background(file))
+            except ExtensionError as e:
+                self.log.error(f"插件加載失敗: {e}")
+
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                self.log.error(f"插件加載失敗: {result!r}", exc_info=result)
+
+        self.log_load_report()
+
+    def log_load_report(self) -> None:
+        """log the time each plugin took to import and setup, slowest first"""
+        setups = sorted(self.setups.values(), key=lambda x: x.load_time, reverse=True)
+        total = sum(setup.load_time for setup in setups)
+
+        self.log.info(f"插件加載完成: {len(setups)} 個, 共耗時 {total * 1000:.2f}ms")
+        for setup in setups:
+            self.log.info(
+                f"- {setup.name}: {setup.load_time * 1000:.2f}ms "
+                f"(import {setup.import_time * 1000:.2f}ms, "
+                f"setup {setup.setup_time * 1000:.2f}ms)"
+            )
 
     async def on_ping(self, ctx: Context):
         await ctx.emit("server_pong")
@@ -36,12 +77,14 @@ class Server(BaseServer):
         await ctx.emit("new_disconnect", ctx.display_name, skip_sid=ctx.sid)
 
     async def on_server_start(self, ctx: Context):
+        ctx.invalidate_queries()
         await ctx.emit("server_start", ctx.display_name, skip_sid=ctx.sid)
 
     async def on_server_startup(self, ctx: Context):
         await ctx.emit("server_startup", ctx.display_name, skip_sid=ctx.sid)
 
     async def on_server_stop(self, ctx: Context):
+        ctx.invalidate_queries()
         await ctx.emit("server_stop", ctx.display_name, skip_sid=ctx.sid)
 
     async def on_player_chat(self, ctx: Context, player_name: str, content: str):
@@ -54,10 +97,19 @@ class Server(BaseServer):
         )
 
     async def on_player_joined(self, ctx: Context, player_name: str):
+        # the cached `list` and scoreboard responses of the server are stale
+        ctx.invalidate_queries()
         await ctx.emit("player_joined", ctx.display_name, player_name, skip_sid=ctx.sid)
 
     async def on_player_left(self, ctx: Context, player_name: str):
+        ctx.invalidate_queries()
         await ctx.emit("player_left", ctx.display_name, player_name, skip_sid=ctx.sid)
 
-    async def on_file_sync(self, ctx: Context, data: FileEncode):
-        await ctx.emit("file_sync", data.encode(), skip_sid=ctx.sid)
+    async def on_file_sync(self, ctx: Context, data: FileEncodeView):
+        # kept for the clients to pull, not pushed to everyone
+        await self.publish_file(
+            data.path,
+            data.data_view,
+            server_name=data.server_name,
+            skip_sid=ctx.sid,
+        )
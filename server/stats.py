@@ -0,0 +1,158 @@
+"""
+Per plugin resource accounting
+==============================
+Listener time, live tasks, exceptions and (with `tracemalloc`) allocated memory,
+attributed to the plugin that owns the listener.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import sys
+import tracemalloc
+from asyncio import AbstractEventLoop
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional
+
+if TYPE_CHECKING:
+    from .plugin import Plugin
+
+__all__ = ("PluginStats", "PluginStatsCollector", "current_plugin")
+
+# name of the plugin whose code is running, inherited by the tasks it creates
+current_plugin: ContextVar[Optional[str]] = ContextVar("current_plugin", default=None)
+
+TRACEMALLOC_FRAMES = 25
+
+
+class PluginStats:
+    __slots__ = (
+        "name",
+        "calls",
+        "total_time",
+        "max_time",
+        "live_tasks",
+        "errors",
+        "last_error",
+        "memory",
+    )
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.total_time = 0.0  # seconds, wall time spent in listeners
+        self.max_time = 0.0
+        self.live_tasks = 0  # running listeners and the tasks they created
+        self.errors = 0
+        self.last_error: str | None = None
+        self.memory: int | None = None  # bytes, last `sample_memory` result
+
+    @property
+    def average_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **{k: getattr(self, k) for k in self.__slots__},
+            "average_time": self.average_time,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"<PluginStats name={self.name} calls={self.calls} "
+            f"total_time={self.total_time:.3f}s live_tasks={self.live_tasks} "
+            f"errors={self.errors}>"
+        )
+
+
+class PluginStatsCollector:
+    def __init__(self) -> None:
+        self.stats: dict[str, PluginStats] = {}
+
+    def __iter__(self) -> Iterator[PluginStats]:
+        return iter(self.stats.values())
+
+    def get(self, name: str) -> PluginStats:
+        if (stats := self.stats.get(name)) is None:
+            stats = self.stats[name] = PluginStats(name)
+        return stats
+
+    def remove(self, name: str) -> None:
+        self.stats.pop(name, None)
+
+    @staticmethod
+    def owner_of(func: Callable[..., Any]) -> str | None:
+        """name of the plugin owning a listener"""
+        from .plugin import Plugin
+
+        if isinstance(owner := getattr(func, "__self__", None), Plugin):
+            return owner.__plugin_name__
+        return getattr(func, "__plugin_owner__", None)
+
+    def track_task(self, task: asyncio.Task, name: str) -> None:
+        stats = self.get(name)
+        stats.live_tasks += 1
+
+        def done(_: asyncio.Task) -> None:
+            stats.live_tasks -= 1
+
+        task.add_done_callback(done)
+
+    def install(self, loop: AbstractEventLoop) -> None:
+        """count the tasks created while a plugin's code is running"""
+        factory = loop.get_task_factory()
+
+        def task_factory(loop: AbstractEventLoop, coro: Any, **kwargs: Any):
+            if factory is None:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            else:
+                task = factory(loop, coro, **kwargs)
+
+            if (name := current_plugin.get()) is not None:
+                self.track_task(task, name)
+            return task
+
+        loop.set_task_factory(task_factory)
+
+    def sample_memory(self, plugins: dict[str, "Plugin"]) -> dict[str, int]:
+        """
+        bytes currently allocated by each plugin, from a `tracemalloc` snapshot;
+        an allocation belongs to the innermost plugin frame of its traceback
+        """
+        if not tracemalloc.is_tracing():
+            return {}
+
+        paths: dict[Path, str] = {}
+        for name, plugin in plugins.items():
+            if not (module := sys.modules.get(plugin.__module__)):
+                continue
+            try:
+                file = Path(inspect.getfile(module)).resolve()
+            except TypeError:
+                continue
+            # a package plugin owns the whole package directory
+            paths[file.parent if file.name == "main.py" else file] = name
+
+        owners: dict[str, str | None] = {}
+
+        def owner_of(filename: str) -> str | None:
+            if filename not in owners:
+                file = Path(filename).resolve()
+                owners[filename] = next(
+                    (n for p, n in paths.items() if file == p or p in file.parents),
+                    None,
+                )
+            return owners[filename]
+
+        result = dict.fromkeys(plugins, 0)
+        for trace in tracemalloc.take_snapshot().traces:
+            for frame in reversed(trace.traceback):
+                if (name := owner_of(frame.filename)) is not None:
+                    result[name] += trace.size
+                    break
+
+        for name, size in result.items():
+            self.get(name).memory = size
+        return result
@@ -1,4 +1,6 @@
 from .config import *
+from .delta import *
 from .format import *
 from .mc_rcon import *
+from .schema import *
 from .utils import *
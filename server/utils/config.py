@@ -7,6 +7,9 @@ from typing import Any, ClassVar, Literal, Optional, TypeVar, Union
 
 import yaml
 
+from ..errors import ConfigError
+from .schema import ConfigRecord, Schema
+
 __all__ = ("Config",)
 
 _T = TypeVar("_T")
@@ -16,6 +19,9 @@ class Config(ABC):
     __config_filetype__: ClassVar[Union[Literal["json"], Literal["yaml"]]]
     __config_path__: ClassVar[Union[str, Path]]
     __config_name__: ClassVar[str]
+    __config_schema__: ClassVar[Schema]
+
+    options: ConfigRecord
 
     def __init__(self, **kwargs: Any) -> None:
         cls = self.__class__
@@ -41,14 +47,14 @@ class Config(ABC):
         cls.__config_filetype__ = type
         cls.__config_path__ = path or Path() / "config"
         cls.__config_name__ = name or cls.__name__
+        cls.__config_schema__ = Schema.from_class(cls)
 
     def __iter__(self):
         for key in self._attrs:
             yield key, self.get(key)
 
     def __getitem__(self, key: str) -> Any:
-        self.reload()
-        return getattr(self, key)
+        return getattr(self.options, key)
 
     def get(self, key: str, default: Optional[None] = None) -> Optional[_T]:
         try:
@@ -59,6 +65,17 @@ class Config(ABC):
     def set(self, key: str, value: Any) -> None:
         if key not in self._attrs:
             raise AttributeError(f"Unknown attribute: {key}")
+
+        schema, source = self.__config_schema__, self.__config_file_path__
+        value = schema.convert(key, value, source=source)
+        old_value = getattr(self.options, key)
+        setattr(self.options, key, value)
+        try:
+            schema.derive(self.options, source=source)
+        except ConfigError:
+            setattr(self.options, key, old_value)
+            schema.derive(self.options, source=source)
+            raise
         setattr(self, key, value)
 
     def json(self) -> Union[list, dict]:
@@ -104,18 +121,19 @@ class Config(ABC):
             return None
 
     def reload(self) -> None:
+        """read the file again, validate and convert it to `self.options`"""
         self._attrs = []
         self._kwargs = self.load_data(
             self.__config_file_path__,
             self.__config_filetype__,
         )
+        self.options = self.__config_schema__.compile(
+            self._kwargs,
+            source=self.__config_file_path__,
+        )
 
-        for name, value in self.__class__.__dict__.items():
-            if name.startswith("_"):
-                continue
-
+        for name, value in self.options:
             self._attrs.append(name)
-            value = self._kwargs.pop(name, value) if self._kwargs else value
             setattr(self, name, value)
 
     def save(
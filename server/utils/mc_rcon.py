@@ -1,5 +1,22 @@
 """
 https://developer.valvesoftware.com/wiki/Source_RCON_Protocol
+
+```
+packet  size:i32 id:i32 type:i32 body:bytes 00 00
+```
+
+TCP reads are framed by `size`, a read may hold part of a packet or several.
+Minecraft splits long responses into packets of 4096 characters, so each command
+is followed by an empty `COMMAND_RESPONSE` packet, the sentinel. It is answered
+after the whole response, which ends when that answer arrives.
+
+Every packet has its own id, any number of commands may wait for their responses
+at once and complete in any order. The vanilla server expects exactly one packet
+per `read()` and drops the connection otherwise, so a packet is written only once
+the previous one is answered. The responses then come in the order the commands
+are written, the next command ends the response before it, the sentinel is only
+written when no command is waiting. `pipeline` writes every packet at once, for
+servers reading a stream.
 """
 
 from __future__ import annotations
@@ -7,17 +24,29 @@ from __future__ import annotations
 import asyncio
 import logging
 import struct
-from asyncio import AbstractEventLoop, BaseTransport, Future, Lock, Protocol
+from asyncio import AbstractEventLoop, BaseTransport, Future, Protocol
+from collections import deque
 from enum import Enum, auto
 from typing import TypedDict, TypeVar
 
 T = TypeVar("T", bound="RconClientProtocol")
 log = logging.getLogger("chat-bridgee")
 
+PACKET_SIZE = struct.Struct("<i")
+PACKET_HEADER = struct.Struct("<ii")  # id, type
+# id, type and the two terminators
+MIN_PACKET_SIZE = 10
+# a larger size means the stream is out of sync
+MAX_PACKET_SIZE = 1024 * 1024
+MAX_PACKET_ID = 2**31 - 1
+# the id of the answer to a failed login
+LOGIN_FAILED_ID = -1
+
 
 class RconPacketType(Enum):
     COMMAND_RESPONSE = 0
     COMMAND_EXECUTE = 2
+    AUTH_RESPONSE = 2
     LOGIN = 3
 
 
@@ -35,6 +64,10 @@ class LoginError(ReconException):
     pass
 
 
+class RconConnectionError(ReconException):
+    pass
+
+
 class ConnectState(Enum):
     CONNECTING = auto()
     CONNECTED = auto()
@@ -42,19 +75,60 @@ class ConnectState(Enum):
     CLOSED = auto()
 
 
+class RconRequest:
+    __slots__ = ("future", "response_type", "sentinel_id", "sentinel", "fragments")
+
+    def __init__(
+        self,
+        future: Future[RconPacketData],
+        response_type: int | None = None,
+    ) -> None:
+        self.future = future
+        # a request without sentinel ends with its first packet of this type,
+        # None for any type
+        self.response_type = response_type
+        # None for a login or a ping
+        self.sentinel_id: int | None = None
+        # written once the server reads the command, unless pipelining
+        self.sentinel: tuple[int, bytes] | None = None
+        self.fragments: list[bytes] = []
+
+    def resolve(self, packet_id: int, packet_type: int, body: bytes) -> None:
+        if not self.future.done():
+            self.future.set_result(
+                RconPacketData(
+                    id=packet_id,
+                    type=packet_type,
+                    data=body.decode("utf-8", "replace"),
+                )
+            )
+
+
 class RconClientProtocol(Protocol):
     def __init__(
         self,
         loop: AbstractEventLoop | None = None,
         command_timeout: int = 30,
+        *,
+        pipeline: bool = False,
     ):
         self.state = ConnectState.CONNECTING
 
         self._transport: BaseTransport | None = None
         self._loop = asyncio.get_running_loop() if loop is None else loop
-        self._wait_read = Future[RconPacketData]()
-        self._lock = Lock()
         self.timeout = command_timeout
+        self.pipeline = pipeline
+
+        self._buffer = bytearray()
+        self._last_id = 0
+        # by packet id, the sentinels by their id to the id of their command
+        self._requests: dict[int, RconRequest] = {}
+        self._sentinels: dict[int, int] = {}
+        # packets not written yet and the id of the one the server has not answered
+        self._queue: deque[tuple[int, bytes]] = deque()
+        self._unanswered: int | None = None
+        # ids of the requests written and not ended yet, unless pipelining
+        self._order: deque[int] = deque()
 
     def __call__(self: T) -> T:
         return self
@@ -64,58 +138,195 @@ class RconClientProtocol(Protocol):
         self._transport = transport
 
     def data_received(self, data):
-        # [data size(4 bytes), but data_received give all data received]:4
-        data = data[4:]
-
-        # [ID Field (4 bytes), Type Field (4 bytes)]:8
-        (packet_id, packet_type) = struct.unpack("<ii", data[:8])
-
-        if data[-2:] != b"\x00\x00":
-            log.error("Incorrect padding")
-        if packet_id == -1:
+        buffer = self._buffer
+        buffer += data
+
+        start = 0
+        while len(buffer) - start >= PACKET_SIZE.size:
+            (size,) = PACKET_SIZE.unpack_from(buffer, start)
+            if not MIN_PACKET_SIZE <= size <= MAX_PACKET_SIZE:
+                log.error(f"[{self._transport}] Invalid rcon packet size {size}")
+                self.close()
+                return
+
+            end = start + PACKET_SIZE.size + size
+            if len(buffer) < end:
+                # the rest of the packet is in a later read
+                break
+
+            packet_id, packet_type = PACKET_HEADER.unpack_from(
+                buffer,
+                start + PACKET_SIZE.size,
+            )
+            if buffer[end - 2 : end] != b"\x00\x00":
+                log.error("Incorrect padding")
+            body = bytes(
+                buffer[start + PACKET_SIZE.size + PACKET_HEADER.size : end - 2]
+            )
+            start = end
+
+            self.packet_received(packet_id, packet_type, body)
+
+        del buffer[:start]
+
+    def packet_received(self, packet_id: int, packet_type: int, body: bytes) -> None:
+        log.debug(f"read id: {packet_id};type: {packet_type};size: {len(body)}")
+        if packet_id in (self._unanswered, LOGIN_FAILED_ID):
+            self._unanswered = None
+
+        command_id = self._sentinels.pop(packet_id, packet_id)
+        if command_id in self._order:
+            # a packet of a later command ends the responses before it
+            while self._order[0] != command_id:
+                self._complete(self._order.popleft())
+
+        if command_id != packet_id:
+            if self._order and self._order[0] == command_id:
+                self._order.popleft()
+            self._complete(command_id)
+        elif (request := self._requests.get(packet_id)) is not None:
+            if request.sentinel_id is not None:
+                if request.sentinel is not None:
+                    # the command is read, the next one or the sentinel follows
+                    if not self._queue:
+                        self._queue.append(request.sentinel)
+                    request.sentinel = None
+                request.fragments.append(body)
+            elif request.response_type in (None, packet_type):
+                # some servers send an empty response before the login result
+                request.resolve(packet_id, packet_type, body)
+        elif packet_id == LOGIN_FAILED_ID:
             log.error("Login failed")
-
-        # -1 is for 1 bytes Empty string terminator
-        # Pocket body (At least 1 byte)
-        packet_payload = data[8:-2].decode("utf-8")
-
-        log.debug(f"read id: {packet_id};type: {packet_type};data: {packet_payload}")
-        self._wait_read.set_result(
-            RconPacketData(
-                id=packet_id,
-                type=packet_type,
-                data=packet_payload,
+            for request in self._requests.values():
+                if request.sentinel_id is None:
+                    request.resolve(packet_id, packet_type, body)
+        else:
+            # e.g. the response to a command that timed out
+            log.debug(f"rcon response without request, id: {packet_id}")
+
+        self._flush()
+
+    def _complete(self, command_id: int) -> None:
+        request = self._requests.get(command_id)
+        if request is not None and request.sentinel_id is not None:
+            # the whole response is received, decoded at once since a character
+            # may be split between two packets
+            request.resolve(
+                command_id,
+                RconPacketType.COMMAND_RESPONSE.value,
+                b"".join(request.fragments),
             )
-        )
 
     def connection_lost(self, exc):
         self.state = ConnectState.CLOSED
         log.info(f"[{self._transport}] The server closed the connection")
 
+        error = RconConnectionError(f"connection lost: {exc or 'closed'}")
+        for request in self._requests.values():
+            if not request.future.done():
+                request.future.set_exception(error)
+        self._requests.clear()
+        self._sentinels.clear()
+        self._queue.clear()
+        self._buffer.clear()
+        self._unanswered = None
+        self._order.clear()
+
     def close(self):
-        self._transport.close()
+        if self._transport is not None:
+            self._transport.close()
         self.state = ConnectState.CLOSED
 
     def is_connected(self) -> bool:
         return self.state in {ConnectState.CONNECTED, ConnectState.AUTHENTICATED}
 
-    async def _send(self, type: RconPacketType, data: str) -> RconPacketData:
-        await self._lock.acquire()
+    def _new_id(self) -> int:
+        # positive, ids of requests still waiting are skipped
+        while True:
+            self._last_id = self._last_id % MAX_PACKET_ID + 1
+            if self._last_id not in self._requests and (
+                self._last_id not in self._sentinels
+            ):
+                return self._last_id
+
+    def _flush(self) -> None:
+        while self._queue and (self.pipeline or self._unanswered is None):
+            packet_id, packet = self._queue.popleft()
+            self._transport.write(packet)
+            if not self.pipeline:
+                self._unanswered = packet_id
+                if packet_id in self._requests:
+                    # not a sentinel
+                    self._order.append(packet_id)
+
+    def _forget(self, request_id: int) -> None:
+        """drop a finished, timed out or cancelled request"""
+        if (request := self._requests.pop(request_id, None)) is None:
+            return
 
-        out_payload = (
-            struct.pack("<ii", 0, type.value) + data.encode("utf-8") + b"\x00\x00"
-        )
-        self._transport.write(struct.pack("<i", len(out_payload)) + out_payload)
+        # a written command stays in `_order`, its response still comes
+        ids = {request_id, request.sentinel_id}
+        self._sentinels.pop(request.sentinel_id, None)
+        if any(i in ids for i, _ in self._queue):
+            # not written yet, never executed
+            self._queue = deque(i for i in self._queue if i[0] not in ids)
+        if self._unanswered in ids:
+            # timed out, the server had the time to read it, e.g. it ignores
+            # the sentinel, the other commands go on
+            self._unanswered = None
+            self._flush()
 
-        data = await self._wait_read
-        self._wait_read = Future[RconPacketData]()
-        self._lock.release()
-        return data
+    async def _send(self, type: RconPacketType, data: str) -> RconPacketData:
+        if not self.is_connected():
+            raise RconConnectionError("not connected")
+
+        request_id = self._new_id()
+        request = RconRequest(
+            self._loop.create_future(),
+            (
+                RconPacketType.AUTH_RESPONSE.value
+                if type is RconPacketType.LOGIN
+                else None
+            ),
+        )
+        self._requests[request_id] = request
+        self._queue.append((request_id, self._packet(request_id, type, data)))
+        if type is RconPacketType.COMMAND_EXECUTE:
+            # answered once the response to the command is sent entirely
+            request.sentinel_id = sentinel_id = self._new_id()
+            self._sentinels[sentinel_id] = request_id
+            sentinel = (
+                sentinel_id,
+                self._packet(sentinel_id, RconPacketType.COMMAND_RESPONSE, ""),
+            )
+            if self.pipeline:
+                self._queue.append(sentinel)
+            else:
+                request.sentinel = sentinel
+        self._flush()
+
+        try:
+            return await request.future
+        finally:
+            self._forget(request_id)
+
+    @staticmethod
+    def _packet(packet_id: int, type: RconPacketType, data: str) -> bytes:
+        body = data.encode("utf-8")
+        return (
+            PACKET_SIZE.pack(PACKET_HEADER.size + len(body) + 2)
+            + PACKET_HEADER.pack(packet_id, type.value)
+            + body
+            + b"\x00\x00"
+        )
 
     async def authenticate(self, password: str) -> None:
         self.password = password
-        res = await self._send(RconPacketType.LOGIN, password)
-        if res["type"] == 2 and res["id"] == 0:
+        res = await asyncio.wait_for(
+            self._send(RconPacketType.LOGIN, password),
+            timeout=self.timeout,
+        )
+        if res["id"] != LOGIN_FAILED_ID:
             self.state = ConnectState.AUTHENTICATED
             return
 
@@ -132,6 +343,13 @@ class RconClientProtocol(Protocol):
             timeout=self.timeout if timeout is None else timeout,
         )
 
+    async def ping(self, *, timeout: float | None = None) -> None:
+        """an empty packet, answered without running a command"""
+        await asyncio.wait_for(
+            self._send(RconPacketType.COMMAND_RESPONSE, ""),
+            timeout=self.timeout if timeout is None else timeout,
+        )
+
 
 class RconClient:
     def __init__(
@@ -141,12 +359,20 @@ class RconClient:
         password: str | None = None,
         loop: AbstractEventLoop | None = None,
         protocol: Protocol | None = None,
+        *,
+        pipeline: bool = False,
     ) -> None:
         self.host = "localhost" if host is None else host
         self.port = int(25575 if port is None else port)
         self.password = "" if password is None else password
         self.loop = asyncio.get_running_loop() if loop is None else loop
-        self.protocol = RconClientProtocol(self.loop) if protocol is None else protocol
+        self.pipeline = pipeline
+        self.protocol = (
+            RconClientProtocol(self.loop, pipeline=pipeline)
+            if protocol is None
+            else protocol
+        )
+        self._connect_lock = asyncio.Lock()
 
     @property
     def is_connected(self):
@@ -158,8 +384,19 @@ class RconClient:
                 raise Exception("Connection is already established")
             return
 
-        await self.loop.create_connection(self.protocol, self.host, self.port)
-        await self.protocol.authenticate(self.password)
+        async with self._connect_lock:
+            if self.is_connected:
+                return
+            if self.protocol.state is ConnectState.CLOSED:
+                # a protocol is not reused after its connection is lost
+                self.protocol = RconClientProtocol(self.loop, pipeline=self.pipeline)
+
+            await self.loop.create_connection(self.protocol, self.host, self.port)
+            try:
+                await self.protocol.authenticate(self.password)
+            except BaseException:
+                self.protocol.close()
+                raise
 
     async def __aenter__(self: T) -> T:
         await self.connect()
@@ -174,6 +411,9 @@ class RconClient:
     def execute(self, command: str, *, timeout: float | None = None):
         return self.protocol.execute(command, timeout=timeout)
 
+    def ping(self, *, timeout: float | None = None):
+        return self.protocol.ping(timeout=timeout)
+
 
 if __name__ == "__main__":
 
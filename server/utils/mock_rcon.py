@@ -0,0 +1,304 @@
+"""
+Mock Minecraft RCON server
+==========================
+An asyncio server speaking the RCON protocol the way the vanilla server does, to
+run `RconClient` without Minecraft:
+
+- a wrong password is answered with id -1
+- responses are split into packets of `split` bytes, inside characters too
+- unknown packet types are answered with "Unknown request <type>"
+- `vanilla` reads one packet per `read()` and drops the connection when a read
+  holds more, otherwise packets are framed from the stream
+- `fragment` writes the responses in chunks of that many bytes
+- `latency` seconds pass before a command is answered, as it waits for a tick
+
+```py
+async with MockRconServer("password", players=["Steve"]) as mock:
+    async with RconClient(mock.host, mock.port, "password") as client:
+        await client.execute("list")
+```
+
+`python -m server.utils.mock_rcon` runs a benchmark of `RconClient` against it,
+throughput, latency under concurrency and reconnecting, offline.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import sys
+import time
+from asyncio import StreamReader, StreamWriter
+from typing import Callable, Iterable, Optional
+
+from .mc_rcon import (
+    LOGIN_FAILED_ID,
+    LoginError,
+    MIN_PACKET_SIZE,
+    PACKET_HEADER,
+    PACKET_SIZE,
+    RconClient,
+    RconConnectionError,
+    RconPacketType,
+)
+
+__all__ = ("MockRconServer",)
+
+# the read buffer of the vanilla server
+VANILLA_READ_SIZE = 1460
+VANILLA_SPLIT = 4096
+
+
+def pack(packet_id: int, packet_type: int, data: bytes) -> bytes:
+    return (
+        PACKET_SIZE.pack(len(data) + MIN_PACKET_SIZE)
+        + PACKET_HEADER.pack(packet_id, packet_type)
+        + data
+        + b"\x00\x00"
+    )
+
+
+class MockRconServer:
+    def __init__(
+        self,
+        password: str = "",
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        players: Iterable[str] = (),
+        handler: Optional[Callable[[str], Optional[str]]] = None,
+        latency: float = 0,
+        split: int = VANILLA_SPLIT,
+        fragment: Optional[int] = None,
+        vanilla: bool = True,
+    ) -> None:
+        self.password = password
+        self.host = host
+        self.port = port  # 0 for any free port, set by `start`
+        self.players = list(players)
+        # the response of a command, None for the built-in ones
+        self.handler = handler
+        self.latency = latency
+        self.split = split
+        self.fragment = fragment
+        self.vanilla = vanilla
+
+        self.commands: list[str] = []
+        self.connections = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.writers: set[StreamWriter] = set()
+        self.tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self.serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self.server is None:
+            return
+        self.server.close()
+        self.drop_connections()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.server.wait_closed()
+        self.server = None
+
+    def drop_connections(self) -> None:
+        """close every connection, like a server restart"""
+        for writer in self.writers.copy():
+            writer.transport.abort()
+
+    async def __aenter__(self) -> MockRconServer:
+        await self.start()
+        return self
+
+    async def __aexit__(self, type, value, trace) -> None:
+        await self.close()
+
+    def respond(self, command: str) -> str:
+        if self.handler is not None and (result := self.handler(command)) is not None:
+            return result
+
+        name, _, args = command.partition(" ")
+        if name == "list":
+            return (
+                f"There are {len(self.players)} of a max of 20 players online: "
+                + ", ".join(self.players)
+            )
+        if name == "say":
+            return ""
+        # `repeat <n> <text>`, a response longer than one packet
+        if name == "repeat" and (count := args.partition(" "))[0].isdigit():
+            return count[2] * int(count[0])
+        return f"Unknown or incomplete command, see below for error{command}<--[HERE]"
+
+    async def read_packets(self, reader: StreamReader):
+        if self.vanilla:
+            while len(data := await reader.read(VANILLA_READ_SIZE)) >= 4:
+                (size,) = PACKET_SIZE.unpack_from(data)
+                if size + PACKET_SIZE.size != len(data) or size < MIN_PACKET_SIZE:
+                    return
+                yield data[PACKET_SIZE.size :]
+            return
+
+        while True:
+            try:
+                (size,) = PACKET_SIZE.unpack(await reader.readexactly(PACKET_SIZE.size))
+                if size < MIN_PACKET_SIZE:
+                    return
+                yield await reader.readexactly(size)
+            except asyncio.IncompleteReadError:
+                return
+
+    async def serve(self, reader: StreamReader, writer: StreamWriter) -> None:
+        self.connections += 1
+        self.writers.add(writer)
+        self.tasks.add(task := asyncio.current_task())
+        authenticated = False
+        try:
+            async for packet in self.read_packets(reader):
+                packet_id, packet_type = PACKET_HEADER.unpack_from(packet)
+                body = packet[PACKET_HEADER.size : -2].decode("utf-8")
+
+                if packet_type == RconPacketType.LOGIN.value:
+                    authenticated = body == self.password
+                    response = pack(
+                        packet_id if authenticated else LOGIN_FAILED_ID,
+                        RconPacketType.AUTH_RESPONSE.value,
+                        b"",
+                    )
+                elif not authenticated:
+                    return
+                elif packet_type == RconPacketType.COMMAND_EXECUTE.value:
+                    self.commands.append(body)
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    data = self.respond(body).encode("utf-8")
+                    response = b"".join(
+                        pack(packet_id, 0, data[i : i + self.split])
+                        for i in range(0, max(len(data), 1), self.split)
+                    )
+                else:
+                    text = f"Unknown request {packet_type:x}"
+                    response = pack(packet_id, 0, text.encode("utf-8"))
+
+                await self.write(writer, response)
+        except (ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            self.tasks.discard(task)
+            writer.close()
+
+    async def write(self, writer: StreamWriter, data: bytes) -> None:
+        if self.fragment is None:
+            writer.write(data)
+        else:
+            for i in range(0, len(data), self.fragment):
+                writer.write(data[i : i + self.fragment])
+                await writer.drain()
+                # let the client read each piece on its own
+                await asyncio.sleep(0)
+        await writer.drain()
+
+
+# ----- benchmark -----
+
+
+async def bench_throughput(
+    mock: MockRconServer,
+    *,
+    pipeline: bool,
+    count: int = 2000,
+    concurrency: int = 50,
+) -> tuple[float, list[float]]:
+    """commands per second and the latency of each command"""
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with RconClient(mock.host, mock.port, mock.password, pipeline=pipeline) as c:
+
+        async def run(index: int) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                result = await c.execute(f"repeat 1 {index}")
+                latencies.append(time.perf_counter() - start)
+                assert result["data"] == str(index), result
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run(i) for i in range(count)))
+        return count / (time.perf_counter() - start), latencies
+
+
+async def bench_reconnect(mock: MockRconServer, *, count: int = 50) -> float:
+    """mean seconds from a dropped connection to the next response"""
+    total = 0.0
+    async with RconClient(mock.host, mock.port, mock.password) as client:
+        for _ in range(count):
+            await client.execute("list")
+            mock.drop_connections()
+            start = time.perf_counter()
+            while True:
+                try:
+                    await client.connect()
+                    await client.execute("list")
+                    break
+                except RconConnectionError:
+                    await asyncio.sleep(0)
+            total += time.perf_counter() - start
+    return total / count
+
+
+async def check(mock: MockRconServer) -> None:
+    """the client against the edge cases of the protocol"""
+    try:
+        async with RconClient(mock.host, mock.port, "wrong"):
+            pass
+    except LoginError:
+        pass
+    else:
+        raise AssertionError("logged in with a wrong password")
+
+    async with RconClient(mock.host, mock.port, mock.password) as client:
+        # several packets, split inside characters
+        result = await client.execute("repeat 5000 方塊")
+        assert result["data"] == "方塊" * 5000, len(result["data"])
+        assert (await client.execute("say hi"))["data"] == ""
+        await client.ping()
+
+
+def format_latency(latencies: list[float]) -> str:
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return f"p50 {statistics.median(latencies) * 1000:.2f}ms " f"p99 {p99 * 1000:.2f}ms"
+
+
+async def benchmark() -> None:
+    async with MockRconServer("password", fragment=7, split=100) as mock:
+        await check(mock)
+    async with MockRconServer("password", vanilla=False, fragment=3) as mock:
+        await check(mock)
+    print("protocol checks passed")
+
+    cases = (
+        ("vanilla", {}, False),
+        ("vanilla, 1ms latency", {"latency": 0.001}, False),
+        ("stream", {"vanilla": False}, False),
+        ("stream, pipelined", {"vanilla": False}, True),
+        ("stream, pipelined, 1ms latency", {"vanilla": False, "latency": 0.001}, True),
+    )
+    for name, options, pipeline in cases:
+        async with MockRconServer("password", **options) as mock:
+            rate, latencies = await bench_throughput(mock, pipeline=pipeline)
+        print(f"{name}: {rate:.0f} cmd/s, {format_latency(latencies)}")
+
+    async with MockRconServer("password") as mock:
+        reconnect = await bench_reconnect(mock)
+    print(f"reconnect: {reconnect * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(benchmark())
+    except AssertionError as e:
+        print(f"check failed: {e!r}", file=sys.stderr)
+        sys.exit(1)
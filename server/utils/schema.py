@@ -0,0 +1,301 @@
+"""
+Typed config schema
+===================
+Convert raw (json / yaml) config dicts into slotted, typed records once at load,
+instead of re-parsing values at every use site.
+
+Fields are taken from the class attributes (or `NamedTuple` fields) with their
+annotations; classes without annotations fall back to the type of the default.
+Values derived from other fields are declared with `derived` and are computed
+when the record is compiled, and again when `Config.set` changes a field.
+"""
+
+from __future__ import annotations
+
+import copy
+import sys
+import types
+import typing
+from typing import Any, Callable, ClassVar, Iterator, NamedTuple, Optional, Union
+
+from ..errors import ConfigError
+
+__all__ = ("ConfigRecord", "Schema", "derived")
+
+_UnionType = getattr(types, "UnionType", Union)
+_TRUE_STRINGS = {"true", "yes", "on", "1"}
+_FALSE_STRINGS = {"false", "no", "off", "0"}
+
+
+class derived:
+    """mark a config method as a value computed from the other fields"""
+
+    def __init__(self, func: Callable[[Any], Any]) -> None:
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+
+class SchemaField(NamedTuple):
+    name: str
+    type: Any
+    default: Any
+
+
+class ConfigRecord:
+    """slotted, typed view of a config, created by `Schema.compile`"""
+
+    __slots__ = ()
+    __schema__: ClassVar["Schema"]
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        return getattr(self, key, default)
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        for name in self.__schema__.fields:
+            yield name, getattr(self, name)
+
+    def __repr__(self) -> str:
+        values = " ".join(f"{k}={v!r}" for k, v in self)
+        return f"<{self.__class__.__name__} {values}>"
+
+
+class Schema:
+    def __init__(
+        self,
+        name: str,
+        fields: dict[str, SchemaField],
+        derived_fields: dict[str, derived] | None = None,
+    ) -> None:
+        self.name = name
+        self.fields = fields
+        self.derived_fields = derived_fields or {}
+        self.record_type: type[ConfigRecord] = type(
+            f"{name}Record",
+            (ConfigRecord,),
+            {
+                "__slots__": (*self.fields, *self.derived_fields),
+                "__schema__": self,
+            },
+        )
+
+    @classmethod
+    def from_class(cls, config_cls: type) -> "Schema":
+        """build schema from a `Config` subclass or a `NamedTuple`"""
+        hints = _get_type_hints(config_cls)
+        fields: dict[str, SchemaField] = {}
+        derived_fields: dict[str, derived] = {}
+
+        if (defaults := getattr(config_cls, "_field_defaults", None)) is not None:
+            for name in config_cls._fields:
+                fields[name] = SchemaField(
+                    name,
+                    hints.get(name, Any),
+                    defaults.get(name),
+                )
+            return cls(config_cls.__name__, fields)
+
+        for name, value in config_cls.__dict__.items():
+            if name.startswith("_"):
+                continue
+            if isinstance(value, derived):
+                derived_fields[name] = value
+                continue
+            if callable(value) or isinstance(value, (classmethod, staticmethod)):
+                continue
+
+            fields[name] = SchemaField(name, hints.get(name, type(value)), value)
+
+        return cls(config_cls.__name__, fields, derived_fields)
+
+    def compile(self, data: dict | None, *, source: Any = None) -> ConfigRecord:
+        """validate and convert `data`, raise `ConfigError` on the first bad key"""
+        data = data or {}
+        record = self.record_type.__new__(self.record_type)
+
+        for name, field in self.fields.items():
+            value = data[name] if name in data else copy.deepcopy(field.default)
+            setattr(record, name, self.convert(name, value, source=source))
+
+        self.derive(record, source=source)
+        return record
+
+    def derive(self, record: ConfigRecord, *, source: Any = None) -> None:
+        """compute the derived fields of `record` from its fields"""
+        for name, field in self.derived_fields.items():
+            try:
+                setattr(record, name, field.func(record))
+            except ConfigError:
+                raise
+            except Exception as e:
+                raise ConfigError(name, str(e), source=source)
+
+    def convert(self, name: str, value: Any, *, source: Any = None) -> Any:
+        """validate and convert one field value"""
+        return convert_value(
+            value,
+            self.fields[name].type,
+            name,
+            source=source,
+        )
+
+
+def _get_type_hints(obj: Any) -> dict[str, Any]:
+    try:
+        return typing.get_type_hints(obj)
+    except Exception:
+        pass
+
+    # resolve one by one, unresolvable annotations fall back to the default types
+    hints = {}
+    namespace = vars(sys.modules.get(obj.__module__, typing))
+    for name, annotation in getattr(obj, "__annotations__", {}).items():
+        try:
+            hints[name] = (
+                eval(annotation, namespace)
+                if isinstance(annotation, str)
+                else annotation
+            )
+        except Exception:
+            continue
+    return hints
+
+
+def _type_name(tp: Any) -> str:
+    return getattr(tp, "__name__", None) or str(tp).replace("typing.", "")
+
+
+def convert_value(value: Any, tp: Any, key: str, *, source: Any = None) -> Any:
+    def fail(reason: str | None = None) -> ConfigError:
+        return ConfigError(
+            key,
+            reason or f"expected {_type_name(tp)}, got {value!r}",
+            source=source,
+        )
+
+    if tp is Any or tp is object:
+        return value
+
+    origin, args = typing.get_origin(tp), typing.get_args(tp)
+
+    if origin is Union or origin is _UnionType:
+        if value is None:
+            if type(None) in args:
+                return None
+            raise fail()
+
+        for arg in args:
+            if arg is type(None):
+                continue
+            try:
+                return convert_value(value, arg, key, source=source)
+            except ConfigError:
+                continue
+        raise fail()
+
+    if tp is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int) and value in (0, 1):
+            return bool(value)
+        if isinstance(value, str) and (lower := value.strip().lower()) in (
+            _TRUE_STRINGS | _FALSE_STRINGS
+        ):
+            return lower in _TRUE_STRINGS
+        raise fail()
+
+    if tp is int:
+        if isinstance(value, bool):
+            raise fail()
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str):
+            try:
+                return int(value.strip())
+            except ValueError:
+                pass
+        raise fail()
+
+    if tp is float:
+        if isinstance(value, bool):
+            raise fail()
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            try:
+                return float(value.strip())
+            except ValueError:
+                pass
+        raise fail()
+
+    if tp is str:
+        if isinstance(value, str):
+            return value
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+        raise fail()
+
+    container = origin or tp
+    if container in (list, tuple, set, frozenset):
+        # allow "a,b,c" for list values
+        if isinstance(value, str):
+            value = [i.strip() for i in value.split(",") if i.strip()]
+        if not isinstance(value, (list, tuple, set, frozenset)):
+            raise fail()
+
+        if container is tuple and args and args[-1] is not Ellipsis:
+            if len(args) != len(value):
+                raise fail(f"expected {len(args)} items, got {len(value)}")
+            item_types = args
+        else:
+            item_types = [args[0] if args else Any] * len(value)
+
+        return container(
+            convert_value(item, item_type, f"{key}[{i}]", source=source)
+            for i, (item, item_type) in enumerate(zip(value, item_types))
+        )
+
+    if container is dict:
+        if not isinstance(value, dict):
+            raise fail()
+
+        key_type, value_type = args or (Any, Any)
+        return {
+            convert_value(k, key_type, f"{key}.{k}", source=source): convert_value(
+                v, value_type, f"{key}.{k}", source=source
+            )
+            for k, v in value.items()
+        }
+
+    # NamedTuple
+    if isinstance(tp, type) and issubclass(tp, tuple) and hasattr(tp, "_fields"):
+        if isinstance(value, tp):
+            return value
+        if isinstance(value, (list, tuple)):
+            value = dict(zip(tp._fields, value))
+        if not isinstance(value, dict):
+            raise fail()
+
+        hints, defaults = _get_type_hints(tp), tp._field_defaults
+        items = {}
+        for name in tp._fields:
+            if name not in value and name not in defaults:
+                raise ConfigError(f"{key}.{name}", "missing value", source=source)
+            items[name] = convert_value(
+                value.get(name, defaults.get(name)),
+                hints.get(name, Any),
+                f"{key}.{name}",
+                source=source,
+            )
+        return tp(**items)
+
+    if isinstance(tp, type):
+        if isinstance(value, tp):
+            return value
+        raise fail()
+
+    return value
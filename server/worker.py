@@ -0,0 +1,620 @@
+"""
+Plugin worker process
+=====================
+Host a plugin in a child process, so its CPU work and GC pauses do not stall the
+bridge event loop. Messages are pickled over a `multiprocessing` pipe:
+
+parent -> child
+  ("event", event_name, args, kwargs)
+  ("clients", [ClientState, ...])
+  ("presence", {client_name: Presence})
+  ("result", call_id, error, value)
+  ("stop",)
+
+child -> parent
+  ("ready", [event_method, ...], [(plugin_name, description), ...])
+  ("call", call_id | None, sid | None, method, args, kwargs)
+  ("log", record_dict)
+
+`Context` arguments are sent as `ClientState` and become `ContextProxy` in the
+child, their methods (and `server.send` / `emit`) are called in the parent.
+`server.presence` in the child is a copy of the tracker of the parent, sent when
+it changes and before each event, so `get` stays synchronous.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import itertools
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from asyncio import AbstractEventLoop, Future
+from collections import deque
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional, Union
+
+import rich
+
+from .context import Context
+from .core.command import CommandManager
+from .core.config import Config, UserData
+from .core.presence import Presence
+from .core.rcon import RconPool
+from .core.server import EVENT_BUFFER_SIZE, BaseServer, CoroFunc
+from .plugin import PluginMixin, SoloSetup, SoloSetupType
+from .stats import PluginStatsCollector
+
+if TYPE_CHECKING:
+    from multiprocessing.process import BaseProcess
+
+__all__ = ("ProcessSetup", "PluginProcess")
+
+log = logging.getLogger("chat-bridgee")
+
+# methods the child may call in the parent
+SERVER_METHODS = {"send", "emit", "publish_file", "publish_path", "unload_extension"}
+CONTEXT_METHODS = {
+    "emit",
+    "execute_command",
+    "query_command",
+    "invalidate_queries",
+    "extra_command",
+    "disconnect",
+}
+
+# events after which `server.presence` may have changed
+PRESENCE_EVENTS = (
+    "on_connect",
+    "on_disconnect",
+    "on_server_startup",
+    "on_server_stop",
+    "on_player_joined",
+    "on_player_left",
+    "on_presence_synced",
+)
+
+RESTART_MAX_DELAY = 60  # seconds
+STOP_TIMEOUT = 5  # seconds
+
+
+class ClientState(NamedTuple):
+    sid: str
+    user: UserData
+
+
+def _to_state(ctx: Context) -> ClientState:
+    return ClientState(ctx.sid, ctx.user)
+
+
+# ----- parent -----
+
+
+class PluginProcess:
+    def __init__(self, server: "BaseServer", setup: "ProcessSetup") -> None:
+        self.server = server
+        self.setup = setup
+        self.loop = server.loop
+        self.process: BaseProcess | None = None
+        self.conn: Connection | None = None
+        self.ready = False
+        self.plugins: list[tuple[str, str]] = []  # [(name, description)]
+
+        self._stopping = False
+        self._started_at = 0.0
+        self._restarts = 0
+        self._send_lock = threading.Lock()
+        self._listeners: list[tuple[str, CoroFunc]] = []
+        self._pending: deque[tuple] = deque(maxlen=EVENT_BUFFER_SIZE)
+        self._clients: tuple[str, ...] = ()
+        self._presence: dict[str, Presence] | None = None
+
+    def start(self) -> None:
+        self._stopping = False
+        self._started_at = time.monotonic()
+
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=run_worker,
+            args=(
+                self.setup.name,
+                self.setup.type,
+                child_conn,
+                list(sys.path),
+                # what `on_load` sees
+                [_to_state(i) for i in self.server.clients.values()],
+                self.server.presence.snapshot(),
+            ),
+            name=f"ChatBridgeE: {self.setup.name}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+        threading.Thread(
+            target=self._read,
+            args=(self.process, self.conn),
+            name=f"ChatBridgeE: read {self.setup.name}",
+            daemon=True,
+        ).start()
+        log.info(f"插件子進程已啟動: {self.setup.name} (pid={self.process.pid})")
+
+    def stop(self) -> None:
+        self._stopping = True
+        self.ready = False
+        self._remove_listeners()
+        self._stop_process(self.process, self.conn)
+
+    def restart(self) -> None:
+        """start a new child, events are buffered until it is ready"""
+        old_process, old_conn = self.process, self.conn
+        self.ready = False
+        self._stop_process(old_process, old_conn)
+        self.start()
+
+    def _stop_process(self, process: BaseProcess | None, conn: Connection | None):
+        if process is None:
+            return
+
+        try:
+            conn.send(("stop",))
+        except (OSError, ValueError):
+            pass
+
+        def join():
+            process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                log.warning(f"插件子進程 {self.setup.name} 未正常退出, 強制結束")
+                process.terminate()
+            conn.close()
+
+        # do not block the event loop while the child shuts down
+        threading.Thread(target=join, daemon=True).start()
+
+    def _read(self, process: BaseProcess, conn: Connection) -> None:
+        try:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    break
+                self.loop.call_soon_threadsafe(self._handle, process, message)
+
+            self.loop.call_soon_threadsafe(self._on_exit, process)
+        except RuntimeError:
+            # the event loop is closed, the server is shut down
+            pass
+
+    def _send(self, message: tuple) -> None:
+        with self._send_lock:
+            self.conn.send(message)
+
+    def _handle(self, process: BaseProcess, message: tuple) -> None:
+        if process is not self.process:
+            return
+
+        kind, *data = message
+        if kind == "ready":
+            self._on_ready(*data)
+        elif kind == "call":
+            self.loop.create_task(self._call(*data))
+        elif kind == "log":
+            record = logging.makeLogRecord(data[0])
+            logging.getLogger(record.name).handle(record)
+
+    def _on_ready(self, events: list[str], plugins: list[tuple[str, str]]) -> None:
+        self._remove_listeners()
+        for event in events:
+            listener = self._make_listener(event.removeprefix("on_"))
+            self.server.add_listener(listener, event)
+            self._listeners.append((event, listener))
+        for event in PRESENCE_EVENTS:
+            self.server.add_listener(self._on_presence_event, event)
+            self._listeners.append((event, self._on_presence_event))
+
+        self.plugins = plugins
+        self.ready = True
+        self._clients = ()
+        self._presence = None
+        log.info(f"插件子進程已就緒: {self.setup.name} {[i for i, _ in plugins]}")
+
+        while self._pending and self.ready:
+            self._send_event(*self._pending.popleft())
+
+    def _on_exit(self, process: BaseProcess) -> None:
+        if process is not self.process or self._stopping:
+            return
+
+        self.ready = False
+        process.join(0.5)
+        if time.monotonic() - self._started_at > RESTART_MAX_DELAY:
+            self._restarts = 0
+        delay = min(2**self._restarts, RESTART_MAX_DELAY)
+        self._restarts += 1
+
+        log.error(
+            f"插件子進程 {self.setup.name} 意外退出 (exitcode={process.exitcode}), "
+            f"{delay}s 後重新啟動"
+        )
+        self.loop.call_later(delay, self._restart_after_crash, process)
+
+    def _restart_after_crash(self, process: BaseProcess) -> None:
+        if process is self.process and not self._stopping:
+            self.start()
+
+    def _remove_listeners(self) -> None:
+        for event, listener in self._listeners:
+            self.server.remove_listener(listener, event)
+        self._listeners.clear()
+
+    def _make_listener(self, event_name: str) -> CoroFunc:
+        async def listener(*args: Any, **kwargs: Any) -> None:
+            self._send_event(event_name, args, kwargs)
+
+        # see `PluginStatsCollector.owner_of`
+        listener.__plugin_owner__ = self.setup.name
+        return listener
+
+    async def _on_presence_event(self, *args: Any, **kwargs: Any) -> None:
+        # after the listeners of `PresenceTracker`, they were added first
+        if self.ready:
+            try:
+                self._sync_presence()
+            except (OSError, ValueError):
+                pass
+
+    def _sync_presence(self) -> None:
+        if (presence := self.server.presence.snapshot()) != self._presence:
+            self._send(("presence", presence))
+            self._presence = presence
+
+    def _send_event(self, event_name: str, args: tuple, kwargs: dict) -> None:
+        if not self.ready:
+            self._pending.append((event_name, args, kwargs))
+            return
+
+        try:
+            # keep the child client list in sync before it sees the event
+            if (clients := tuple(self.server.clients)) != self._clients:
+                self._send(
+                    ("clients", [_to_state(c) for c in self.server.clients.values()])
+                )
+                self._clients = clients
+            self._sync_presence()
+
+            self._send(
+                (
+                    "event",
+                    event_name,
+                    tuple(_to_state(i) if isinstance(i, Context) else i for i in args),
+                    kwargs,
+                )
+            )
+        except (OSError, ValueError):
+            # child is gone, `_on_exit` restarts it
+            self._pending.append((event_name, args, kwargs))
+        except Exception:
+            log.exception(f"無法將事件 {event_name} 傳送至插件子進程 {self.setup.name}")
+
+    async def _call(
+        self,
+        call_id: int | None,
+        sid: str | None,
+        method: str,
+        args: tuple,
+        kwargs: dict,
+    ) -> None:
+        error, result = None, None
+        try:
+            if sid is None:
+                if method not in SERVER_METHODS:
+                    raise AttributeError(f"server.{method} is not available")
+                target = self.server
+            else:
+                if method not in CONTEXT_METHODS:
+                    raise AttributeError(f"context.{method} is not available")
+                if (target := self.server.clients.get(sid)) is None:
+                    raise LookupError(f"client {sid} is disconnected")
+
+            result = getattr(target, method)(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            error = e
+
+        if call_id is None:
+            if error is not None:
+                log.error(f"插件子進程 {self.setup.name} 呼叫 {method} 出錯: {error}")
+            return
+
+        try:
+            self._send(("result", call_id, error, result))
+        except (OSError, ValueError):
+            pass
+        except Exception as e:
+            # result or error can not be pickled
+            self._send(("result", call_id, RuntimeError(repr(e)), None))
+
+
+class ProcessSetup(SoloSetup):
+    """load the module in a child process instead of the server process"""
+
+    isolated = True
+
+    def __init__(
+        self,
+        name: str,
+        type: SoloSetupType = SoloSetupType.FILE,
+    ) -> None:
+        super().__init__(name, type=type)
+        self.process: PluginProcess | None = None
+
+    def load(self, server: "BaseServer") -> None:
+        start = time.perf_counter()
+        self.process = PluginProcess(server, self)
+        self.process.start()
+        self.import_time = time.perf_counter() - start
+
+    def unload(self, server: "BaseServer") -> None:
+        self.spec = None
+        if self.process is not None:
+            self.process.stop()
+            self.process = None
+
+    def restart(self) -> None:
+        self.process.restart()
+
+
+# ----- child -----
+
+
+class ContextProxy:
+    """`Context` in the plugin process, method calls run in the server process"""
+
+    def __init__(self, server: "WorkerServer", state: ClientState) -> None:
+        self.server = server
+        self.log = server.log
+        self.sid = state.sid
+        self.user = state.user
+
+    @property
+    def display_name(self) -> str:
+        return self.user.display_name or self.user.name
+
+    @property
+    def name(self) -> str:
+        return self.user.name
+
+    async def emit(self, event: str, *data: Optional[Any], **kwargs: Any) -> None:
+        await self.server.call("emit", event, *data, sid=self.sid, **kwargs)
+
+    async def disconnect(self, **kwargs: Any) -> None:
+        await self.server.call("disconnect", sid=self.sid, **kwargs)
+
+    async def execute_command(self, command: str, exc_timeout: bool = True):
+        return await self.server.call(
+            "execute_command",
+            command,
+            exc_timeout,
+            sid=self.sid,
+        )
+
+    async def query_command(
+        self,
+        command: str,
+        exc_timeout: bool = True,
+        *,
+        ttl: float | None = None,
+    ):
+        return await self.server.call(
+            "query_command",
+            command,
+            exc_timeout,
+            ttl=ttl,
+            sid=self.sid,
+        )
+
+    def invalidate_queries(self) -> None:
+        # sync like `Context.invalidate_queries`, nothing to wait for
+        self.server.send_message(("call", None, self.sid, "invalidate_queries", (), {}))
+
+    async def extra_command(self, command: str, *, timeout: float | None = None):
+        return await self.server.call(
+            "extra_command",
+            command,
+            timeout=timeout,
+            sid=self.sid,
+        )
+
+    def __str__(self) -> str:
+        return self.display_name
+
+    __repr__ = __str__
+
+
+class PresenceProxy:
+    """`server.presence` in the plugin process, the players are tracked in the
+    server process, this is the copy it sent last
+    """
+
+    def __init__(self, entries: dict[str, Presence]) -> None:
+        self.entries = entries
+
+    def get(self, name: str) -> Optional[Presence]:
+        return self.entries.get(name)
+
+    def snapshot(self) -> dict[str, Presence]:
+        return dict(self.entries)
+
+
+class _PipeLogHandler(logging.Handler):
+    def __init__(self, server: "WorkerServer") -> None:
+        super().__init__(logging.DEBUG)
+        self.server = server
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            msg = record.getMessage()
+            if record.exc_info:
+                msg += f"\n{logging.Formatter().formatException(record.exc_info)}"
+
+            data = {**record.__dict__, "msg": msg, "args": None, "exc_info": None}
+            data.pop("exc_text", None)
+            self.server.send_message(("log", data))
+        except Exception:
+            pass
+
+
+class WorkerServer(BaseServer):
+    """the part of `BaseServer` a plugin sees, inside the plugin process"""
+
+    def __init__(self, conn: Connection, loop: AbstractEventLoop) -> None:
+        # no socket server in the child, only the plugin / listener state
+        PluginMixin.__init__(self)
+
+        self.conn = conn
+        self.loop = loop
+        self.extra_events: dict[str, list[CoroFunc]] = {}
+        self.event_buffer: deque = deque(maxlen=EVENT_BUFFER_SIZE)
+        self.lazy_extensions: dict = {}
+        self.paused_setups: set[str] = set()
+        self.plugin_stats = PluginStatsCollector()
+        self.plugin_stats.install(loop)
+        self.clients: dict[str, ContextProxy] = {}
+        self.command_manager = CommandManager(self)
+        self.log = log
+        self.console = rich.get_console()
+        self.config = Config("chatbridgee-config", config_type="yaml")
+        self.plugins_dir = self.config.get("plugins_path")
+        # sockets do not cross the pipe, the plugin process keeps its own pool
+        self.rcon = RconPool(
+            loop,
+            max_connections=self.config.get("rcon_max_connections"),
+            idle_timeout=self.config.get("rcon_idle_timeout"),
+            query_ttl=dict(self.config.get("rcon_query_ttl")),
+        )
+        self.presence = PresenceProxy({})
+
+        self._send_lock = threading.Lock()
+        self._call_ids = itertools.count()
+        self._calls: dict[int, Future] = {}
+
+    def send_message(self, message: tuple) -> None:
+        with self._send_lock:
+            self.conn.send(message)
+
+    async def call(self, method: str, *args: Any, sid: str | None = None, **kwargs):
+        call_id = next(self._call_ids)
+        self._calls[call_id] = future = self.loop.create_future()
+        self.send_message(("call", call_id, sid, method, args, kwargs))
+
+        try:
+            return await future
+        finally:
+            self._calls.pop(call_id, None)
+
+    def handle(self, message: tuple) -> None:
+        kind, *data = message
+        if kind == "event":
+            event_name, args, kwargs = data
+            args = tuple(
+                self._get_proxy(i) if isinstance(i, ClientState) else i for i in args
+            )
+            self.dispatch(event_name, *args, **kwargs)
+        elif kind == "clients":
+            self.clients = {state.sid: self._get_proxy(state) for state in data[0]}
+        elif kind == "presence":
+            self.presence.entries = data[0]
+        elif kind == "result":
+            call_id, error, result = data
+            if (future := self._calls.get(call_id)) and not future.done():
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+        elif kind == "stop":
+            self.loop.create_task(self.shutdown())
+
+    def _get_proxy(self, state: ClientState) -> ContextProxy:
+        if (proxy := self.clients.get(state.sid)) is None:
+            proxy = ContextProxy(self, state)
+        return proxy
+
+    async def shutdown(self) -> None:
+        for name in self.plugins.copy().keys():
+            self.remove_plugin(name)
+        # let the `on_unload` close tasks run
+        await asyncio.sleep(1)
+        self.rcon.close()
+        self.loop.stop()
+
+    async def emit(self, event: str, *data: Optional[Any], **kwargs: Any) -> None:
+        await self.call("emit", event, *data, **kwargs)
+
+    async def send(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        await self.call("send", msg, *args, **kwargs)
+
+    async def publish_file(self, name: str, data: bytes, **kwargs: Any) -> None:
+        await self.call("publish_file", name, bytes(data), **kwargs)
+
+    async def publish_path(
+        self, name: str, path: Union[str, Path], **kwargs: Any
+    ) -> None:
+        # the file system is shared, only the path crosses the pipe
+        await self.call("publish_path", name, str(path), **kwargs)
+
+    def unload_extension(self, name: str) -> None:
+        # the plugin process belongs to the server, ask it to unload us
+        self.send_message(("call", None, None, "unload_extension", (name,), {}))
+
+
+def run_worker(
+    setup_name: str,
+    setup_type: SoloSetupType,
+    conn: Connection,
+    sys_path: list[str],
+    clients: list[ClientState],
+    presence: dict[str, Presence],
+) -> None:
+    sys.path[:] = sys_path
+    asyncio.set_event_loop(loop := asyncio.new_event_loop())
+    server = WorkerServer(conn, loop)
+    server.handle(("clients", clients))
+    server.handle(("presence", presence))
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+    root_logger.addHandler(_PipeLogHandler(server))
+    logging.getLogger("discord").setLevel(logging.ERROR)
+
+    setup = SoloSetup(setup_name, type=setup_type)
+    setup.load(server)
+
+    events = [name for name, funcs in server.extra_events.items() if funcs]
+    plugins = [(k, v.__plugin_description__) for k, v in server.plugins.items()]
+    server.send_message(("ready", events, plugins))
+
+    def read():
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                # server process is gone
+                loop.call_soon_threadsafe(loop.stop)
+                return
+            loop.call_soon_threadsafe(server.handle, message)
+            if message[0] == "stop":
+                return
+
+    threading.Thread(target=read, name="ChatBridgeE: read", daemon=True).start()
+
+    try:
+        loop.run_forever()
+    finally:
+        setup.unload(server)
+        conn.close()
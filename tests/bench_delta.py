@@ -0,0 +1,74 @@
+"""
+Benchmark of `server.utils.delta` on schematics of real sizes, the bytes sent
+for typical edits against sending the whole file, and the time each side spends
+
+    python -m tests.bench_delta
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+from server.utils import delta
+from tests.fixtures.schematic import Schematic
+
+# (name, width, height, length), a farm, a base and a world download
+SIZES = (
+    ("small 64x64x64", 64, 64, 64),
+    ("medium 128x96x128", 128, 96, 128),
+    ("large 256x128x256", 256, 128, 256),
+)
+
+EDITS: tuple[tuple[str, Callable[[Schematic], None]], ...] = (
+    ("one build", lambda s: s.fill(8, s.height // 2, 8, 16, 6)),
+    ("200 scattered blocks", lambda s: s.scatter(200)),
+    (
+        "new block type",
+        lambda s: s.fill(20, s.height // 2, 20, 4, s.add_block("minecraft:beacon")),
+    ),
+)
+
+
+def timed(func: Callable[[], bytes | None]) -> tuple[bytes | None, float]:
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def format_size(size: int) -> str:
+    return f"{size / 1024:.0f}KiB" if size < 1024 * 1024 else f"{size / 2**20:.2f}MiB"
+
+
+def benchmark() -> None:
+    for size_name, width, height, length in SIZES:
+        for edit_name, edit in EDITS:
+            schematic = Schematic(width, height, length)
+            old = schematic.dump()
+            edit(schematic)
+            new = schematic.dump()
+
+            signature, sign_time = timed(lambda: delta.make_signature(old))
+            result, delta_time = timed(lambda: delta.make_delta(new, signature))
+            if result is None:
+                print(
+                    f"{size_name}, {edit_name}: file {format_size(len(new))}, "
+                    f"sent whole (delta {delta_time * 1000:.0f}ms)"
+                )
+                continue
+
+            rebuilt, apply_time = timed(lambda: delta.apply_delta(old, result))
+            assert rebuilt == new, f"{size_name}, {edit_name}: rebuilt file differs"
+
+            sent = len(signature) + len(result)
+            print(
+                f"{size_name}, {edit_name}: file {format_size(len(new))}, "
+                f"signature {format_size(len(signature))}, "
+                f"delta {format_size(len(result))} ({sent / len(new):.1%} sent), "
+                f"signature {sign_time * 1000:.0f}ms, "
+                f"delta {delta_time * 1000:.0f}ms, apply {apply_time * 1000:.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    benchmark()
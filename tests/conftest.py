@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+
+from server import BaseServer
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """a `BaseServer` on its own loop, the extensions left loaded are unloaded"""
+    # the config and file store are created in the working directory
+    monkeypatch.chdir(tmp_path)
+
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(_create_server())
+    yield server
+
+    for name in list(server.setups):
+        server.unload_extension(name)
+    server.presence.close()
+    server.rcon.close()
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+
+
+async def _create_server() -> BaseServer:
+    return BaseServer()
@@ -0,0 +1,4 @@
+# events recorded by the fixture plugins, `(module name, event)`
+events: list[tuple[str, str]] = []
+# fixture plugins raising on import
+broken: set[str] = set()
@@ -0,0 +1,21 @@
+"""a plugin recording each execution of its module, `setup` and `teardown`"""
+
+from server import BaseServer, Plugin
+from tests.fixtures import broken, events
+
+events.append((__name__, "import"))
+if __name__ in broken:
+    raise ImportError(f"{__name__} is broken")
+
+
+class Counted(Plugin):
+    pass
+
+
+def setup(server: BaseServer):
+    events.append((__name__, "setup"))
+    server.add_plugin(Counted(server))
+
+
+def teardown(server: BaseServer):
+    events.append((__name__, "teardown"))
@@ -0,0 +1,128 @@
+"""
+Sponge schematics (`.schem`, version 2) like WorldEdit writes them, gzip
+compressed NBT with the blocks as a palette and varint indexes, to test and
+benchmark the delta encoding on realistic files without shipping any
+"""
+
+from __future__ import annotations
+
+import random
+import struct
+import zlib
+
+TAG_INT, TAG_SHORT, TAG_BYTE_ARRAY, TAG_LIST, TAG_COMPOUND = 3, 2, 7, 9, 10
+TAG_END = 0
+
+BLOCKS = [
+    "minecraft:air",
+    "minecraft:stone",
+    "minecraft:dirt",
+    "minecraft:grass_block[snowy=false]",
+    "minecraft:deepslate[axis=y]",
+    "minecraft:cobblestone",
+    "minecraft:oak_planks",
+    "minecraft:oak_log[axis=y]",
+    "minecraft:glass",
+    "minecraft:redstone_wire[east=side,north=none,power=0,south=side,west=none]",
+    "minecraft:repeater[delay=1,facing=north,locked=false,powered=false]",
+    "minecraft:hopper[enabled=true,facing=down]",
+    "minecraft:observer[facing=up,powered=false]",
+    "minecraft:sticky_piston[extended=false,facing=east]",
+    "minecraft:slime_block",
+    "minecraft:iron_ore",
+    "minecraft:coal_ore",
+    "minecraft:water[level=0]",
+    "minecraft:smooth_stone_slab[type=bottom,waterlogged=false]",
+    "minecraft:white_concrete",
+]
+
+
+def _name(name: str) -> bytes:
+    data = name.encode("utf-8")
+    return struct.pack(">H", len(data)) + data
+
+
+def encode(width: int, height: int, length: int, blocks: bytes, palette: list[str]):
+    """the NBT of a schematic, `blocks` holds a palette index per block in
+    y, z, x order
+    """
+    out = bytearray()
+    out += bytes((TAG_COMPOUND,)) + _name("Schematic")
+    out += bytes((TAG_INT,)) + _name("Version") + struct.pack(">i", 2)
+    out += bytes((TAG_INT,)) + _name("DataVersion") + struct.pack(">i", 3465)
+    for key, value in (("Width", width), ("Height", height), ("Length", length)):
+        out += bytes((TAG_SHORT,)) + _name(key) + struct.pack(">h", value)
+    out += bytes((TAG_INT,)) + _name("PaletteMax") + struct.pack(">i", len(palette))
+    out += bytes((TAG_COMPOUND,)) + _name("Palette")
+    for index, block in enumerate(palette):
+        out += bytes((TAG_INT,)) + _name(block) + struct.pack(">i", index)
+    out += bytes((TAG_END,))
+    # varints, the indexes are below 128 here so one byte each
+    data = bytes(blocks)
+    out += bytes((TAG_BYTE_ARRAY,)) + _name("BlockData")
+    out += struct.pack(">i", len(data)) + data
+    out += bytes((TAG_LIST,)) + _name("BlockEntities")
+    out += bytes((TAG_COMPOUND,)) + struct.pack(">i", 0)
+    out += bytes((TAG_END,))
+    return bytes(out)
+
+
+def gzip(data: bytes) -> bytes:
+    """as `java.util.zip.GZIPOutputStream`, no mtime and the default level"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush()
+    header = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\x00"
+    return header + body + struct.pack("<II", zlib.crc32(data), len(data))
+
+
+class Schematic:
+    def __init__(self, width: int, height: int, length: int, seed: int = 0) -> None:
+        self.width, self.height, self.length = width, height, length
+        self.palette = list(BLOCKS)
+        self.random = random.Random(seed)
+
+        # terrain below a third of the height, machines scattered above
+        layer = width * length
+        ground = height // 3
+        blocks = bytearray()
+        for y in range(height):
+            if y < ground:
+                base = 4 if y < ground // 2 else 1 if y < ground - 3 else 2
+                row = bytearray([base]) * layer
+                for _ in range(layer // 40):
+                    row[self.random.randrange(layer)] = self.random.choice((15, 16))
+            elif y == ground:
+                row = bytearray([3]) * layer
+            else:
+                row = bytearray(layer)
+                for _ in range(layer // 12):
+                    row[self.random.randrange(layer)] = self.random.randrange(5, 20)
+            blocks += row
+        self.blocks = blocks
+
+    def fill(self, x: int, y: int, z: int, size: int, block: int) -> None:
+        """a cube of one block, e.g. a new build"""
+        for dy in range(size):
+            for dz in range(size):
+                start = self.index(x, y + dy, z + dz)
+                self.blocks[start : start + size] = bytes([block]) * size
+
+    def scatter(self, count: int) -> None:
+        """single blocks changed all over, e.g. redstone tweaks"""
+        for _ in range(count):
+            self.blocks[self.random.randrange(len(self.blocks))] = (
+                self.random.randrange(5, len(self.palette))
+            )
+
+    def add_block(self, name: str) -> int:
+        """a block new to the palette, the data after the palette shifts"""
+        self.palette.append(name)
+        return len(self.palette) - 1
+
+    def index(self, x: int, y: int, z: int) -> int:
+        return (y * self.length + z) * self.width + x
+
+    def dump(self) -> bytes:
+        return gzip(
+            encode(self.width, self.height, self.length, self.blocks, self.palette)
+        )
@@ -0,0 +1,37 @@
+import pytest
+
+from server.errors import ConfigError
+from server.utils import Config, derived
+
+
+class ChannelConfig(Config):
+    channels: list[int] = [1, 2]
+
+    @derived
+    def channel_ids(self) -> frozenset[int]:
+        if 0 in self.channels:
+            raise ValueError("0 is not a channel")
+        return frozenset(self.channels)
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch) -> ChannelConfig:
+    monkeypatch.chdir(tmp_path)
+    return ChannelConfig()
+
+
+def test_set_recomputes_derived(config: ChannelConfig):
+    assert config.get("channel_ids") == {1, 2}
+
+    config.set("channels", [3])
+
+    assert config.get("channels") == [3]
+    assert config.get("channel_ids") == {3}
+
+
+def test_set_rejected_by_derived(config: ChannelConfig):
+    with pytest.raises(ConfigError):
+        config.set("channels", [0])
+
+    assert config.get("channels") == [1, 2]
+    assert config.get("channel_ids") == {1, 2}
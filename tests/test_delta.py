@@ -0,0 +1,85 @@
+import importlib.util
+import os
+import random
+from pathlib import Path
+
+import pytest
+
+from server.utils import delta
+from tests.fixtures.schematic import Schematic
+
+ROOT = Path(__file__).parent.parent
+CLIENT_DELTA = ROOT / "chatbridgee" / "chatbridgee" / "delta.py"
+
+
+def load_client_delta():
+    # the MCDR plugin is packaged on its own, loaded by path
+    spec = importlib.util.spec_from_file_location("chatbridgee_delta", CLIENT_DELTA)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+client_delta = load_client_delta()
+
+
+def test_client_copy_in_step():
+    # the server and the MCDR plugin are shipped separately, each keeps a copy
+    server_source = (ROOT / "server" / "utils" / "delta.py").read_text("utf-8")
+    assert CLIENT_DELTA.read_text("utf-8") == server_source
+
+
+def roundtrip(old: bytes, new: bytes, sender=delta, receiver=delta) -> bytes:
+    result = sender.make_delta(new, receiver.make_signature(old))
+    assert result is not None
+    assert receiver.apply_delta(old, result) == new
+    return result
+
+
+def test_raw_file():
+    rng = random.Random(1)
+    old = rng.randbytes(256 * 1024)
+    new = bytearray(old)
+    new[1000:1000] = b"inserted"
+    new[100_000:100_500] = rng.randbytes(500)
+
+    assert len(roundtrip(old, bytes(new))) < len(new) // 10
+
+
+def test_schematic_edit():
+    schematic = Schematic(64, 48, 64, seed=2)
+    old = schematic.dump()
+    schematic.fill(10, 20, 10, 8, schematic.add_block("minecraft:diamond_block"))
+    schematic.scatter(20)
+    new = schematic.dump()
+
+    assert len(roundtrip(old, new)) < len(new) // 2
+
+
+@pytest.mark.parametrize(
+    "sender, receiver", [(delta, client_delta), (client_delta, delta)]
+)
+def test_server_and_client_compatible(sender, receiver):
+    schematic = Schematic(48, 32, 48, seed=3)
+    old = schematic.dump()
+    schematic.scatter(50)
+
+    roundtrip(old, schematic.dump(), sender, receiver)
+
+
+def test_unrelated_file_sent_whole():
+    old, new = os.urandom(128 * 1024), os.urandom(128 * 1024)
+
+    assert delta.make_delta(new, delta.make_signature(old)) is None
+
+
+def test_changed_base_rejected():
+    schematic = Schematic(48, 32, 48, seed=4)
+    old = schematic.dump()
+    schematic.scatter(10)
+    result = delta.make_delta(schematic.dump(), delta.make_signature(old))
+
+    with pytest.raises(delta.DeltaError):
+        delta.apply_delta(os.urandom(len(old)), result[:-1] + b"\xff" * 64)
+    with pytest.raises(delta.DeltaError):
+        delta.apply_delta(old, b"CBD0" + result[4:])
@@ -0,0 +1,124 @@
+import logging
+import os
+import random
+import threading
+from unittest import mock
+
+import pytest
+from mcdreforged.api.all import ServerInterface
+
+# the MCDR plugin reads its metadata when imported
+with mock.patch.object(ServerInterface, "get_instance"):
+    from chatbridgee.chatbridgee.file_sync import FileSyncPlugin
+    from chatbridgee.chatbridgee.transfer import IncomingTransfer, TransferError
+    from chatbridgee.chatbridgee.utils import FileChunk
+    from chatbridgee.chatbridgee.writer import FileWriter
+
+CHUNK_SIZE = 16
+CHUNKS = 64
+
+
+class FakeSio:
+    def __init__(self) -> None:
+        self.resumes: list[int] = []
+
+    def emit(self, event: str, data: dict, callback=None) -> None:
+        assert event == "file_transfer_resume"
+        self.resumes.append(data["next"])
+
+
+@pytest.fixture
+def plugin(tmp_path):
+    data = os.urandom(CHUNK_SIZE * CHUNKS - 3)
+    info = {"id": os.urandom(16).hex(), "path": "file", "size": len(data)}
+    transfer = IncomingTransfer({**info, "chunk_size": CHUNK_SIZE}, tmp_path / "file")
+
+    # only what `on_file_chunk` uses
+    plugin = FileSyncPlugin.__new__(FileSyncPlugin)
+    plugin.log = logging.getLogger("test")
+    plugin.sio = FakeSio()
+    plugin.writer = FileWriter(plugin.log, CHUNKS, 1 << 20)
+    plugin.incoming = {transfer.id: transfer}
+    plugin.data, plugin.transfer = data, transfer
+    yield plugin
+
+    plugin.writer.close()
+    transfer.abort()
+
+
+def receive(plugin, index: int) -> dict:
+    data = plugin.data[index * CHUNK_SIZE : (index + 1) * CHUNK_SIZE]
+    chunk = FileChunk(bytes.fromhex(plugin.transfer.id), index, data)
+    return plugin.on_file_chunk(chunk.encode())
+
+
+def test_chunks_handled_out_of_order(plugin):
+    # a window of chunks, each handled in its own thread like the socketio client
+    order = list(range(CHUNKS))
+    random.Random(0).shuffle(order)
+    acks: dict[int, dict] = {}
+    threads = [
+        threading.Thread(target=lambda i=i: acks.__setitem__(i, receive(plugin, i)))
+        for i in order
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert acks == {i: {"next": i + 1} for i in range(CHUNKS)}
+    assert plugin.transfer.received
+    assert not plugin.sio.resumes
+
+    plugin.writer.close()
+    plugin.transfer.finish()
+    assert plugin.transfer.path.read_bytes() == plugin.data
+
+
+def test_duplicates_accepted_once(plugin):
+    for index in range(4):
+        receive(plugin, index)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(receive(plugin, 3)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert plugin.transfer.next == 4
+    assert results == [{"next": 4}] * 8
+    # the server stopped at the duplicate, asked to go on from `next` once
+    assert plugin.sio.resumes == [4]
+
+    # left from the sending replaced by the resume
+    receive(plugin, 2)
+    assert plugin.sio.resumes == [4]
+    assert receive(plugin, 4) == {"next": 5}
+
+
+def test_missing_chunk_resumes(plugin, monkeypatch):
+    monkeypatch.setattr("chatbridgee.chatbridgee.transfer.REORDER_TIMEOUT", 0.05)
+
+    # chunk 0 never comes
+    assert receive(plugin, 1) == {"next": 0}
+    assert plugin.sio.resumes == [0]
+
+
+def test_corrupt_transfer_counted(plugin):
+    plugin.corrupt_files = 0
+    plugin.settle_pull = mock.Mock(return_value=True)
+    plugin.transfer.hash = "0" * 64
+    for index in range(CHUNKS):
+        receive(plugin, index)
+
+    plugin.finish_transfer(plugin.transfer)
+    plugin.writer.close()
+
+    assert plugin.corrupt_files == 1
+    (name, error), _ = plugin.settle_pull.call_args
+    assert isinstance(error, TransferError)
+    assert not plugin.transfer.path.exists()
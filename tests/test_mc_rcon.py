@@ -0,0 +1,131 @@
+import asyncio
+import random
+
+import pytest
+
+from server.utils.mc_rcon import (
+    MIN_PACKET_SIZE,
+    PACKET_HEADER,
+    PACKET_SIZE,
+    ConnectState,
+    RconClientProtocol,
+    RconPacketType,
+)
+
+SPLIT = 4096
+READ_SIZES = (1, 2, 3, 5, 13, 100, 1460, 4096, 20000)
+
+
+def pack(packet_id: int, packet_type: int, body: bytes) -> bytes:
+    return (
+        PACKET_SIZE.pack(len(body) + MIN_PACKET_SIZE)
+        + PACKET_HEADER.pack(packet_id, packet_type)
+        + body
+        + b"\x00\x00"
+    )
+
+
+def respond(command: str) -> bytes:
+    # multi-packet responses with characters split between packets
+    name, _, count = command.partition(" ")
+    return ("方塊" * int(count) if name == "blocks" else f"echo {command}").encode()
+
+
+class FakeTransport:
+    """answers the written packets like the vanilla server"""
+
+    def __init__(self) -> None:
+        self.written = bytearray()
+        self.closed = False
+
+    def write(self, data: bytes) -> None:
+        self.written += data
+
+    def close(self) -> None:
+        self.closed = True
+
+    def answer(self) -> bytes:
+        out = bytearray()
+        while len(self.written) >= PACKET_SIZE.size:
+            (size,) = PACKET_SIZE.unpack_from(self.written)
+            packet = bytes(self.written[PACKET_SIZE.size : PACKET_SIZE.size + size])
+            del self.written[: PACKET_SIZE.size + size]
+
+            packet_id, packet_type = PACKET_HEADER.unpack_from(packet)
+            body = packet[PACKET_HEADER.size : -2]
+            if packet_type == RconPacketType.COMMAND_EXECUTE.value:
+                data = respond(body.decode())
+                for i in range(0, max(len(data), 1), SPLIT):
+                    out += pack(packet_id, 0, data[i : i + SPLIT])
+            else:
+                # the sentinel
+                out += pack(packet_id, 0, f"Unknown request {packet_type:x}".encode())
+        return bytes(out)
+
+
+def feed(protocol: RconClientProtocol, data: bytes, rng: random.Random) -> None:
+    """split and coalesce at random offsets"""
+    pos = 0
+    while pos < len(data):
+        size = rng.choice(READ_SIZES)
+        protocol.data_received(data[pos : pos + size])
+        pos += size
+
+
+async def run_commands(seed: int, pipeline: bool) -> None:
+    rng = random.Random(seed)
+    protocol = RconClientProtocol(asyncio.get_running_loop(), pipeline=pipeline)
+    transport = FakeTransport()
+    protocol.connection_made(transport)
+    protocol.state = ConnectState.AUTHENTICATED
+
+    commands = [
+        rng.choice((f"say {i}", f"blocks {rng.randint(0, 5000)}"))
+        for i in range(rng.randint(1, 12))
+    ]
+    tasks = [asyncio.ensure_future(protocol.execute(i)) for i in commands]
+    await asyncio.sleep(0)
+
+    while not all(task.done() for task in tasks):
+        if answer := transport.answer():
+            feed(protocol, answer, rng)
+        await asyncio.sleep(0)
+
+    for command, task in zip(commands, tasks):
+        assert task.result()["data"] == respond(command).decode(), command
+    assert not protocol._buffer
+    assert not protocol._requests and not protocol._sentinels
+
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_random_read_boundaries(pipeline: bool):
+    for seed in range(100):
+        asyncio.run(run_commands(seed, pipeline))
+
+
+def test_packets_split_and_coalesced():
+    rng = random.Random(0)
+    for _ in range(200):
+        protocol = RconClientProtocol(asyncio.new_event_loop())
+        received = []
+        protocol.packet_received = lambda *packet: received.append(packet)
+
+        packets = [
+            (i, rng.choice((0, 2)), rng.randbytes(rng.randint(0, 5000)))
+            for i in range(rng.randint(1, 20))
+        ]
+        feed(protocol, b"".join(pack(*i) for i in packets), rng)
+
+        assert received == packets
+        assert not protocol._buffer
+
+
+def test_invalid_size_closes():
+    protocol = RconClientProtocol(asyncio.new_event_loop())
+    transport = FakeTransport()
+    protocol.connection_made(transport)
+
+    protocol.data_received(PACKET_SIZE.pack(3) + b"\x00" * 16)
+
+    assert transport.closed
+    assert protocol.state is ConnectState.CLOSED
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from server.utils.mc_rcon import (
+    ConnectState,
+    LoginError,
+    RconClient,
+    RconConnectionError,
+)
+from server.utils.mock_rcon import MockRconServer
+
+PASSWORD = "password"
+
+# (options of the mock, pipelined client)
+MODES = {
+    "vanilla": ({}, False),
+    "stream": ({"vanilla": False}, False),
+    "pipelined": ({"vanilla": False}, True),
+}
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 30))
+
+
+def test_login_failed():
+    async def main():
+        async with MockRconServer(PASSWORD) as mock:
+            client = RconClient(mock.host, mock.port, "wrong")
+            with pytest.raises(LoginError):
+                await client.connect()
+            assert not client.is_connected
+            assert client.protocol.state is ConnectState.CLOSED
+
+            # the mock drops unauthenticated commands
+            assert not mock.commands
+
+    run(main())
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("fragment", [None, 1, 7, 1000])
+def test_multi_packet_response(mode: str, fragment):
+    options, pipeline = MODES[mode]
+
+    async def main():
+        async with MockRconServer(
+            PASSWORD, split=100, fragment=fragment, **options
+        ) as mock:
+            async with RconClient(
+                mock.host, mock.port, PASSWORD, pipeline=pipeline
+            ) as client:
+                # split inside characters
+                result = await client.execute("repeat 500 方塊")
+                assert result["data"] == "方塊" * 500
+                assert (await client.execute("say hi"))["data"] == ""
+                # a response of exactly one packet
+                assert (await client.execute("repeat 100 a"))["data"] == "a" * 100
+                await client.ping()
+
+    run(main())
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_concurrent_commands(mode: str):
+    options, pipeline = MODES[mode]
+
+    async def main():
+        async with MockRconServer(PASSWORD, latency=0.001, **options) as mock:
+            async with RconClient(
+                mock.host, mock.port, PASSWORD, pipeline=pipeline
+            ) as client:
+                results = await asyncio.gather(
+                    *(client.execute(f"repeat {i % 3 + 1} {i},") for i in range(200))
+                )
+                for i, result in enumerate(results):
+                    assert result["data"] == f"{i}," * (i % 3 + 1)
+                assert len(mock.commands) == 200
+
+    run(main())
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_timeout(mode: str):
+    options, pipeline = MODES[mode]
+
+    async def main():
+        async with MockRconServer(PASSWORD, **options) as mock:
+            async with RconClient(
+                mock.host, mock.port, PASSWORD, pipeline=pipeline
+            ) as client:
+                mock.latency = 0.2
+                with pytest.raises(asyncio.TimeoutError):
+                    await client.execute("repeat 1 late", timeout=0.05)
+
+                # the late response is not taken for the next one
+                mock.latency = 0
+                assert (await client.execute("repeat 1 next"))["data"] == "next"
+                assert client.is_connected
+                assert not client.protocol._requests
+
+    run(main())
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_connection_lost(mode: str):
+    options, pipeline = MODES[mode]
+
+    async def main():
+        async with MockRconServer(PASSWORD, latency=0.2, **options) as mock:
+            async with RconClient(
+                mock.host, mock.port, PASSWORD, pipeline=pipeline
+            ) as client:
+                tasks = [
+                    asyncio.ensure_future(client.execute(f"say {i}")) for i in range(5)
+                ]
+                await asyncio.sleep(0.05)
+                mock.drop_connections()
+
+                for task in tasks:
+                    with pytest.raises(RconConnectionError):
+                        await task
+                protocol = client.protocol
+                assert not client.is_connected
+                assert not protocol._requests and not protocol._sentinels
+                assert not protocol._queue and not protocol._order
+                assert not protocol._buffer and protocol._unanswered is None
+
+                with pytest.raises(RconConnectionError):
+                    await client.execute("say closed")
+
+    run(main())
+
+
+def test_reconnect():
+    async def main():
+        async with MockRconServer(PASSWORD, players=["Steve"]) as mock:
+            async with RconClient(mock.host, mock.port, PASSWORD) as client:
+                for _ in range(3):
+                    mock.drop_connections()
+                    await asyncio.sleep(0.01)
+                    assert not client.is_connected
+
+                    await client.connect()
+                    result = await client.execute("list")
+                    assert result["data"].endswith(": Steve")
+                assert mock.connections == 4
+
+    run(main())
+
+
+def test_connection_refused():
+    async def main():
+        async with MockRconServer(PASSWORD) as mock:
+            host, port = mock.host, mock.port
+        client = RconClient(host, port, PASSWORD)
+        with pytest.raises(OSError):
+            await client.connect()
+        assert not client.is_connected
+
+    run(main())
@@ -0,0 +1,85 @@
+import sys
+
+import pytest
+
+from server import BaseServer
+from server.errors import ExtensionNotFound
+from tests.fixtures import broken, events
+
+NAME = "tests.fixtures.counted_plugin"
+
+
+@pytest.fixture(autouse=True)
+def clear_events():
+    events.clear()
+    broken.clear()
+
+
+def count(event: str) -> int:
+    return sum(1 for _, name in events if name == event)
+
+
+def test_load_executes_module_once(server: BaseServer):
+    server.load_extension(NAME)
+
+    assert events == [(NAME, "import"), (NAME, "setup")]
+    assert server.get_plugin("Counted") is not None
+    assert server.setups[NAME].import_time > 0
+
+
+def test_reload_executes_module_once(server: BaseServer):
+    server.load_extension(NAME)
+    server.reload_extension(NAME)
+
+    assert count("import") == 2
+    assert count("setup") == 2
+    assert count("teardown") == 1
+    assert server.get_plugin("Counted") is not None
+
+
+def test_hot_reload_executes_module_once(server: BaseServer):
+    server.load_extension(NAME)
+    server.loop.run_until_complete(server.hot_reload_extension(NAME))
+
+    assert count("import") == 2
+    assert count("setup") == 2
+    assert count("teardown") == 1
+
+
+def test_failed_hot_reload_keeps_old_modules(server: BaseServer):
+    server.load_extension(NAME)
+    module, plugin = sys.modules[NAME], server.get_plugin("Counted")
+
+    broken.add(NAME)
+    with pytest.raises(ImportError):
+        server.loop.run_until_complete(server.hot_reload_extension(NAME))
+
+    assert sys.modules[NAME] is module
+    assert server.get_plugin("Counted") is plugin
+    assert count("teardown") == 0
+    assert NAME not in server.paused_setups
+
+    broken.clear()
+    server.loop.run_until_complete(server.hot_reload_extension(NAME))
+    assert sys.modules[NAME] is not module
+    assert server.get_plugin("Counted") is not plugin
+
+
+def test_unload_does_not_execute_module(server: BaseServer):
+    server.load_extension(NAME)
+    server.unload_extension(NAME)
+
+    assert count("import") == 1
+    assert count("teardown") == 1
+    assert server.get_plugin("Counted") is None
+    assert NAME not in server.setups
+
+    with pytest.raises(ExtensionNotFound):
+        server.unload_extension(NAME)
+
+
+def test_background_load_executes_module_once(server: BaseServer):
+    server.loop.run_until_complete(server.load_extension_background(NAME))
+
+    assert events == [(NAME, "import"), (NAME, "setup")]
+    assert server.get_plugin("Counted") is not None
@@ -0,0 +1,115 @@
+import asyncio
+import sys
+
+import pytest
+
+from server import BaseServer
+
+NAME = "plugins.sessions"
+# a whole hour, `int(timestamp // 3600)`
+HOUR = 480000
+START = HOUR * 3600
+
+
+class FakeClient:
+    """a connected client answering `list` with `players`"""
+
+    sid = "sid"
+    name = "survival"
+
+    def __init__(self, *players: str) -> None:
+        self.players = players
+
+    async def execute_command(self, command: str, exc_timeout: bool = True):
+        assert command == "list"
+        return {
+            "data": f"There are {len(self.players)} of a max of 20 players online: "
+            + ", ".join(self.players)
+        }
+
+
+class Clock:
+    """`time` of the plugin module, `time()` is `now`"""
+
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def sessions(server: BaseServer):
+    server.load_extension(NAME)
+    return server.get_plugin("Sessions")
+
+
+async def sync(server: BaseServer, client: FakeClient) -> None:
+    assert await server.presence.sync(client)
+    # the listeners run as tasks
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_players_online_on_connect_get_a_visit(server: BaseServer, sessions):
+    run = server.loop.run_until_complete
+
+    run(sync(server, FakeClient("Steve", "Alex")))
+
+    assert sessions.online["survival"].keys() == {"Steve", "Alex"}
+    (visit,) = run(sessions.player("Steve"))
+    assert visit.server == "survival" and visit.left_at is None
+
+
+def test_players_gone_at_reconcile_leave(server: BaseServer, sessions):
+    run = server.loop.run_until_complete
+
+    run(sync(server, FakeClient("Steve", "Alex")))
+    run(sync(server, FakeClient("Alex", "Notch")))
+
+    assert sessions.online["survival"].keys() == {"Alex", "Notch"}
+    (visit,) = run(sessions.player("Steve"))
+    assert visit.left_at is not None
+    (visit,) = run(sessions.player("Alex"))
+    assert visit.left_at is None
+    (summary,) = run(sessions.summary())
+    assert summary.joins == 3 and summary.online == 2
+
+
+def test_hourly_aggregates(server: BaseServer, sessions, monkeypatch):
+    clock = Clock(START)
+    monkeypatch.setattr(sys.modules[NAME], "time", clock)
+    run = server.loop.run_until_complete
+
+    def at(seconds: float, action, player: str) -> None:
+        clock.now = START + seconds
+        action("survival", player)
+
+    at(600, sessions.join, "Steve")
+    at(1200, sessions.join, "Alex")
+    at(1800, sessions.leave, "Steve")
+    # no events for two hours, Alex stays online through them
+    at(3 * 3600 + 600, sessions.leave, "Alex")
+    at(3 * 3600 + 900, sessions.join, "Notch")
+    clock.now = START + 3 * 3600 + 1500
+
+    rows = run(sessions.hourly("survival", 4))
+    assert [tuple(i) for i in rows] == [
+        # Steve 1200s, Alex 2400s, both online at once
+        (HOUR, 2, 2, 3600),
+        # filled hours, Alex alone
+        (HOUR + 1, 1, 0, 3600),
+        (HOUR + 2, 1, 0, 3600),
+        # Alex 600s, Notch 600s so far, still online
+        (HOUR + 3, 1, 1, 1200),
+    ]
+
+    (summary,) = run(sessions.summary(4))
+    assert summary.peak == 2
+    assert summary.joins == 3
+    assert summary.online == 1
+    assert summary.hours == pytest.approx(12000 / 3600)
+
+    (visit,) = run(sessions.player("Alex"))
+    assert visit.joined_at == START + 1200
+    assert visit.left_at == START + 3 * 3600 + 600
@@ -0,0 +1,58 @@
+import asyncio
+
+from server import BaseServer, Plugin
+
+
+class Sender(Plugin):
+    @Plugin.listener
+    async def on_ping(self):
+        self.server.dispatch("pong")
+
+
+class Receiver(Plugin):
+    def __init__(self, server: BaseServer):
+        super().__init__(server)
+        self.release = asyncio.Event()
+
+    @Plugin.listener
+    async def on_pong(self):
+        await self.release.wait()
+
+
+async def settle() -> None:
+    # the listener tasks and their done callbacks
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_dispatched_task_counted_for_listener(server: BaseServer):
+    server.add_plugin(Sender(server))
+    server.add_plugin(receiver := Receiver(server))
+    stats = server.plugin_stats
+
+    async def ping():
+        server.dispatch("ping")
+        await settle()
+
+        # the `on_pong` task, once and only for the listening plugin
+        assert stats.get("Sender").live_tasks == 0
+        assert stats.get("Receiver").live_tasks == 1
+
+        receiver.release.set()
+        await settle()
+        assert stats.get("Receiver").live_tasks == 0
+
+    server.loop.run_until_complete(ping())
+    assert stats.get("Sender").calls == stats.get("Receiver").calls == 1
+
+
+def test_stats_dropped_on_unload(server: BaseServer):
+    name = "tests.fixtures.counted_plugin"
+    server.load_extension(name)
+    server.plugin_stats.get("Counted").calls += 1
+
+    server.reload_extension(name)
+    assert server.plugin_stats.get("Counted").calls == 1
+
+    server.unload_extension(name)
+    assert "Counted" not in server.plugin_stats.stats
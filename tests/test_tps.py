@@ -0,0 +1,46 @@
+import asyncio
+import sys
+from collections import deque
+
+from plugins.tps import SPARK, TickSample, Tps
+from server import BaseServer
+
+NAME = "plugins.tps"
+
+
+class FakeClient:
+    """a connected client without RCON"""
+
+    sid = "sid"
+    name = "survival"
+    display_name = "survival"
+
+    async def execute_command(self, command: str, exc_timeout: bool = True):
+        return ...
+
+
+def test_sparkline_stalled_server():
+    samples = deque([TickSample(0, 20.0, 25.0), TickSample(1, 0.0, None)])
+
+    assert Tps.sparkline(samples) == SPARK[4] + SPARK[-1]
+
+
+def test_disconnected_server_offline(server: BaseServer, monkeypatch):
+    server.load_extension(NAME)
+    tps = server.get_plugin("Tps")
+    monkeypatch.setattr(sys.modules[NAME], "SCHEDULE_INTERVAL", 0.01)
+    run = server.loop.run_until_complete
+
+    server.clients[FakeClient.sid] = FakeClient()
+    run(asyncio.sleep(0.05))
+    assert tps.servers["survival"].online
+    assert tps.format_server("survival", tps.servers["survival"]).endswith("無資料]")
+
+    del server.clients[FakeClient.sid]
+    run(asyncio.sleep(0.05))
+    assert not tps.servers["survival"].online
+    assert tps.format_server("survival", tps.servers["survival"]).endswith("離線]")
+
+    server.clients[FakeClient.sid] = FakeClient()
+    run(asyncio.sleep(0.05))
+    assert tps.servers["survival"].online
@@ -0,0 +1,66 @@
+import os
+import threading
+
+import pytest
+
+from server import BaseServer
+from server.core import FileTransfer
+from server.core.config import UserData
+from server.utils import FileChunk
+
+
+@pytest.mark.parametrize(
+    "info",
+    [
+        {"base": "../../../etc/passwd", "hash": "0" * 64},
+        {"base": "A" * 64, "hash": "0" * 64},
+        {"hash": "../" * 21 + "x"},
+    ],
+)
+def test_begin_rejects_paths_as_hashes(server: BaseServer, info: dict):
+    ctx = server.create_context("sid", UserData("survival", None))
+    info = {"id": os.urandom(16).hex(), "size": 10, "chunk_size": 10, **info}
+
+    result = server.loop.run_until_complete(server.transfers.on_begin(ctx, info))
+
+    assert "error" in result
+    assert not server.transfers.transfers
+
+
+def test_store_paths_only_for_hashes(server: BaseServer):
+    with pytest.raises(ValueError):
+        server.transfers.store.path_of("../" * 21 + "x")
+
+
+def test_hash_mismatch_counted(server: BaseServer):
+    ctx = server.create_context("sid", UserData("survival", None))
+    run, transfers = server.loop.run_until_complete, server.transfers
+    id, data = os.urandom(16), os.urandom(10)
+    info = {"id": id.hex(), "path": "file", "size": len(data), "chunk_size": 10}
+
+    assert run(transfers.on_begin(ctx, {**info, "hash": "0" * 64})) == {"next": 0}
+    assert run(transfers.on_chunk(ctx, FileChunk(id, 0, data).encode())) == {"next": 1}
+    result = run(transfers.on_end(ctx, {"id": id.hex()}))
+
+    assert result["error"].startswith("hash mismatch")
+    assert transfers.stats.corrupt_files == 1
+    assert transfers.store.get("file") is None
+
+
+def test_chunk_written_off_the_loop(server: BaseServer, monkeypatch):
+    ctx = server.create_context("sid", UserData("survival", None))
+    run, transfers = server.loop.run_until_complete, server.transfers
+    id, data = os.urandom(16), os.urandom(10)
+    info = {"id": id.hex(), "path": "file", "size": len(data), "chunk_size": 10}
+    threads = []
+    write = FileTransfer.write
+
+    def recorded(self, data: bytes) -> None:
+        threads.append(threading.current_thread())
+        write(self, data)
+
+    monkeypatch.setattr(FileTransfer, "write", recorded)
+    run(transfers.on_begin(ctx, info))
+    assert run(transfers.on_chunk(ctx, FileChunk(id, 0, data).encode())) == {"next": 1}
+
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import sqlite3
+import time
+
+from server import BaseServer
+from server.core.config import UserData
+
+NAME = "plugins.sessions"
+
+
+def visits(server: BaseServer) -> dict[str, bool]:
+    """{player: online} of the visits the plugin process wrote"""
+    with sqlite3.connect("sessions.db") as db:
+        rows = db.execute("SELECT player, left_at FROM sessions").fetchall()
+    return {player: left_at is None for player, left_at in rows}
+
+
+async def wait_until(check, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+def test_presence_in_plugin_process(server: BaseServer, caplog):
+    caplog.set_level(logging.ERROR)
+    run = server.loop.run_until_complete
+
+    ctx = server.clients["sid"] = server.create_context(
+        "sid", UserData("survival", None)
+    )
+    server.presence.clear(ctx)
+    server.presence.entry(ctx).apply(True, "Steve")
+
+    server.load_extension(NAME, process=True)
+    process = server.setups[NAME].process
+    run(wait_until(lambda: process.ready))
+
+    # seeded in `on_load` from the players sent to the new process
+    run(wait_until(lambda: visits(server) == {"Steve": True}))
+
+    async def synced():
+        # the copy in the process is updated before the event
+        server.presence.entry(ctx).apply(False, "Steve")
+        server.presence.entry(ctx).apply(True, "Alex")
+        server.dispatch("presence_synced", ctx, frozenset({"Alex"}))
+        await wait_until(lambda: visits(server) == {"Steve": False, "Alex": True})
+
+    run(synced())
+
+    assert not [i for i in caplog.records if i.levelno >= logging.ERROR]
@@ -1,12 +1,17 @@
+import aiohttp
 import discord
 from _typeshed import Incomplete
 from asyncio import AbstractEventLoop
-from discord import ApplicationContext as ApplicationContext, DiscordException as DiscordException, Message as Message, Reaction as Reaction, TextChannel as TextChannel, User as User
+from discord import ApplicationContext as ApplicationContext, Attachment as Attachment, DiscordException, Message as Message, Reaction as Reaction, TextChannel as TextChannel, User as User
 from discord.ext import commands
 from discord.ext.commands import CommandError as CommandError, Context as Context
+from pathlib import Path
 from server import Plugin
 from server.utils import FormatMessage
-from typing import Optional
+
+DOWNLOAD_CONCURRENCY: int
+DOWNLOAD_CHUNK_SIZE: Incomplete
+PROGRESS_INTERVAL: int
 
 class Bot(commands.Bot):
     __version__: str
@@ -25,10 +30,12 @@ class Bot(commands.Bot):
     async def on_application_command(self, ctx: ApplicationContext): ...
     async def on_command_error(self, ctx: Context, error: CommandError): ...
     async def on_application_command_error(self, ctx: ApplicationContext, error: DiscordException): ...
-    async def get_reference_message(self, msg: Message) -> Optional[Message]: ...
+    async def get_reference_message(self, msg: Message) -> Message | None: ...
     def style_message(self, msg: Message) -> list[FormatMessage]: ...
     async def on_message(self, msg: Message): ...
-    async def get_or_fetch_message(self, id: int, channel: TextChannel) -> Optional[Message]: ...
+    async def sync_attachments(self, msg: Message, attachments: list[Attachment]): ...
+    async def download(self, session: aiohttp.ClientSession, attachment: Attachment) -> Path: ...
+    async def get_or_fetch_message(self, id: int, channel: TextChannel) -> Message | None: ...
 
 class BaseCog(discord.Cog):
     bot: Incomplete
@@ -41,5 +48,7 @@ class BaseCog(discord.Cog):
 class BotCommand(BaseCog):
     async def stats(self, ctx: ApplicationContext, *args): ...
     async def online(self, ctx: ApplicationContext): ...
+    async def tps(self, ctx: ApplicationContext): ...
+    async def sessions(self, ctx: ApplicationContext, *args: str): ...
 
 def fix_msg(msg: str): ...
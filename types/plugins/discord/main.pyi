@@ -1,8 +1,8 @@
-from .client import Bot as Bot, fix_msg as fix_msg
+from .client import Bot as Bot, BotCommand as BotCommand, fix_msg as fix_msg
 from _typeshed import Incomplete
 from discord import TextChannel as TextChannel
-from server import BaseServer, Context, Plugin
-from server.utils import Config, FileEncode
+from server import BaseServer, Context, FileTransfer, Plugin
+from server.utils import Config, FileEncodeView, derived
 
 class DiscordConfig(Config):
     token: str
@@ -24,23 +24,44 @@ class DiscordConfig(Config):
     canned_message: dict[str, str | list[str]]
     black_canned_message_channel: dict[str, list[int]]
     black_canned_message_category: dict[str, list[int]]
+    @derived
+    def sync_extensions(self) -> tuple[str, ...]: ...
+    @derived
+    def command_channel_ids(self) -> frozenset[int]: ...
+    @derived
+    def command_parent_ids(self) -> frozenset[int]: ...
 
 class Discord(Plugin, config=DiscordConfig):
     bot: Incomplete
-    chat_channel: Incomplete
-    player_join_channel: Incomplete
-    sync_channel: Incomplete
+    chat_channel: TextChannel | None
+    player_join_channel: TextChannel | None
+    sync_channel: TextChannel | None
+    _bot_kept: bool
     def __init__(self, server: BaseServer) -> None: ...
+    _bot_handed_over: bool
+    def save_state(self) -> dict: ...
+    def load_state(self, state: dict) -> None: ...
     def on_load(self) -> None: ...
     def on_unload_before(self) -> None: ...
     async def send(self, content: str, ctx: Context | None = None, channel: TextChannel | None = ..., player_name: str = '', **kwargs) -> None: ...
+    @Plugin.listener
     async def on_server_start(self, ctx: Context): ...
+    @Plugin.listener
     async def on_server_startup(self, ctx: Context): ...
+    @Plugin.listener
     async def on_server_stop(self, ctx: Context): ...
+    @Plugin.listener
+    async def on_tps_alert(self, ctx: Context, message: str): ...
+    @Plugin.listener
     async def on_player_chat(self, ctx: Context, player_name: str, content: str): ...
     async def send_join_channel(self, content: str, ctx: Context | None = None, channel: TextChannel | None = None, **kwargs): ...
+    @Plugin.listener
     async def on_player_joined(self, ctx: Context, player_name: str): ...
+    @Plugin.listener
     async def on_player_left(self, ctx: Context, player_name: str): ...
-    async def on_file_sync(self, ctx: Context, data: FileEncode): ...
+    @Plugin.listener
+    async def on_file_sync(self, ctx: Context, data: FileEncodeView): ...
+    @Plugin.listener
+    async def on_file_transfer(self, ctx: Context, transfer: FileTransfer): ...
 
 def setup(server: BaseServer): ...
@@ -1,29 +1,45 @@
 from _typeshed import Incomplete
 from server import BaseServer, Context, Plugin
 from server.utils import Config
-from typing import overload
+from typing import Callable, NamedTuple, overload
 
-minecraft_list_match: Incomplete
 minecraft_GList_match: Incomplete
 
 class OnlineConfig(Config):
     online_enabled: bool
     query_online_names: Incomplete
+    query_timeout: int
     bungeecord_list: Incomplete
 
+class ServerOnline(NamedTuple):
+    players: set[str] | None
+    latency: float | None
+    stale: bool = ...
+
 class Online(Plugin, config=OnlineConfig):
-    _glist_rcon_catch: Incomplete
+    last_known: dict[str, set[str]]
     def __init__(self, server: BaseServer) -> None: ...
+    def save_state(self) -> dict[str, set[str]]: ...
+    def load_state(self, state: dict[str, set[str]]) -> None: ...
     @staticmethod
     def handle_minecraft(data: str) -> set[str]: ...
     @staticmethod
     def handle_bungee(data: str) -> dict[str, set[str]] | None: ...
+    @staticmethod
+    def format_server(ctx: Context, online: ServerOnline, escape: Callable[[str], str] = ...) -> str: ...
     @overload
-    async def query(self, *, order: bool = True) -> list[tuple[Context, set[str]]]: ...
+    async def query(self, *, order: bool = True) -> list[tuple[Context, ServerOnline]]: ...
     @overload
-    async def query(self, *, order: bool = False) -> dict[Context, set[str]]: ...
-    async def on_command_online(self): ...
+    async def query(self, *, order: bool = False) -> dict[Context, ServerOnline]: ...
+    @Plugin.listener
+    async def on_command_online(self) -> None: ...
+    @Plugin.listener
+    async def on_player_joined(self, ctx: Context, player_name: str): ...
+    @Plugin.listener
+    async def on_player_left(self, ctx: Context, player_name: str): ...
+    def invalidate_glist(self) -> None: ...
+    async def query_bungee(self, name: str, server: dict) -> tuple[dict[str, set[str]], float]: ...
+    async def query_client(self, client: Context) -> tuple[set[str], float] | None: ...
     async def query(self, *, order: bool = False): ...
-    def on_unload(self) -> None: ...
 
 def setup(server: BaseServer): ...
@@ -0,0 +1,84 @@
+from _typeshed import Incomplete
+from server import BaseServer, Context, Plugin
+from server.utils import Config
+from typing import Any, Iterator, NamedTuple
+
+SCHEMA: str
+UPSERT_HOUR: str
+HOUR: int
+MAX_FILL_HOURS: Incomplete
+
+class SessionsConfig(Config):
+    db_path: str
+
+class ServerSummary(NamedTuple):
+    server: str
+    peak: int
+    hours: float
+    joins: int
+    online: int
+
+class HourStats(NamedTuple):
+    hour: int
+    peak: int
+    joins: int
+    seconds: float
+
+class PlayerSession(NamedTuple):
+    server: str
+    joined_at: float
+    left_at: float | None
+
+def split_hours(start: float, end: float) -> Iterator[tuple[int, float]]: ...
+
+class SessionStore:
+    db: Incomplete
+    last_hour: dict[str, int]
+    def __init__(self, path: str) -> None: ...
+    def close(self) -> None: ...
+    def touch(self, server: str, now: float, online: int) -> None: ...
+    def join(self, server: str, player: str, now: float, online: int) -> None: ...
+    def leave(self, server: str, player: str, joined_at: float, now: float, online: int) -> None: ...
+    def close_session(self, server: str, player: str, joined_at: float, now: float) -> None: ...
+    def close_dangling(self) -> int: ...
+    def summary(self, since: float, online: dict[str, int]) -> list[tuple]: ...
+    def hourly(self, server: str, since: float, online: int) -> list[tuple]: ...
+    def player(self, player: str, since: float) -> list[tuple]: ...
+
+class Sessions(Plugin, config=SessionsConfig):
+    executor: Incomplete
+    store: Incomplete
+    online: dict[str, dict[str, float]]
+    handed_over: bool
+    def __init__(self, server: BaseServer) -> None: ...
+    def save_state(self) -> Any: ...
+    def load_state(self, state: dict[str, dict[str, float]]) -> None: ...
+    def on_load(self) -> None: ...
+    def on_unload(self) -> None: ...
+    def submit(self, func, *args: Any): ...
+    def write(self, func, *args: Any) -> None: ...
+    def join(self, server: str, player: str) -> None: ...
+    def leave(self, server: str, player: str) -> None: ...
+    def leave_all(self, server: str) -> None: ...
+    @Plugin.listener
+    async def on_player_joined(self, ctx: Context, player_name: str): ...
+    @Plugin.listener
+    async def on_player_left(self, ctx: Context, player_name: str): ...
+    @Plugin.listener
+    async def on_presence_synced(self, ctx: Context, players: frozenset[str]): ...
+    @Plugin.listener
+    async def on_server_stop(self, ctx: Context): ...
+    @Plugin.listener
+    async def on_disconnect(self, ctx: Context): ...
+    def open_seconds(self, server: str, since: float) -> Iterator[tuple[int, float]]: ...
+    async def summary(self, hours: int = 24) -> list[ServerSummary]: ...
+    async def hourly(self, server: str, hours: int = 24) -> list[HourStats]: ...
+    async def player(self, player: str, days: int = 7) -> list[PlayerSession]: ...
+    @staticmethod
+    def format_time(timestamp: float | None) -> str: ...
+    @staticmethod
+    def format_duration(seconds: float) -> str: ...
+    @Plugin.listener
+    async def on_command_sessions(self, name: str = ..., arg: str = ..., number: str = ...): ...
+
+def setup(server: BaseServer): ...
@@ -1,16 +1,69 @@
+import asyncio
+import re
 from _typeshed import Incomplete
-from server import BaseServer, Plugin
+from collections import deque
+from server import BaseServer, Context, Plugin
 from server.utils import Config
+from typing import Callable, NamedTuple
 
-minecraft_list_match: Incomplete
-minecraft_GList_match: Incomplete
+PROBE_TIMEOUT: int
+SCHEDULE_INTERVAL: int
+SPARK: str
+color_match: Incomplete
 
-class OnlineConfig(Config):
-    online_enabled: bool
-    query_online_names: Incomplete
-    bungeecord_list: Incomplete
+class TpsConfig(Config):
+    poll_interval_min: int
+    poll_interval_max: int
+    samples: int
+    alert_mspt: float
+    alert_tps: float
+    alert_samples: int
+    alert_cooldown: int
+    probes: Incomplete
 
-class Tps(Plugin, config=OnlineConfig):
+class TickSample(NamedTuple):
+    time: float
+    tps: float
+    mspt: float | None
+
+class ServerTicks:
+    samples: deque[TickSample]
+    interval: Incomplete
+    next_poll: float
+    polling: bool
+    online: bool
+    probe: int | None
+    bad: int
+    alerted: bool
+    last_alert: float | None
+    def __init__(self, size: int, interval: float) -> None: ...
+
+class Probe(NamedTuple):
+    command: str
+    tps: re.Pattern | None
+    mspt: re.Pattern | None
+    def parse(self, data: str) -> tuple[float, float | None] | None: ...
+
+class Tps(Plugin, config=TpsConfig):
+    servers: dict[str, ServerTicks]
+    probes: Incomplete
+    task: asyncio.Task | None
     def __init__(self, server: BaseServer) -> None: ...
+    def save_state(self) -> dict[str, ServerTicks]: ...
+    def load_state(self, state: dict[str, ServerTicks]) -> None: ...
+    def on_load(self) -> None: ...
+    def on_unload(self) -> None: ...
+    async def schedule(self) -> None: ...
+    async def poll(self, ctx: Context, ticks: ServerTicks) -> None: ...
+    async def probe(self, ctx: Context, ticks: ServerTicks) -> TickSample | None: ...
+    def healthy(self, sample: TickSample) -> bool: ...
+    async def check_alert(self, ctx: Context, ticks: ServerTicks, sample: TickSample) -> None: ...
+    @staticmethod
+    def format_sample(sample: TickSample) -> str: ...
+    @staticmethod
+    def sparkline(samples: deque[TickSample], width: int = 30) -> str: ...
+    def format_server(self, name: str, ticks: ServerTicks, escape: Callable[[str], str] = ...) -> str: ...
+    @Plugin.listener
+    async def on_command_tps(self) -> None: ...
 
 def setup(server: BaseServer): ...
@@ -7,10 +7,17 @@ from _typeshed import Incomplete
 log: Incomplete
 
 class BasePlugin_Commands(BasePlugin, description='指令處理'):
+    @Plugin.listener
     async def on_command_plugin_list(self) -> None: ...
+    @Plugin.listener
     async def on_command_plugin_remove(self, name: str = ...): ...
+    @Plugin.listener
     async def on_command_plugin_add(self, name: str = ...): ...
+    @Plugin.listener
     async def on_command_plugin_reload(self, name: str = ...): ...
+    @Plugin.listener
+    async def on_command_plugin_stats(self, name: str = ...): ...
+    @Plugin.listener
     async def on_command_send_all(self, message: str = ...): ...
 
 def setup(server: BaseServer): ...
@@ -1,7 +1,8 @@
 from . import BaseServer
 from .core.config import UserData
 from _typeshed import Incomplete
-from typing import Any, Callable, List, Optional, Union
+from asyncio import Future
+from typing import Any, Callable
 
 __all__ = ['Context']
 
@@ -11,16 +12,18 @@ class Context:
     log: Incomplete
     user: Incomplete
     auth: Incomplete
-    _extra_command_wait: Incomplete
-    rcon: Incomplete
+    _extra_command_wait: dict[str, list[Future[dict]]]
+    rcon_target: tuple[str | None, int | None, str | None] | None
     def __init__(self, server: BaseServer, sid: str, user: UserData, auth: dict = {}) -> None: ...
     async def _cmd_callback_callback(self, ctx: Context, result: dict) -> None: ...
     async def extra_command(self, command: str, *, timeout: float | None = None) -> dict: ...
-    async def emit(self, event: str, *data: Optional[Any], to: Optional[str] = ..., room: Optional[str] = None, skip_sid: Optional[Union[List[str], str]] = None, namespace: Optional[str] = None, callback: Optional[Callable[..., Any]] = None, **kwargs: Any) -> None: ...
-    async def disconnect(self, *, sid: str = ..., namespace: Optional[str] = None, ignore_queue: bool = False) -> None: ...
+    async def emit(self, event: str, *data: Any | None, to: str | None = ..., room: str | None = None, skip_sid: list[str] | str | None = None, namespace: str | None = None, callback: Callable[..., Any] | None = None, **kwargs: Any) -> None: ...
+    async def disconnect(self, *, sid: str = ..., namespace: str | None = None, ignore_queue: bool = False) -> None: ...
     @property
     def display_name(self) -> str: ...
     async def execute_command(self, command: str, exc_timeout: bool = True): ...
+    async def query_command(self, command: str, exc_timeout: bool = True, *, ttl: float | None = None): ...
+    def invalidate_queries(self) -> None: ...
     @property
     def name(self) -> str: ...
     def __del__(self) -> None: ...
@@ -1,8 +1,9 @@
 import json
 import yaml
+from ..utils.schema import ConfigRecord
 from _typeshed import Incomplete
 from pathlib import Path
-from typing import Any, Dict, Generic, Literal, NamedTuple, Optional, TypeVar, Union
+from typing import Any, Generic, Literal, NamedTuple, TypeVar
 
 __all__ = ['Config', 'ConfigType']
 
@@ -11,28 +12,41 @@ _T = TypeVar('_T')
 
 class UserAuth(NamedTuple):
     password: str
-    display_name: Optional[str]
+    display_name: str | None = ...
 
 class UserData(NamedTuple):
     name: str
-    display_name: Optional[str]
+    display_name: str | None
 
 class ConfigType(NamedTuple):
     stop_plugins: list[str] = ...
-    users: Dict[str, UserAuth] = ...
+    lazy_plugins: dict[str, list[str]] = ...
+    process_plugins: list[str] = ...
+    trace_plugin_memory: bool = ...
+    users: dict[str, UserAuth] = ...
     plugins_path: str = ...
-    port: str = ...
+    file_store_path: str = ...
+    file_store_max_size: int = ...
+    rcon_max_connections: int = ...
+    rcon_idle_timeout: int = ...
+    rcon_query_ttl: dict[str, float] = ...
+    presence_reconcile_interval: int = ...
+    port: int = ...
+    host: str = ...
 
 class Config(Generic[_RT]):
     directory: Incomplete
     config_type: Incomplete
     filepath: Incomplete
     default_config: Incomplete
-    def __init__(self, config_name: str, config_path: Union[str, Path, None] = None, config_type: Union[Literal['json'], Literal['yaml']] = 'json', default_config: Optional[_RT] = None) -> None: ...
+    schema: Incomplete
+    options: ConfigRecord
+    def __init__(self, config_name: str, config_path: str | Path | None = None, config_type: Literal['json'] | Literal['yaml'] = 'json', default_config: _RT | None = None) -> None: ...
     def check_config(self, replay: bool = False) -> None: ...
     def read_config(self) -> dict: ...
+    def compile(self) -> ConfigRecord: ...
     def write(self, data: _RT) -> None: ...
-    def get(self, key: str, default: Optional[_T] = None) -> _T: ...
+    def get(self, key: str, default: _T | None = None) -> _T: ...
     def set(self, key: str, value: Any) -> None: ...
     def append(self, key: str, value: Any, *, only_one: bool = False) -> None: ...
     def remove(self, key: str, value: Any) -> None: ...
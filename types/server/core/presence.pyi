@@ -0,0 +1,43 @@
+import asyncio
+from ..context import Context
+from .server import BaseServer
+from _typeshed import Incomplete
+from typing import NamedTuple
+
+__all__ = ['PresenceTracker', 'Presence', 'parse_player_list']
+
+def parse_player_list(data: str) -> set[str] | None: ...
+
+class Presence(NamedTuple):
+    players: frozenset[str]
+    complete: bool
+    updated: float
+
+class PresenceEntry:
+    sid: Incomplete
+    players: set[str]
+    complete: bool
+    updated: Incomplete
+    journal: list[tuple[bool, str]] | None
+    def __init__(self, sid: str) -> None: ...
+    def apply(self, joined: bool, player: str) -> None: ...
+
+class PresenceTracker:
+    server: Incomplete
+    reconcile_interval: Incomplete
+    entries: dict[str, PresenceEntry]
+    reconcile_task: asyncio.Task | None
+    def __init__(self, server: BaseServer, *, reconcile_interval: float = 300) -> None: ...
+    def get(self, name: str) -> Presence | None: ...
+    def snapshot(self) -> dict[str, Presence]: ...
+    def entry(self, ctx: Context) -> PresenceEntry: ...
+    async def sync(self, ctx: Context) -> bool: ...
+    async def reconcile(self) -> None: ...
+    def close(self) -> None: ...
+    async def on_connect(self, ctx: Context, auth: dict) -> None: ...
+    async def on_disconnect(self, ctx: Context) -> None: ...
+    def clear(self, ctx: Context) -> None: ...
+    async def on_server_startup(self, ctx: Context) -> None: ...
+    async def on_server_stop(self, ctx: Context) -> None: ...
+    async def on_player_joined(self, ctx: Context, player_name: str) -> None: ...
+    async def on_player_left(self, ctx: Context, player_name: str) -> None: ...
@@ -0,0 +1,46 @@
+import asyncio
+from ..utils import RconClient, RconPacketData
+from _typeshed import Incomplete
+from asyncio import AbstractEventLoop
+from typing import Iterable, NamedTuple
+
+__all__ = ['RconKey', 'RconPool']
+
+class RconKey(NamedTuple):
+    host: str
+    port: int
+    password: str
+    @classmethod
+    def create(cls, host: str | None, port: int | str | None, password: str | None) -> RconKey: ...
+    def __str__(self) -> str: ...
+
+class RconTarget:
+    key: Incomplete
+    clients: list[RconClient]
+    busy: dict[RconClient, int]
+    last_used: dict[RconClient, float]
+    failures: int
+    retry_at: float
+    lock: Incomplete
+    def __init__(self, key: RconKey) -> None: ...
+    def add(self, client: RconClient) -> None: ...
+    def drop(self, client: RconClient) -> None: ...
+    def least_busy(self) -> RconClient | None: ...
+
+class RconPool:
+    loop: Incomplete
+    max_connections: Incomplete
+    idle_timeout: Incomplete
+    targets: dict[RconKey, RconTarget]
+    health_task: asyncio.Task | None
+    query_ttl: Incomplete
+    cache: dict[tuple[RconKey, str], tuple[float, RconPacketData]]
+    inflight: dict[tuple[RconKey, str], asyncio.Task]
+    def __init__(self, loop: AbstractEventLoop, *, max_connections: int = 2, idle_timeout: float = 600, query_ttl: dict[str, float] | None = None) -> None: ...
+    async def execute(self, host: str | None, port: int | str | None, password: str | None, command: str, *, timeout: float | None = None) -> RconPacketData: ...
+    async def query(self, host: str | None, port: int | str | None, password: str | None, command: str, *, ttl: float | None = None, timeout: float | None = None) -> RconPacketData: ...
+    async def _query(self, key: tuple[RconKey, str], ttl: float, timeout: float | None) -> RconPacketData: ...
+    def invalidate(self, host: str | None, port: int | str | None, password: str | None, commands: Iterable[str] | None = None) -> None: ...
+    async def acquire(self, target: RconTarget) -> RconClient: ...
+    async def check_health(self) -> None: ...
+    def close(self) -> None: ...
@@ -2,21 +2,35 @@ from ..context import Context
 from ..plugin import PluginMixin, SoloSetup
 from ..utils import FormatMessage
 from .config import UserData
+from .presence import PresenceTracker
+from .rcon import RconPool
+from .transfer import TransferManager
 from _typeshed import Incomplete
 from aiohttp import web
 from asyncio import AbstractEventLoop
+from collections import deque
 from pathlib import Path
-from typing import Any, Callable, Coroutine, List, Optional, TypeVar, Union
+from typing import Any, Callable, Coroutine, NamedTuple, TypeVar
 
 __all__ = ['BaseServer']
 
 CoroFunc = Callable[..., Coroutine[Any, Any, Any]]
 CoroFuncT = TypeVar('CoroFuncT', bound=CoroFunc)
 
+class BufferedEvent(NamedTuple):
+    name: str
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+    pending: set[str]
+
 class BaseServer(PluginMixin):
     loop: Incomplete
-    extra_events: Incomplete
-    clients: Incomplete
+    extra_events: dict[str, list[CoroFunc]]
+    event_buffer: deque[BufferedEvent]
+    lazy_extensions: dict[str, list[Path]]
+    paused_setups: set[str]
+    plugin_stats: Incomplete
+    clients: dict[str, Context]
     sio_server: Incomplete
     app: Incomplete
     command_manager: Incomplete
@@ -24,11 +38,15 @@ class BaseServer(PluginMixin):
     console: Incomplete
     config: Incomplete
     plugins_dir: Incomplete
+    transfers: TransferManager
+    rcon: RconPool
+    presence: PresenceTracker
     def __init__(self, config_type: str = 'yaml', loop: AbstractEventLoop | None = None) -> None: ...
     def add_listener(self, func: CoroFunc, name: str = ...) -> None: ...
     def remove_listener(self, func: CoroFunc, name: str = ...) -> None: ...
     def listen(self, name: str = ...) -> Callable[[CoroFuncT], CoroFuncT]: ...
     def dispatch(self, event_name: str, *args: Any, **kwargs: Any) -> None: ...
+    def _is_paused(self, func: CoroFunc) -> bool: ...
     async def _run_event(self, coro: Callable[..., Coroutine[Any, Any, Any]], event_name: str, *args: Any, **kwargs: Any) -> None: ...
     def __get_args_len(self, coro: Callable[..., Any]) -> int: ...
     def _schedule_event(self, coro: Callable[..., Coroutine[Any, Any, Any]], event_name: str, *args: Any, **kwargs: Any): ...
@@ -41,10 +59,16 @@ class BaseServer(PluginMixin):
     def create_context(self, sid: str, user: UserData, auth: dict = {}) -> Context: ...
     async def start(self) -> web.AppRunner: ...
     async def __on_shutdown(self, app: web.Application): ...
-    def check_user(self, name: str, password: str) -> Optional[UserData]: ...
-    def get_client(self, name: str) -> Optional[Context]: ...
-    async def emit(self, event: str, *data: Optional[Any], to: Optional[str] = None, room: Optional[str] = None, skip_sid: Optional[Union[List[str], str]] = None, namespace: Optional[str] = None, callback: Optional[Callable[..., Any]] = None, **kwargs: Any) -> None: ...
-    async def send(self, msg: Union[str, FormatMessage, Any], server_name: str = None, to: Optional[str] = None, room: Optional[str] = None, skip_sid: Optional[Union[List[str], str]] = None, namespace: Optional[str] = None, callback: Optional[Callable[..., Any]] = None, format: Optional[bool] = True, no_mark: bool = False, **kwargs: Any): ...
-    def load_extension(self, name: str | Path | SoloSetup) -> None: ...
+    def check_user(self, name: str, password: str) -> UserData | None: ...
+    def get_client(self, name: str) -> Context | None: ...
+    async def publish_file(self, name: str, data: bytes | memoryview, *, server_name: str | None = None, skip_sid: str | None = None) -> None: ...
+    async def publish_path(self, name: str, path: str | Path, *, server_name: str | None = None, skip_sid: str | None = None) -> None: ...
+    async def emit(self, event: str, *data: Any | None, to: str | None = None, room: str | None = None, skip_sid: list[str] | str | None = None, namespace: str | None = None, callback: Callable[..., Any] | None = None, **kwargs: Any) -> None: ...
+    async def send(self, msg: str | FormatMessage | Any, server_name: str = None, to: str | None = None, room: str | None = None, skip_sid: list[str] | str | None = None, namespace: str | None = None, callback: Callable[..., Any] | None = None, format: bool | None = True, no_mark: bool = False, **kwargs: Any): ...
+    def add_lazy_extension(self, path: Path, events: list[str]) -> None: ...
+    def load_lazy_extension(self, path: Path) -> None: ...
+    def _on_setup_done(self, setup: SoloSetup, loaded: bool) -> None: ...
+    def load_extension(self, name: str | Path | SoloSetup, *, process: bool = False) -> None: ...
     def unload_extension(self, name: str | Path | SoloSetup) -> None: ...
     def reload_extension(self, name: str | Path | SoloSetup) -> None: ...
+    async def hot_reload_extension(self, name: str | Path | SoloSetup, *, keep_state: bool = True) -> SoloSetup: ...
@@ -0,0 +1,38 @@
+from _typeshed import Incomplete
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+__all__ = ['StoredFile', 'FileStore', 'is_hash']
+
+def is_hash(value: object) -> bool: ...
+
+class StoredFile(NamedTuple):
+    name: str
+    hash: str
+    size: int
+    server_name: str | None
+    time: float
+    def info(self) -> dict: ...
+
+class FileStore:
+    directory: Incomplete
+    max_size: Incomplete
+    index_path: Incomplete
+    entries: OrderedDict[str, StoredFile]
+    def __init__(self, directory: str | Path, max_size: int) -> None: ...
+    def __len__(self) -> int: ...
+    def __iter__(self) -> Iterator[StoredFile]: ...
+    @property
+    def total_size(self) -> int: ...
+    def path_of(self, file_hash: str) -> Path: ...
+    def get(self, name: str) -> StoredFile | None: ...
+    def write_file(self, src: str | Path, file_hash: str) -> Path: ...
+    def import_file(self, src: str | Path) -> tuple[str, int]: ...
+    def write_data(self, data: bytes | memoryview) -> str: ...
+    def add(self, name: str, file_hash: str, size: int, *, server_name: str | None = None) -> StoredFile: ...
+    def remove(self, name: str) -> None: ...
+    def evict(self) -> None: ...
+    def __remove_object(self, file_hash: str) -> bool: ...
+    def load(self) -> None: ...
+    def save(self) -> None: ...
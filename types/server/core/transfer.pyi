@@ -0,0 +1,93 @@
+import asyncio
+from ..context import Context
+from .server import BaseServer
+from .store import FileStore, StoredFile
+from _typeshed import Incomplete
+from asyncio import TimerHandle
+from pathlib import Path
+from socketio import AsyncServer
+from typing import Any, BinaryIO
+
+__all__ = ['FileTransfer', 'TransferStats', 'TransferManager']
+
+class FileTransfer:
+    id: Incomplete
+    path: Incomplete
+    size: Incomplete
+    chunk_size: Incomplete
+    flag: Incomplete
+    hash: Incomplete
+    base: Incomplete
+    body_size: Incomplete
+    sender: Incomplete
+    server_name: Incomplete
+    announce: Incomplete
+    received: int
+    finished: bool
+    fetched: set[str]
+    skipped: set[str]
+    lock: Incomplete
+    expire_handle: TimerHandle | None
+    reader: BinaryIO | None
+    read_lock: Incomplete
+    sending: dict[str, asyncio.Task]
+    owns_spool: Incomplete
+    spool: BinaryIO | None
+    digest: Incomplete
+    def __init__(self, id: str, path: str, size: int, chunk_size: int, *, flag: int = 0, hash: str | None = None, sender: str, server_name: str, body_size: int | None = None, base: str | None = None, source_path: Path | None = None, owns_source: bool = False, announce: bool = True) -> None: ...
+    @property
+    def chunks(self) -> int: ...
+    def chunk_length(self, index: int) -> int: ...
+    def info(self) -> dict[str, Any]: ...
+    def write(self, data: bytes) -> None: ...
+    def read_chunk(self, index: int) -> bytes: ...
+    def open(self) -> BinaryIO: ...
+    def close(self) -> None: ...
+    def __getstate__(self) -> dict[str, Any]: ...
+    def __str__(self) -> str: ...
+    __repr__ = __str__
+
+class TransferStats:
+    __slots__: Incomplete
+    hits: int
+    misses: int
+    saved_bytes: int
+    deltas: int
+    delta_saved_bytes: int
+    corrupt_packets: int
+    corrupt_files: int
+    def __init__(self) -> None: ...
+    @property
+    def hit_rate(self) -> float: ...
+    def __str__(self) -> str: ...
+    __repr__ = __str__
+
+class TransferManager:
+    server: Incomplete
+    store: Incomplete
+    transfers: dict[str, FileTransfer]
+    stats: Incomplete
+    def __init__(self, server: BaseServer, store: FileStore) -> None: ...
+    def attach(self, sio_server: AsyncServer) -> None: ...
+    def __wrap(self, handler): ...
+    def get(self, id: str) -> FileTransfer | None: ...
+    def touch(self, transfer: FileTransfer) -> None: ...
+    def remove(self, id: str) -> None: ...
+    def close(self) -> None: ...
+    async def on_begin(self, ctx: Context, info: dict) -> dict[str, Any]: ...
+    async def on_chunk(self, ctx: Context, raw_data: bytes) -> dict[str, Any]: ...
+    async def on_end(self, ctx: Context, info: dict) -> dict[str, Any]: ...
+    def __apply_delta(self, transfer: FileTransfer) -> str: ...
+    async def publish(self, name: str, data: bytes | memoryview, *, server_name: str | None = None, skip_sid: str | None = None) -> StoredFile: ...
+    async def publish_path(self, name: str, path: str | Path, *, server_name: str | None = None, skip_sid: str | None = None) -> StoredFile: ...
+    async def on_store_list(self, ctx: Context, info: Any) -> dict[str, Any]: ...
+    async def on_manifest(self, ctx: Context, info: Any) -> dict[str, Any]: ...
+    async def on_signature(self, ctx: Context, info: dict) -> dict[str, Any]: ...
+    async def on_pull(self, ctx: Context, info: dict) -> dict[str, Any]: ...
+    @staticmethod
+    def __write_delta(path: Path, signature: bytes) -> tuple[Path, int] | None: ...
+    async def on_resume(self, ctx: Context, info: dict) -> dict[str, Any]: ...
+    @staticmethod
+    def __on_send_done(transfer: FileTransfer, sid: str, task: asyncio.Task) -> None: ...
+    async def on_skip(self, ctx: Context, info: dict) -> dict[str, Any]: ...
+    async def __send(self, ctx: Context, transfer: FileTransfer, start: int, until: int) -> None: ...
@@ -1,9 +1,10 @@
-from typing import Any, Optional
+from _typeshed import Incomplete
+from typing import Any
 
 class ChatBridgeEError(Exception): ...
 
 class ExtensionError(ChatBridgeEError):
-    def __init__(self, msg: Optional[str] = None, *args: Any) -> None: ...
+    def __init__(self, msg: str | None = None, *args: Any) -> None: ...
 
 class ExtensionNotFound(ExtensionError):
     def __init__(self, name: str) -> None: ...
@@ -13,3 +14,9 @@ class NoEntryPointError(ExtensionError):
 
 class ExtensionAlreadyLoaded(ExtensionError):
     def __init__(self, name: str) -> None: ...
+
+class ConfigError(ChatBridgeEError):
+    key: Incomplete
+    reason: Incomplete
+    source: Incomplete
+    def __init__(self, key: str, reason: str, *, source: Any = None) -> None: ...
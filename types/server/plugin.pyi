@@ -1,11 +1,12 @@
 from .core.server import BaseServer, CoroFuncT
 from .utils.config import Config
 from _typeshed import Incomplete
+from asyncio import AbstractEventLoop, Task
 from enum import Enum
 from importlib.machinery import ModuleSpec
 from pathlib import Path
 from types import ModuleType
-from typing import Any, Callable, ClassVar, Optional, Type, TypeVar
+from typing import Any, Callable, ClassVar, TypeVar
 
 __all__ = ['Plugin', 'PluginMixin']
 
@@ -21,52 +22,74 @@ class Plugin(metaclass=PluginMeta):
     __plugin_name__: ClassVar[str]
     __plugin_description__: ClassVar[str]
     __plugin_events__: ClassVar[dict[str, list[str]]]
-    __plugin_config__: ClassVar[Optional[Type[Config]]]
+    __plugin_config__: ClassVar[type[Config] | None]
     server: Incomplete
     loop: Incomplete
     server_config: Incomplete
     log: Incomplete
     console: Incomplete
-    config: Incomplete
+    config: Config
     def __init__(self, server: BaseServer) -> None: ...
-    def _inject(self, server: BaseServer) -> T: ...
+    def _inject(self, server: BaseServer, state: Any = ...) -> T: ...
     def _eject(self, server: BaseServer) -> None: ...
     def on_load(self) -> None: ...
     def on_unload(self) -> None: ...
     def on_unload_before(self) -> None: ...
+    def save_state(self) -> Any: ...
+    def load_state(self, state: Any) -> None: ...
     @classmethod
     def listener(cls, name: str | CoroFuncT = ...) -> Callable[[CoroFuncT], CoroFuncT]: ...
 
 class PluginMixin:
-    __plugins: Incomplete
-    __setup: Incomplete
+    loop: AbstractEventLoop
+    __plugins: dict[str, Plugin]
+    __setup: dict[str, SoloSetup]
+    __loading: dict[str, SoloSetup]
+    reload_states: dict[str, Any]
     def __init__(self) -> None: ...
     @property
     def plugins(self) -> dict[str, Plugin]: ...
     def add_plugin(self, plugin: Plugin, *, override: bool = False) -> None: ...
-    def get_plugin(self, name: str) -> Optional[Plugin]: ...
-    def remove_plugin(self, name: str) -> Optional[Plugin]: ...
-    def load_extension(self, name: str | Path | SoloSetup) -> None: ...
+    def get_plugin(self, name: str) -> Plugin | None: ...
+    def remove_plugin(self, name: str) -> Plugin | None: ...
+    def load_extension(self, name: str | Path | SoloSetup, *, process: bool = False) -> None: ...
     def unload_extension(self, name: str | Path | SoloSetup) -> None: ...
     def setup_from_name(self, name: str | Path | SoloSetup) -> SoloSetup: ...
+    def _find_setup_name(self, setup: SoloSetup) -> str | None: ...
     def load_from_setup(self, setup: SoloSetup) -> None: ...
+    def load_extension_background(self, name: str | Path | SoloSetup) -> Task[SoloSetup]: ...
+    async def __load_background(self, setup: SoloSetup) -> SoloSetup: ...
+    def _on_setup_done(self, setup: SoloSetup, loaded: bool) -> None: ...
     @property
     def setups(self): ...
+    @property
+    def loading_setups(self) -> dict[str, SoloSetup]: ...
 
 class SoloSetupType(Enum):
-    FILE: Incomplete
-    MODULE: Incomplete
+    FILE = ...
+    MODULE = ...
 
 class SoloSetup:
     setup: Callable[[BaseServer], None] | None
     teardown: Callable[[BaseServer], None] | None
+    isolated: bool
     raw_name: Incomplete
     type: Incomplete
+    spec: ModuleSpec | None
+    import_time: float
     def __init__(self, name: Path | str, type: SoloSetupType = ...) -> None: ...
-    def _resolve_name(self, name: str, package: Optional[str] = None) -> str: ...
+    @property
+    def load_time(self) -> float: ...
+    def _resolve_name(self, name: str, package: str | None = None) -> str: ...
     def _module_from_spec(self, spec: ModuleSpec, name: str): ...
     def _setup_module(self, module: ModuleType) -> None: ...
+    def _find_spec(self, name: str) -> ModuleSpec | None: ...
     name: Incomplete
+    def resolve(self) -> ModuleSpec: ...
     def setup_func(self) -> None: ...
+    def import_module(self) -> None: ...
+    setup_time: Incomplete
+    def run_setup(self, server: BaseServer) -> None: ...
     def load(self, server: BaseServer) -> None: ...
     def unload(self, server: BaseServer) -> None: ...
+    def remove_modules(self) -> None: ...
@@ -1,11 +1,14 @@
 from . import BaseServer, Context
-from .utils import FileEncode
+from .utils import FileEncodeView
 from asyncio import AbstractEventLoop
+from pathlib import Path
 
 __all__ = ['Server']
 
 class Server(BaseServer):
     def __init__(self, loop: AbstractEventLoop | None = None) -> None: ...
+    async def load_plugins(self, path: Path) -> None: ...
+    def log_load_report(self) -> None: ...
     async def on_ping(self, ctx: Context): ...
     async def on_connect(self, ctx: Context, auth): ...
     async def on_disconnect(self, ctx: Context): ...
@@ -15,4 +18,4 @@ class Server(BaseServer):
     async def on_player_chat(self, ctx: Context, player_name: str, content: str): ...
     async def on_player_joined(self, ctx: Context, player_name: str): ...
     async def on_player_left(self, ctx: Context, player_name: str): ...
-    async def on_file_sync(self, ctx: Context, data: FileEncode): ...
+    async def on_file_sync(self, ctx: Context, data: FileEncodeView): ...
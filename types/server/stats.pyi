@@ -0,0 +1,38 @@
+import asyncio
+from .plugin import Plugin
+from _typeshed import Incomplete
+from asyncio import AbstractEventLoop
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+__all__ = ['PluginStats', 'PluginStatsCollector', 'current_plugin']
+
+current_plugin: ContextVar[str | None]
+
+class PluginStats:
+    __slots__: Incomplete
+    name: Incomplete
+    calls: int
+    total_time: float
+    max_time: float
+    live_tasks: int
+    errors: int
+    last_error: str | None
+    memory: int | None
+    def __init__(self, name: str) -> None: ...
+    @property
+    def average_time(self) -> float: ...
+    def to_dict(self) -> dict[str, Any]: ...
+    def __repr__(self) -> str: ...
+
+class PluginStatsCollector:
+    stats: dict[str, PluginStats]
+    def __init__(self) -> None: ...
+    def __iter__(self) -> Iterator[PluginStats]: ...
+    def get(self, name: str) -> PluginStats: ...
+    def remove(self, name: str) -> None: ...
+    @staticmethod
+    def owner_of(func: Callable[..., Any]) -> str | None: ...
+    def track_task(self, task: asyncio.Task, name: str) -> None: ...
+    def install(self, loop: AbstractEventLoop) -> None: ...
+    def sample_memory(self, plugins: dict[str, 'Plugin']) -> dict[str, int]: ...
@@ -0,0 +1,19 @@
+from _typeshed import Incomplete
+from typing import NamedTuple
+
+__all__ = ['MIN_FILE_SIZE', 'MAX_FILE_SIZE', 'DeltaError', 'make_signature', 'make_delta', 'apply_delta']
+
+MIN_FILE_SIZE: Incomplete
+MAX_FILE_SIZE: Incomplete
+
+class DeltaError(Exception): ...
+
+class Content(NamedTuple):
+    mode: int
+    data: bytes
+    header: bytes = ...
+    level: int = ...
+
+def make_signature(raw: bytes) -> bytes: ...
+def make_delta(raw: bytes, signature: bytes) -> bytes | None: ...
+def apply_delta(base: bytes, delta: bytes) -> bytes: ...
@@ -1,15 +1,23 @@
 from _typeshed import Incomplete
-from asyncio import AbstractEventLoop, Protocol
+from asyncio import AbstractEventLoop, BaseTransport, Future, Protocol
+from collections import deque
 from enum import Enum
 from typing import TypeVar, TypedDict
 
 T = TypeVar('T', bound='RconClientProtocol')
 log: Incomplete
+PACKET_SIZE: Incomplete
+PACKET_HEADER: Incomplete
+MIN_PACKET_SIZE: int
+MAX_PACKET_SIZE: Incomplete
+MAX_PACKET_ID: Incomplete
+LOGIN_FAILED_ID: int
 
 class RconPacketType(Enum):
-    COMMAND_RESPONSE: int
-    COMMAND_EXECUTE: int
-    LOGIN: int
+    COMMAND_RESPONSE = 0
+    COMMAND_EXECUTE = 2
+    AUTH_RESPONSE = 2
+    LOGIN = 3
 
 class RconPacketData(TypedDict):
     id: int
@@ -18,39 +26,66 @@ class RconPacketData(TypedDict):
 
 class ReconException(Exception): ...
 class LoginError(ReconException): ...
+class RconConnectionError(ReconException): ...
 
 class ConnectState(Enum):
-    CONNECTING: Incomplete
-    CONNECTED: Incomplete
-    AUTHENTICATED: Incomplete
-    CLOSED: Incomplete
+    CONNECTING = ...
+    CONNECTED = ...
+    AUTHENTICATED = ...
+    CLOSED = ...
+
+class RconRequest:
+    __slots__: Incomplete
+    future: Incomplete
+    response_type: Incomplete
+    sentinel_id: int | None
+    sentinel: tuple[int, bytes] | None
+    fragments: list[bytes]
+    def __init__(self, future: Future[RconPacketData], response_type: int | None = None) -> None: ...
+    def resolve(self, packet_id: int, packet_type: int, body: bytes) -> None: ...
 
 class RconClientProtocol(Protocol):
     state: Incomplete
-    _transport: Incomplete
+    _transport: BaseTransport | None
     _loop: Incomplete
-    _wait_read: Incomplete
-    _lock: Incomplete
     timeout: Incomplete
-    def __init__(self, loop: AbstractEventLoop | None = None, command_timeout: int = 30) -> None: ...
+    pipeline: Incomplete
+    _buffer: Incomplete
+    _last_id: int
+    _requests: dict[int, RconRequest]
+    _sentinels: dict[int, int]
+    _queue: deque[tuple[int, bytes]]
+    _unanswered: int | None
+    _order: deque[int]
+    def __init__(self, loop: AbstractEventLoop | None = None, command_timeout: int = 30, *, pipeline: bool = False) -> None: ...
     def __call__(self) -> T: ...
     def connection_made(self, transport) -> None: ...
     def data_received(self, data) -> None: ...
+    def packet_received(self, packet_id: int, packet_type: int, body: bytes) -> None: ...
+    def _complete(self, command_id: int) -> None: ...
     def connection_lost(self, exc) -> None: ...
     def close(self) -> None: ...
     def is_connected(self) -> bool: ...
+    def _new_id(self) -> int: ...
+    def _flush(self) -> None: ...
+    def _forget(self, request_id: int) -> None: ...
     async def _send(self, type: RconPacketType, data: str) -> RconPacketData: ...
+    @staticmethod
+    def _packet(packet_id: int, type: RconPacketType, data: str) -> bytes: ...
     password: Incomplete
     async def authenticate(self, password: str) -> None: ...
     async def execute(self, command: str, *, timeout: float | None = None) -> RconPacketData: ...
+    async def ping(self, *, timeout: float | None = None) -> None: ...
 
 class RconClient:
     host: Incomplete
     port: Incomplete
     password: Incomplete
     loop: Incomplete
+    pipeline: Incomplete
     protocol: Incomplete
-    def __init__(self, host: str | None = None, port: int | str | None = None, password: str | None = None, loop: AbstractEventLoop | None = None, protocol: Protocol | None = None) -> None: ...
+    _connect_lock: Incomplete
+    def __init__(self, host: str | None = None, port: int | str | None = None, password: str | None = None, loop: AbstractEventLoop | None = None, protocol: Protocol | None = None, *, pipeline: bool = False) -> None: ...
     @property
     def is_connected(self): ...
     async def connect(self, *, exception: bool = False) -> None: ...
@@ -58,3 +93,4 @@ class RconClient:
     def disconnect(self) -> None: ...
     async def __aexit__(self, type, value, trace) -> None: ...
     def execute(self, command: str, *, timeout: float | None = None): ...
+    def ping(self, *, timeout: float | None = None): ...
@@ -0,0 +1,32 @@
+import asyncio
+from _typeshed import Incomplete
+from asyncio import StreamReader, StreamWriter
+from typing import Callable, Iterable
+
+__all__ = ['MockRconServer']
+
+class MockRconServer:
+    password: Incomplete
+    host: Incomplete
+    port: Incomplete
+    players: Incomplete
+    handler: Incomplete
+    latency: Incomplete
+    split: Incomplete
+    fragment: Incomplete
+    vanilla: Incomplete
+    commands: list[str]
+    connections: int
+    server: asyncio.AbstractServer | None
+    writers: set[StreamWriter]
+    tasks: set[asyncio.Task]
+    def __init__(self, password: str = '', *, host: str = '127.0.0.1', port: int = 0, players: Iterable[str] = (), handler: Callable[[str], str | None] | None = None, latency: float = 0, split: int = ..., fragment: int | None = None, vanilla: bool = True) -> None: ...
+    async def start(self) -> None: ...
+    async def close(self) -> None: ...
+    def drop_connections(self) -> None: ...
+    async def __aenter__(self) -> MockRconServer: ...
+    async def __aexit__(self, type, value, trace) -> None: ...
+    def respond(self, command: str) -> str: ...
+    async def read_packets(self, reader: StreamReader): ...
+    async def serve(self, reader: StreamReader, writer: StreamWriter) -> None: ...
+    async def write(self, writer: StreamWriter, data: bytes) -> None: ...
@@ -0,0 +1,35 @@
+from _typeshed import Incomplete
+from typing import Any, Callable, ClassVar, Iterator, NamedTuple
+
+__all__ = ['ConfigRecord', 'Schema', 'derived']
+
+class derived:
+    func: Incomplete
+    __doc__: Incomplete
+    def __init__(self, func: Callable[[Any], Any]) -> None: ...
+    name: Incomplete
+    def __set_name__(self, owner: type, name: str) -> None: ...
+
+class SchemaField(NamedTuple):
+    name: str
+    type: Any
+    default: Any
+
+class ConfigRecord:
+    __slots__: Incomplete
+    __schema__: ClassVar['Schema']
+    def get(self, key: str, default: Any | None = None) -> Any: ...
+    def __iter__(self) -> Iterator[tuple[str, Any]]: ...
+    def __repr__(self) -> str: ...
+
+class Schema:
+    name: Incomplete
+    fields: Incomplete
+    derived_fields: Incomplete
+    record_type: type[ConfigRecord]
+    def __init__(self, name: str, fields: dict[str, SchemaField], derived_fields: dict[str, derived] | None = None) -> None: ...
+    @classmethod
+    def from_class(cls, config_cls: type) -> Schema: ...
+    def compile(self, data: dict | None, *, source: Any = None) -> ConfigRecord: ...
+    def derive(self, record: ConfigRecord, *, source: Any = None) -> None: ...
+    def convert(self, name: str, value: Any, *, source: Any = None) -> Any: ...
@@ -1,9 +1,9 @@
 from _typeshed import Incomplete
 from io import BytesIO as IoBytesIO
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple
 
-__all__ = ['MISSING', 'format_number', 'BytesIO', 'FileEncode']
+__all__ = ['MISSING', 'format_number', 'BytesIO', 'FLAG_CHECKSUM', 'FileEncode', 'FileEncodeView', 'FileChunk']
 
 class _MissingSentinel:
     def __eq__(self, other: Any) -> bool: ...
@@ -21,14 +21,54 @@ class BytesIO(IoBytesIO):
     @property
     def size(self) -> int: ...
 
+FLAG_CHECKSUM: int
+
+class _FileHeader(NamedTuple):
+    flag: int
+    path: str
+    data_start: int
+    data_end: int
+    server_name: str | None
+
 class FileEncode:
     path: Incomplete
     data: Incomplete
     flag: Incomplete
     server_name: Incomplete
     def __init__(self, path: str | Path, data: bytes, *, flag: int = 0, server_name: str | None = None) -> None: ...
-    def encode(self) -> bytes: ...
+    def encode(self) -> bytearray: ...
     def __str__(self) -> str: ...
     __repr__ = __str__
     @classmethod
     def decode(cls, raw_data: bytes) -> FileEncode: ...
+
+class FileEncodeView:
+    __slots__: Incomplete
+    raw: Incomplete
+    flag: Incomplete
+    path: Incomplete
+    server_name: Incomplete
+    data_start: Incomplete
+    data_end: Incomplete
+    _data: bytes | None
+    def __init__(self, raw_data: bytes) -> None: ...
+    @property
+    def data_view(self) -> memoryview: ...
+    @property
+    def data(self) -> bytes: ...
+    def to_file_encode(self) -> FileEncode: ...
+    def __reduce__(self): ...
+    def __str__(self) -> str: ...
+    __repr__ = __str__
+
+class FileChunk:
+    HEADER_SIZE: int
+    id: Incomplete
+    index: Incomplete
+    data: Incomplete
+    def __init__(self, id: bytes, index: int, data: bytes) -> None: ...
+    def encode(self) -> bytes: ...
+    def __str__(self) -> str: ...
+    __repr__ = __str__
+    @classmethod
+    def decode(cls, raw_data: bytes) -> FileChunk: ...
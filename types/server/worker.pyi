@@ -0,0 +1,123 @@
+import logging
+from .core.config import UserData
+from .core.presence import Presence
+from .core.server import BaseServer, CoroFunc
+from .plugin import SoloSetup, SoloSetupType
+from _typeshed import Incomplete
+from asyncio import AbstractEventLoop, Future
+from collections import deque
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any, NamedTuple
+
+__all__ = ['ProcessSetup', 'PluginProcess']
+
+class ClientState(NamedTuple):
+    sid: str
+    user: UserData
+
+class PluginProcess:
+    server: Incomplete
+    setup: Incomplete
+    loop: Incomplete
+    process: BaseProcess | None
+    conn: Connection | None
+    ready: bool
+    plugins: list[tuple[str, str]]
+    _stopping: bool
+    _started_at: float
+    _restarts: int
+    _send_lock: Incomplete
+    _listeners: list[tuple[str, CoroFunc]]
+    _pending: deque[tuple]
+    _clients: tuple[str, ...]
+    _presence: dict[str, Presence] | None
+    def __init__(self, server: BaseServer, setup: ProcessSetup) -> None: ...
+    def start(self) -> None: ...
+    def stop(self) -> None: ...
+    def restart(self) -> None: ...
+    def _stop_process(self, process: BaseProcess | None, conn: Connection | None): ...
+    def _read(self, process: BaseProcess, conn: Connection) -> None: ...
+    def _send(self, message: tuple) -> None: ...
+    def _handle(self, process: BaseProcess, message: tuple) -> None: ...
+    def _on_ready(self, events: list[str], plugins: list[tuple[str, str]]) -> None: ...
+    def _on_exit(self, process: BaseProcess) -> None: ...
+    def _restart_after_crash(self, process: BaseProcess) -> None: ...
+    def _remove_listeners(self) -> None: ...
+    def _make_listener(self, event_name: str) -> CoroFunc: ...
+    async def _on_presence_event(self, *args: Any, **kwargs: Any) -> None: ...
+    def _sync_presence(self) -> None: ...
+    def _send_event(self, event_name: str, args: tuple, kwargs: dict) -> None: ...
+    async def _call(self, call_id: int | None, sid: str | None, method: str, args: tuple, kwargs: dict) -> None: ...
+
+class ProcessSetup(SoloSetup):
+    isolated: bool
+    process: PluginProcess | None
+    def __init__(self, name: str, type: SoloSetupType = ...) -> None: ...
+    import_time: Incomplete
+    def load(self, server: BaseServer) -> None: ...
+    spec: Incomplete
+    def unload(self, server: BaseServer) -> None: ...
+    def restart(self) -> None: ...
+
+class ContextProxy:
+    server: Incomplete
+    log: Incomplete
+    sid: Incomplete
+    user: Incomplete
+    def __init__(self, server: WorkerServer, state: ClientState) -> None: ...
+    @property
+    def display_name(self) -> str: ...
+    @property
+    def name(self) -> str: ...
+    async def emit(self, event: str, *data: Any | None, **kwargs: Any) -> None: ...
+    async def disconnect(self, **kwargs: Any) -> None: ...
+    async def execute_command(self, command: str, exc_timeout: bool = True): ...
+    async def query_command(self, command: str, exc_timeout: bool = True, *, ttl: float | None = None): ...
+    def invalidate_queries(self) -> None: ...
+    async def extra_command(self, command: str, *, timeout: float | None = None): ...
+    def __str__(self) -> str: ...
+    __repr__ = __str__
+
+class PresenceProxy:
+    entries: Incomplete
+    def __init__(self, entries: dict[str, Presence]) -> None: ...
+    def get(self, name: str) -> Presence | None: ...
+    def snapshot(self) -> dict[str, Presence]: ...
+
+class _PipeLogHandler(logging.Handler):
+    server: Incomplete
+    def __init__(self, server: WorkerServer) -> None: ...
+    def emit(self, record: logging.LogRecord) -> None: ...
+
+class WorkerServer(BaseServer):
+    conn: Incomplete
+    loop: Incomplete
+    extra_events: dict[str, list[CoroFunc]]
+    event_buffer: deque
+    lazy_extensions: dict
+    paused_setups: set[str]
+    plugin_stats: Incomplete
+    clients: dict[str, ContextProxy]
+    command_manager: Incomplete
+    log: Incomplete
+    console: Incomplete
+    config: Incomplete
+    plugins_dir: Incomplete
+    rcon: Incomplete
+    presence: Incomplete
+    _send_lock: Incomplete
+    _call_ids: Incomplete
+    _calls: dict[int, Future]
+    def __init__(self, conn: Connection, loop: AbstractEventLoop) -> None: ...
+    def send_message(self, message: tuple) -> None: ...
+    async def call(self, method: str, *args: Any, sid: str | None = None, **kwargs): ...
+    def handle(self, message: tuple) -> None: ...
+    def _get_proxy(self, state: ClientState) -> ContextProxy: ...
+    async def shutdown(self) -> None: ...
+    async def emit(self, event: str, *data: Any | None, **kwargs: Any) -> None: ...
+    async def send(self, msg: Any, *args: Any, **kwargs: Any) -> None: ...
+    async def publish_file(self, name: str, data: bytes, **kwargs: Any) -> None: ...
+    async def publish_path(self, name: str, path: str | Path, **kwargs: Any) -> None: ...
+    def unload_extension(self, name: str) -> None: ...